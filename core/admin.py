@@ -1,42 +1,60 @@
 from django.contrib import admin
-from django.urls import reverse
-from django.utils.safestring import mark_safe
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
 from core.models import Account, Requester, RequestedItem, Shopper
-from core.models import Item
-from core.utils import date_string_from_datetime_object, localized_datetime_from_epoch_timestamp
+from core.models import Item, ListTemplate, ListTemplateItem, Task
+from core.utils import (localized_datetime_string_from_epoch_timestamp, localized_datetime_strings_from_epoch_timestamps,
+                        memoized_reverse)
 
 
 def list_display_model_field(model, fieldname=None, order_field=None):
+    """
+    Link to the related object's change page. Join the relation with list_select_related,
+    otherwise each row queries it.
+    """
     model_name = model._meta.model_name.lower()
+    viewname = 'admin:%s_%s_change' % (model._meta.app_label, model_name)
     def _(obj):
-        try:
-            if fieldname:
-                related_obj = getattr(obj, fieldname)
-                pk = related_obj.pk
-            else:
-                related_obj = obj
-                pk = obj.pk
-            if related_obj and pk:
-                url = reverse('admin:%s_%s_change' % (model._meta.app_label, model_name), args=[pk])
-                if url:
-                    return mark_safe("<a href='%s'>%s</a>" % (url, related_obj))
-                return related_obj
-            return obj
-        except AttributeError as e:
+        related_obj = getattr(obj, fieldname) if fieldname else obj
+        if related_obj is None or related_obj.pk is None:
             return None
+        return format_html("<a href='{}'>{}</a>", memoized_reverse(viewname, object_id=related_obj.pk), related_obj)
     _.short_description = model_name
     if fieldname or order_field:
         _.admin_order_field = order_field if order_field else fieldname
     return _
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate for unfiltered PostgreSQL changelists over
+    `exact_count_limit` rows, instead of counting the whole table.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [query.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > self.exact_count_limit:
+                return int(row[0])
+        return super(EstimatedCountPaginator, self).count
+
+
 def epoch_timestamp_to_human_readable(field, alternative_name=None):
     def epoch_timestamp_as_human_readable(obj):
-        value = getattr(obj, field)
-        if value:
-            return date_string_from_datetime_object(localized_datetime_from_epoch_timestamp(value), date_format='%Y-%m-%d %H:%M:%S %Z')
-        return '-'
+        formatted = getattr(obj, formatted_epoch_timestamp_attribute(field), None)
+        if formatted is None:
+            value = getattr(obj, field)
+            formatted = localized_datetime_string_from_epoch_timestamp(value) if value else None
+        return formatted or '-'
     if alternative_name:
         epoch_timestamp_as_human_readable.short_description = alternative_name.title()
     else:
@@ -45,24 +63,91 @@ def epoch_timestamp_to_human_readable(field, alternative_name=None):
     return epoch_timestamp_as_human_readable
 
 
+def formatted_epoch_timestamp_attribute(field):
+    return '_%s_formatted' % field
+
+
+class EpochTimestampChangeList(ChangeList):
+    """
+    Formats the model admin's `epoch_timestamp_fields` for the whole page of results at once.
+    """
+
+    def get_results(self, request):
+        super(EpochTimestampChangeList, self).get_results(request)
+        for field in self.model_admin.epoch_timestamp_fields:
+            values = [getattr(obj, field) for obj in self.result_list]
+            for obj, formatted in zip(self.result_list, localized_datetime_strings_from_epoch_timestamps(values)):
+                setattr(obj, formatted_epoch_timestamp_attribute(field), formatted)
+
+
 class RequesterModelAdmin(admin.ModelAdmin):
     fields = ['user', 'account', 'shoppers']
-    list_display = ['user', 'account', 'get_invite_link']
+    list_display = ['user', 'account', 'open_items_count', 'high_priority_open_items_count', 'claimed_items_count',
+                    'items_modified', 'get_invite_link']
+    list_select_related = ['user', 'account']
+    raw_id_fields = ['user', 'account']
+    autocomplete_fields = ['shoppers']
+    search_fields = ['user__username']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def get_invite_link(self, obj):
-        return mark_safe('<a href=%s> Invite shopper </a>' % obj.invite_link)
+        return format_html('<a href={}> Invite shopper </a>', obj.invite_link)
+
+
+class ShopperModelAdmin(admin.ModelAdmin):
+    list_display = ['user', 'account']
+    list_select_related = ['user', 'account']
+    raw_id_fields = ['user', 'account']
+    search_fields = ['user__username']
+
+
+class ItemModelAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['normalized_name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class RequestedItemModelAdmin(admin.ModelAdmin):
     list_display = ['id', list_display_model_field(Requester, 'requester'), list_display_model_field(Item, 'item'),
                     'quantity', 'priority', list_display_model_field(Shopper, 'shopper'),
-                    epoch_timestamp_to_human_readable('claimed_epoch_timestamp')]
+                    epoch_timestamp_to_human_readable('claimed_epoch_timestamp'),
+                    epoch_timestamp_to_human_readable('fulfilled_epoch_timestamp')]
     list_filter = ['priority']
+    list_select_related = ['requester__user', 'item', 'shopper__user']
+    autocomplete_fields = ['requester', 'shopper', 'item']
+    epoch_timestamp_fields = ['claimed_epoch_timestamp', 'fulfilled_epoch_timestamp']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return EpochTimestampChangeList
+
+
+class ListTemplateItemInline(admin.TabularInline):
+    model = ListTemplateItem
+    autocomplete_fields = ['item']
+
+
+class ListTemplateModelAdmin(admin.ModelAdmin):
+    list_display = ['name', list_display_model_field(Requester, 'requester'), 'interval_days', 'next_run', 'last_run']
+    list_select_related = ['requester__user']
+    raw_id_fields = ['requester']
+    inlines = [ListTemplateItemInline]
+
+
+class TaskModelAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'attempts', 'failed', 'run_after', 'created']
+    list_filter = ['failed', 'name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Account)
 admin.site.register(Requester, RequesterModelAdmin)
-admin.site.register(Shopper)
-admin.site.register(Item)
+admin.site.register(Shopper, ShopperModelAdmin)
+admin.site.register(Item, ItemModelAdmin)
 admin.site.register(RequestedItem, RequestedItemModelAdmin)
-
+admin.site.register(ListTemplate, ListTemplateModelAdmin)
+admin.site.register(Task, TaskModelAdmin)
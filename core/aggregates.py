@@ -0,0 +1,14 @@
+from django.db.models import Aggregate, CharField
+
+
+class GroupConcat(Aggregate):
+    """
+    Comma separated distinct values of a group, in no particular order.
+    """
+    function = 'GROUP_CONCAT'
+    template = '%(function)s(DISTINCT %(expressions)s)'
+    output_field = CharField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='STRING_AGG',
+                           template="%(function)s(DISTINCT %(expressions)s::text, ',')", **extra_context)
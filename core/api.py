@@ -0,0 +1,319 @@
+import json
+
+from django.forms import model_to_dict, modelform_factory
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+
+from core import search
+from core.forms import BulkClaimForm
+from core.models import Comment, Item, RequestedItem, Requester, Shopper
+from core.pagination import InvalidCursor, KeysetPaginator
+from core.views import (UserTestMixin, comment_belongs_to_user, requester_is_authorized_for_shopper,
+                        requester_owns_requested_item, user_is_authorized_on_requested_item,
+                        user_is_authorized_shopper, user_is_requester, user_is_shopper)
+
+
+def serialize_requested_item(requested_item):
+    return {
+        'id': requested_item.pk,
+        'requester': requested_item.requester_id,
+        'item': requested_item.item_id,
+        'item_name': requested_item.item.name,
+        'quantity': requested_item.quantity,
+        'priority': requested_item.priority,
+        'priority_string': requested_item.priority_string,
+        'shopper': requested_item.shopper_id,
+        'claimed_epoch_timestamp': requested_item.claimed_epoch_timestamp,
+    }
+
+
+def serialize_work_queue_item(requested_item):
+    return dict(serialize_requested_item(requested_item), requester_username=requested_item.requester.user.username)
+
+
+def serialize_item_totals(totals):
+    return {
+        'item': totals['item'],
+        'item_name': totals['item__name'],
+        'total_quantity': totals['total_quantity'],
+        'requested_items': totals['requested_items'],
+        'priority': totals['priority'],
+    }
+
+
+def serialize_item(item):
+    return {
+        'id': item.pk,
+        'name': item.name,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'requested_item': comment.requested_item_id,
+        'author': comment.author_id,
+        'body': comment.body,
+        'created': comment.created,
+        'modified': comment.modified,
+    }
+
+
+def serialize_profile(profile):
+    return {
+        'id': profile.pk,
+        'username': profile.user.username,
+    }
+
+
+def user_can_view_requested_item(view_cls):
+    return user_is_authorized_on_requested_item(view_cls) or user_is_authorized_shopper(view_cls)
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super(ApiError, self).__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+class ApiView(UserTestMixin, View):
+    """
+    Base class for the JSON API. Permission tests are declared per HTTP method
+    and reuse the same test functions as the HTML views.
+    """
+    pk_url_kwarg = 'pk'
+    method_tests = {}
+    serializer = None
+    paginate_by = 50
+    keyset_ordering = ('-priority', 'id')
+
+    def test_func(self):
+        return all(f(self) for f in self.method_tests.get(self.request.method.lower(), []))
+
+    def handle_no_permission(self):
+        if not self.request.user.is_authenticated:
+            return self.error_response('Authentication required.', status=401)
+        return self.error_response('Permission denied.', status=403)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super(ApiView, self).dispatch(request, *args, **kwargs)
+        except ApiError as e:
+            return self.error_response(str(e), e.status, **e.extra)
+
+    def error_response(self, message, status, **extra):
+        return JsonResponse(dict(extra, error=message), status=status)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        return self.error_response('Method not allowed.', status=405)
+
+    def get_json_body(self):
+        try:
+            data = json.loads(self.request.body or '{}')
+        except ValueError:
+            raise ApiError('Request body must be valid JSON.')
+        if not isinstance(data, dict):
+            raise ApiError('Request body must be a JSON object.')
+        return data
+
+    def get_fields(self, data):
+        fields = self.request.GET.get('fields')
+        if not fields:
+            return None
+        fields = fields.split(',')
+        unknown = set(fields) - set(data)
+        if unknown:
+            raise ApiError('Unknown fields: %s' % ', '.join(sorted(unknown)))
+        return fields
+
+    def serialize(self, obj):
+        data = self.serializer(obj)
+        fields = self.get_fields(data)
+        if fields is None:
+            return data
+        return {field: data[field] for field in fields}
+
+    def paginate(self, queryset):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, self.paginate_by)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise ApiError('Invalid cursor.')
+        return {
+            'results': [self.serialize(obj) for obj in page.object_list],
+            'next_cursor': page.next_cursor,
+        }
+
+    def validate(self, form):
+        if not form.is_valid():
+            raise ApiError('Invalid data.', errors=form.errors.get_json_data())
+        return form
+
+
+class RequestedItemsApiView(ApiView):
+    serializer = staticmethod(serialize_requested_item)
+    method_tests = {
+        'get': [user_is_requester],
+        'post': [user_is_requester],
+    }
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.paginate(RequestedItem.objects.for_requester(self.permissions.requester_id).for_table()))
+
+    def post(self, request, *args, **kwargs):
+        form_class = modelform_factory(RequestedItem, fields=['item', 'quantity', 'priority'])
+        form = self.validate(form_class(self.get_json_body()))
+        form.instance.requester_id = self.permissions.requester_id
+        return JsonResponse(self.serialize(form.save()), status=201)
+
+
+class RequestedItemApiView(ApiView):
+    serializer = staticmethod(serialize_requested_item)
+    method_tests = {
+        'get': [user_can_view_requested_item],
+        'patch': [requester_owns_requested_item],
+        'delete': [requester_owns_requested_item],
+    }
+
+    def get_object(self):
+        return self.permissions.requested_item(self.kwargs['pk'])
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.serialize(self.get_object()))
+
+    def patch(self, request, *args, **kwargs):
+        requested_item = self.get_object()
+        fields = ['quantity', 'priority', 'shopper']
+        data = dict(model_to_dict(requested_item, fields=fields), **self.get_json_body())
+        form = self.validate(modelform_factory(RequestedItem, fields=fields)(data, instance=requested_item))
+        return JsonResponse(self.serialize(form.save()))
+
+    def delete(self, request, *args, **kwargs):
+        self.get_object().delete()
+        return HttpResponse(status=204)
+
+
+class RequestedItemClaimApiView(ApiView):
+    serializer = staticmethod(serialize_requested_item)
+    method_tests = {
+        'post': [user_is_shopper, user_is_authorized_shopper],
+    }
+
+    def post(self, request, *args, **kwargs):
+        requested_item = self.permissions.requested_item(self.kwargs['pk'])
+        if not Shopper(pk=self.permissions.shopper_id, user=request.user).claim_requested_item(requested_item):
+            requested_item.refresh_from_db(fields=['shopper', 'claimed_epoch_timestamp'])
+            if requested_item.shopper_id != self.permissions.shopper_id:
+                raise ApiError('Requested item is already claimed.', status=409)
+        return JsonResponse(self.serialize(requested_item))
+
+
+class RequesterBulkClaimApiView(ApiView):
+    method_tests = {
+        'post': [requester_is_authorized_for_shopper],
+    }
+
+    def post(self, request, pk, *args, **kwargs):
+        form = self.validate(BulkClaimForm(self.get_json_body()))
+        requested_items = RequestedItem.objects.for_requester(pk).filter(pk__in=form.cleaned_data['requested_items'])
+        shopper = request.user.shopper
+        if form.cleaned_data['action'] == BulkClaimForm.CLAIM:
+            results = shopper.claim_requested_items(requested_items)
+        else:
+            results = shopper.release_requested_items(requested_items)
+        return JsonResponse({
+            'results': {
+                requested_item_id: results.get(requested_item_id) in (RequestedItem.CLAIMED, RequestedItem.RELEASED)
+                for requested_item_id in form.cleaned_data['requested_items']
+            },
+            'already_held': [
+                requested_item_id for requested_item_id in form.cleaned_data['requested_items']
+                if results.get(requested_item_id) == Shopper.ALREADY_HELD
+            ],
+        })
+
+
+class CommentsApiView(ApiView):
+    serializer = staticmethod(serialize_comment)
+    method_tests = {
+        'post': [user_is_authorized_on_requested_item],
+    }
+
+    def post(self, request, pk, *args, **kwargs):
+        form = self.validate(modelform_factory(Comment, fields=['body'])(self.get_json_body()))
+        form.instance.author = request.user
+        form.instance.requested_item_id = pk
+        return JsonResponse(self.serialize(form.save()), status=201)
+
+
+class CommentApiView(ApiView):
+    method_tests = {
+        'delete': [comment_belongs_to_user],
+    }
+
+    def delete(self, request, pk, *args, **kwargs):
+        self.permissions.comment(pk).delete()
+        return HttpResponse(status=204)
+
+
+class ShoppersApiView(ApiView):
+    serializer = staticmethod(serialize_profile)
+    keyset_ordering = ('id',)
+    method_tests = {
+        'get': [user_is_requester],
+    }
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.paginate(Shopper.objects.select_related('user').filter(pk__in=self.permissions.shopper_ids)))
+
+
+class RequestersApiView(ApiView):
+    serializer = staticmethod(serialize_profile)
+    keyset_ordering = ('id',)
+    method_tests = {
+        'get': [user_is_shopper],
+    }
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.paginate(Requester.objects.select_related('user').filter(pk__in=self.permissions.requester_ids)))
+
+
+class WorkQueueApiView(ApiView):
+    serializer = staticmethod(serialize_work_queue_item)
+    grouped_limit = 100
+    method_tests = {
+        'get': [user_is_shopper],
+    }
+
+    def get(self, request, *args, **kwargs):
+        requested_items = RequestedItem.objects.work_queue(self.permissions.requester_ids)
+        if request.GET.get('group') == 'item':
+            self.serializer = serialize_item_totals
+            totals = list(requested_items.totals_by_item()[:self.grouped_limit + 1])
+            return JsonResponse({'results': [self.serialize(row) for row in totals[:self.grouped_limit]],
+                                 'truncated': len(totals) > self.grouped_limit})
+        return JsonResponse(self.paginate(requested_items.for_work_queue()))
+
+
+class ItemsApiView(ApiView):
+    serializer = staticmethod(serialize_item)
+    typeahead_limit = 10
+    method_tests = {
+        'get': [user_is_requester],
+    }
+
+    def get(self, request, *args, **kwargs):
+        items = Item.objects.typeahead(request.GET.get('q', ''), limit=self.typeahead_limit)
+        return JsonResponse({'results': [self.serialize(item) for item in items]})
+
+
+class SearchApiView(ApiView):
+    serializer = staticmethod(serialize_requested_item)
+
+    def get(self, request, *args, **kwargs):
+        query = ' '.join(request.GET.get('q', '').split())
+        if not query:
+            raise ApiError('Missing search query.')
+        requested_items = search.search_requested_items(self.permissions.authorized_requested_items(), query)
+        return JsonResponse(self.paginate(requested_items.for_table()))
@@ -0,0 +1,241 @@
+import json
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import search
+from core.models import Account, Comment, Item, RequestedItem, Requester, Shopper
+from core.utils import batched, normalize_item_name
+
+
+def create_profiles(profile_model, count, accounts=1, batch_size=1000):
+    prefix = uuid.uuid4().hex[:8]
+    usernames = ['%s-%s-%s' % (profile_model.__name__.lower(), prefix, i) for i in range(count)]
+    Account.objects.bulk_create([Account(name='benchmark-%s-%s' % (prefix, i)) for i in range(accounts)])
+    account_ids = list(Account.objects.filter(name__startswith='benchmark-%s-' % prefix).values_list('pk', flat=True))
+    for batch in batched(usernames, batch_size):
+        User.objects.bulk_create([User(username=username, password='!') for username in batch])
+    users = User.objects.filter(username__in=usernames).values_list('pk', flat=True)
+    for batch in batched(enumerate(users.iterator()), batch_size):
+        profile_model.objects.bulk_create([profile_model(user_id=user_id, account_id=account_ids[i % len(account_ids)])
+                                           for i, user_id in batch])
+    return list(profile_model.objects.filter(user__username__in=usernames).values_list('pk', flat=True))
+
+
+def seed_requested_items(count, requesters=1000, shoppers=200, shoppers_per_requester=3, items=5000,
+                         claimed_ratio=0.5, accounts=1, batch_size=10000, seed=0):
+    rng = random.Random(seed)
+    requester_ids = create_profiles(Requester, requesters, accounts)
+    shopper_ids = create_profiles(Shopper, shoppers, accounts)
+    links = {requester_id: rng.sample(shopper_ids, min(shoppers_per_requester, len(shopper_ids))) for requester_id in requester_ids}
+    Requester.shoppers.through.objects.bulk_create(
+        [Requester.shoppers.through(requester_id=requester_id, shopper_id=shopper_id)
+         for requester_id, linked in links.items() for shopper_id in linked])
+    names = ['benchmark item %s %s' % (uuid.uuid4().hex[:8], i) for i in range(items)]
+    Item.objects.bulk_create([Item(name=name, normalized_name=normalize_item_name(name)) for name in names])
+    item_ids = list(Item.objects.order_by('-pk').values_list('pk', flat=True)[:items])
+    now = int(timezone.now().timestamp())
+
+    def requested_items():
+        for _ in range(count):
+            requester_id = rng.choice(requester_ids)
+            claimed = links[requester_id] and rng.random() < claimed_ratio
+            yield RequestedItem(
+                requester_id=requester_id,
+                shopper_id=rng.choice(links[requester_id]) if claimed else None,
+                item_id=rng.choice(item_ids),
+                quantity=rng.randint(1, 10),
+                priority=rng.choice([level for level, _ in RequestedItem.priority_levels]),
+                claimed_epoch_timestamp=now if claimed else None,
+            )
+
+    for batch in batched(requested_items(), batch_size):
+        RequestedItem.objects.bulk_create(batch)
+    return requester_ids, shopper_ids
+
+
+COMMENT_WORDS = ['brand', 'organic', 'cheaper', 'store', 'aisle', 'sold', 'out', 'swap', 'similar', 'bigger', 'pack',
+                 'fresh', 'frozen', 'discount', 'please', 'check', 'label', 'expiry', 'date', 'same', 'as', 'last', 'time']
+
+
+def seed_comments(count, batch_size=10000, seed=0):
+    rng = random.Random(seed)
+    requested_items = list(RequestedItem.objects.values_list('pk', 'requester__user_id'))
+
+    def comments():
+        for _ in range(count):
+            requested_item_id, author_id = rng.choice(requested_items)
+            yield Comment(requested_item_id=requested_item_id, author_id=author_id,
+                          body=' '.join(rng.choice(COMMENT_WORDS) for _ in range(rng.randint(3, 20))))
+
+    for batch in batched(comments(), batch_size):
+        Comment.objects.bulk_create(batch)
+
+
+def generate_population(requested_items, requesters, shoppers, shoppers_per_requester, items, comments,
+                        claimed_ratio=0.5, accounts=1, seed=0):
+    """
+    Bulk insert a synthetic population, then rebuild what signals would have
+    maintained: the requester counters and the search index.
+    """
+    seed_requested_items(requested_items, requesters=requesters, shoppers=shoppers, shoppers_per_requester=shoppers_per_requester,
+                         items=items, claimed_ratio=claimed_ratio, accounts=accounts, seed=seed)
+    seed_comments(comments, seed=seed)
+    Requester.objects.recount_items()
+    search.rebuild_index()
+
+
+def population_for_scale(requested_items):
+    return {
+        'requested_items': requested_items,
+        'requesters': max(10, requested_items // 100),
+        'shoppers': max(5, requested_items // 500),
+        'shoppers_per_requester': 3,
+        'items': max(50, requested_items // 20),
+        'comments': requested_items,
+    }
+
+
+def time_queryset(queryset, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.all())
+        timings.append(time.perf_counter() - start)
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'max_ms': max(timings) * 1000,
+    }
+
+
+def requested_item_access_patterns(requester, shopper, page_size=50):
+    page = RequestedItem.objects.order_by('-priority', 'id')
+    return {
+        'requester items': page.filter(requester=requester)[:page_size],
+        'requester items by user': page.filter(requester__user=requester.user_id)[:page_size],
+        'requester unclaimed items': page.filter(requester=requester, shopper__isnull=True)[:page_size],
+        'shopper claimed items': page.filter(shopper=shopper)[:page_size],
+    }
+
+
+def profile_queries(querysets, repeat=20):
+    return {
+        name: dict(time_queryset(queryset, repeat), plan=queryset.explain())
+        for name, queryset in querysets.items()
+    }
+
+
+# URLs left out of the URL benchmark: long-lived by design, or they change the links between the benchmark users.
+SKIPPED_URLS = {
+    'events-stream': 'streams for EVENTS_STREAM_DURATION',
+    'events-poll': 'waits up to EVENTS_LONG_POLL_TIMEOUT',
+    'add-shopper': 'rotates the invite token',
+    'remove-shopper': 'unlinks the benchmark shopper',
+    'api-comments': 'only creates comments',
+    'api-comment': 'only deletes comments',
+    'list-template-delete': 'needs a list template',
+}
+
+
+def url_benchmarks(requester, shopper, requested_item, comment, staff):
+    """
+    Map each core URL name to (user, method, path, data) for the benchmark. `staff` is a staff user, who may
+    read the metrics.
+    """
+    def url(name, *args):
+        return reverse('core:%s' % name, args=args)
+
+    claim = {'action': 'claim', 'requested_items': [requested_item.pk]}
+    return {
+        'index': (None, 'get', url('index'), None),
+        'requested-items': (requester.user, 'get', url('requested-items'), None),
+        'requested-item-create': (requester.user, 'get', url('requested-item-create'), None),
+        'requested-items-import': (requester.user, 'get', url('requested-items-import'), None),
+        'requested-items-export': (requester.user, 'get', url('requested-items-export'), None),
+        'list-templates': (requester.user, 'get', url('list-templates'), None),
+        'list-template-create': (requester.user, 'get', url('list-template-create'), None),
+        'requested-item-detail': (requester.user, 'get', url('requested-item-detail', requested_item.pk), None),
+        'requested-item-delete': (requester.user, 'get', url('requested-item-delete', requested_item.pk), None),
+        'requested-item-update': (requester.user, 'get', url('requested-item-update', requested_item.pk), None),
+        'requested-item-claim': (shopper.user, 'get', url('requested-item-claim', requested_item.pk), None),
+        'shoppers': (requester.user, 'get', url('shoppers'), None),
+        'shopper-detail': (requester.user, 'get', url('shopper-detail', shopper.pk), None),
+        'requesters': (shopper.user, 'get', url('requesters'), None),
+        'requester-detail': (shopper.user, 'get', url('requester-detail', requester.pk), None),
+        'requester-bulk-claim': (shopper.user, 'post', url('requester-bulk-claim', requester.pk), claim),
+        'work-queue': (shopper.user, 'get', url('work-queue'), None),
+        'shopping-list': (shopper.user, 'get', url('shopping-list'), None),
+        'search': (requester.user, 'get', url('search'), {'q': comment.body.split()[0]}),
+        'comment-create': (requester.user, 'get', url('comment-create', requested_item.pk), None),
+        'comment-delete': (requester.user, 'get', url('comment-delete', comment.pk), None),
+        'notification-preferences': (requester.user, 'get', url('notification-preferences'), None),
+        'metrics': (staff, 'get', url('metrics'), None),
+        'api-requested-items': (requester.user, 'get', url('api-requested-items'), None),
+        'api-requested-item': (requester.user, 'get', url('api-requested-item', requested_item.pk), None),
+        'api-requested-item-claim': (shopper.user, 'post', url('api-requested-item-claim', requested_item.pk), None),
+        'api-requester-bulk-claim': (shopper.user, 'post', url('api-requester-bulk-claim', requester.pk), claim),
+        'api-shoppers': (requester.user, 'get', url('api-shoppers'), None),
+        'api-requesters': (shopper.user, 'get', url('api-requesters'), None),
+        'api-work-queue': (shopper.user, 'get', url('api-work-queue'), None),
+        'api-items': (requester.user, 'get', url('api-items'), {'q': requested_item.item.name[:3]}),
+        'api-search': (requester.user, 'get', url('api-search'), {'q': comment.body.split()[0]}),
+    }
+
+
+def time_url(client, method, path, data, repeat=20):
+    timings, queries = [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            if method == 'post' and path.startswith('/api/'):
+                response = client.post(path, data=json.dumps(data or {}), content_type='application/json')
+            else:
+                response = getattr(client, method)(path, data=data or {})
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append(time.perf_counter() - start)
+        queries.append(len(captured))
+    return {
+        'status': response.status_code,
+        'median_ms': statistics.median(timings) * 1000,
+        'max_ms': max(timings) * 1000,
+        'queries': max(queries),
+    }
+
+
+def profile_urls(benchmarks, repeat=20):
+    clients = {}
+    results = {}
+    for name, (user, method, path, data) in benchmarks.items():
+        if user not in clients:
+            clients[user] = Client()
+            if user is not None:
+                clients[user].force_login(user)
+        results[name] = time_url(clients[user], method, path, data, repeat)
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=0.25):
+    """
+    Regressions of `results` against `baseline`, both {scale: {url name: result}}:
+    more queries than before, or a median latency over the tolerance.
+    """
+    regressions = []
+    for scale, urls in results.items():
+        for name, result in urls.items():
+            before = baseline.get(scale, {}).get(name)
+            if before is None:
+                continue
+            if result['queries'] > before['queries']:
+                regressions.append('%s at %s: %s queries, was %s' % (name, scale, result['queries'], before['queries']))
+            if result['median_ms'] > before['median_ms'] * (1 + tolerance):
+                regressions.append('%s at %s: median %.2fms, was %.2fms' % (name, scale, result['median_ms'], before['median_ms']))
+    return regressions
@@ -0,0 +1,86 @@
+import collections
+import json
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+
+class EventBroker:
+    """
+    In-process fan-out of requested item events to the subscribers of their requesters.
+
+    Published events are kept in a bounded history with increasing ids, so a
+    subscriber that reconnects with the last id it saw (SSE Last-Event-ID or
+    the long-poll last_event_id parameter) gets what it missed. Subscribers
+    only see events published in the same process: ids carry an epoch of the
+    broker that issued them, and an id from another process or from before a
+    restart resumes from the current event.
+    """
+
+    def __init__(self, history):
+        self._condition = threading.Condition()
+        self._events = collections.deque(maxlen=history)
+        self._epoch = uuid.uuid4().hex[:8]
+        self._sequence = 0
+
+    def event_id(self, sequence):
+        return '%s-%s' % (self._epoch, sequence)
+
+    @property
+    def last_id(self):
+        return self.event_id(self._sequence)
+
+    def sequence(self, event_id):
+        epoch, _, sequence = str(event_id).partition('-')
+        if epoch == self._epoch and sequence.isdigit() and int(sequence) <= self._sequence:
+            return int(sequence)
+        return self._sequence
+
+    def publish(self, requester_ids, event):
+        with self._condition:
+            self._sequence += 1
+            self._events.append((self._sequence, frozenset(requester_ids), dict(event, id=self.event_id(self._sequence))))
+            self._condition.notify_all()
+            return self.event_id(self._sequence)
+
+    def _events_since(self, requester_ids, sequence):
+        return [event for event_sequence, audience, event in self._events if event_sequence > sequence and not audience.isdisjoint(requester_ids)]
+
+    def events_since(self, requester_ids, last_id):
+        """
+        Events published after `last_id` for any of `requester_ids`.
+        """
+        with self._condition:
+            return self._events_since(requester_ids, self.sequence(last_id))
+
+    def wait(self, requester_ids, last_id, timeout):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            sequence = self.sequence(last_id)
+            while True:
+                events = self._events_since(requester_ids, sequence)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._condition.wait(remaining)
+
+
+broker = EventBroker(history=settings.EVENTS_HISTORY)
+
+
+def format_sse(event):
+    return 'id: %s\ndata: %s\n\n' % (event['id'], json.dumps(event))
+
+
+def stream_events(requester_ids, last_id, duration, heartbeat_interval):
+    deadline = time.monotonic() + duration
+    yield 'retry: %s\n\n' % int(heartbeat_interval * 1000)
+    while time.monotonic() < deadline:
+        events = broker.wait(requester_ids, last_id, min(heartbeat_interval, max(deadline - time.monotonic(), 0)))
+        for event in events:
+            last_id = event['id']
+            yield format_sse(event)
+        if not events:
+            yield ': keepalive\n\n'
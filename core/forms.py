@@ -1,7 +1,8 @@
 from allauth.account.forms import SignupForm
 from django import forms
 
-from core.models import Profile, Account
+from core import transfer
+from core.models import Account, Item, ListTemplate, NotificationPreference, Profile, RequestedItem
 
 
 class CustomSignupForm(SignupForm):
@@ -13,3 +14,71 @@ class CustomSignupForm(SignupForm):
         profile_model = Profile.get_profile_model(self.cleaned_data['account_type'])
         profile_model.objects.create(user=user, account=account)
         return user
+
+
+class RequestedItemIdsField(forms.TypedMultipleChoiceField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('coerce', int)
+        super(RequestedItemIdsField, self).__init__(*args, **kwargs)
+
+    def valid_value(self, value):
+        return True
+
+
+class BulkClaimForm(forms.Form):
+    CLAIM = 'claim'
+    RELEASE = 'release'
+    MAX_REQUESTED_ITEMS = 500
+
+    action = forms.ChoiceField(choices=((CLAIM, 'Claim'), (RELEASE, 'Release')))
+    requested_items = RequestedItemIdsField()
+
+    def clean_requested_items(self):
+        requested_items = self.cleaned_data['requested_items']
+        if len(requested_items) > self.MAX_REQUESTED_ITEMS:
+            raise forms.ValidationError('You can select at most %s items at once.' % self.MAX_REQUESTED_ITEMS)
+        return requested_items
+
+
+class FulfilItemsForm(forms.Form):
+    items = RequestedItemIdsField()
+
+
+class RequestedItemCreateForm(forms.ModelForm):
+    item_name = forms.CharField(label='Item', max_length=300, widget=forms.TextInput(attrs={
+        'list': 'item-suggestions', 'autocomplete': 'off'}))
+
+    class Meta:
+        model = RequestedItem
+        fields = ['quantity', 'priority']
+
+    field_order = ['item_name', 'quantity', 'priority']
+
+    def clean_item_name(self):
+        item_name = ' '.join(self.cleaned_data['item_name'].split())
+        if not item_name:
+            raise forms.ValidationError('Enter the name of the item.')
+        return item_name
+
+    def save(self, commit=True):
+        self.instance.item = Item.objects.get_or_create_by_name(self.cleaned_data['item_name'])[0]
+        return super(RequestedItemCreateForm, self).save(commit)
+
+
+class ImportRequestedItemsForm(forms.Form):
+    file = forms.FileField(help_text='One requested item per row, with item, quantity and priority columns.')
+    format = forms.ChoiceField(choices=[(name, name.upper()) for name in transfer.FORMATS], initial='csv')
+
+
+class ListTemplateForm(forms.ModelForm):
+    class Meta:
+        model = ListTemplate
+        fields = ['name', 'interval_days', 'next_run']
+        labels = {'interval_days': 'Repeat', 'next_run': 'First run'}
+
+
+class NotificationPreferenceForm(forms.ModelForm):
+    class Meta:
+        model = NotificationPreference
+        fields = ['digest_window', 'claims', 'comments']
+        labels = {'digest_window': 'Send updates', 'claims': 'Claims', 'comments': 'Comments'}
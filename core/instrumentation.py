@@ -0,0 +1,123 @@
+import contextlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('shop4me')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class ViewMetrics:
+    """
+    Per-view request totals of this process, exposed in the Prometheus text format.
+    """
+    fields = [
+        ('requests', 'shop4me_view_requests_total', 'counter', 'Requests handled.'),
+        ('duration', 'shop4me_view_duration_seconds_total', 'counter', 'Wall time spent handling requests.'),
+        ('queries', 'shop4me_view_db_queries_total', 'counter', 'Database queries executed.'),
+        ('db_duration', 'shop4me_view_db_duration_seconds_total', 'counter', 'Time spent in database queries.'),
+        ('template_duration', 'shop4me_view_template_duration_seconds_total', 'counter', 'Time spent rendering templates.'),
+        ('over_budget', 'shop4me_view_query_budget_exceeded_total', 'counter', 'Requests that exceeded the query budget.'),
+    ]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, **values):
+        with self._lock:
+            totals = self._views.setdefault(view, dict.fromkeys([field for field, _, _, _ in self.fields], 0))
+            totals['requests'] += 1
+            for field, value in values.items():
+                totals[field] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {view: dict(totals) for view, totals in self._views.items()}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        snapshot = self.snapshot()
+        lines = []
+        for field, name, metric_type, help_text in self.fields:
+            lines += ['# HELP %s %s' % (name, help_text), '# TYPE %s %s' % (name, metric_type)]
+            for view in sorted(snapshot):
+                lines.append('%s{view="%s"} %s' % (name, view.replace('\\', '\\\\').replace('"', '\\"'), snapshot[view][field]))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = ViewMetrics()
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class PerformanceMiddleware:
+    """
+    Records wall time, database queries and time, and template render time per
+    view, and enforces the `query_budget` a view class may declare. Exceeding a
+    budget raises QueryBudgetExceeded when QUERY_BUDGETS_STRICT (in tests), and
+    logs a warning otherwise.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._performance = {'template_duration': 0, 'query_budget': None}
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        budget = request._performance['query_budget']
+        over_budget = budget is not None and recorder.count > budget
+        metrics.record(view, duration=duration, queries=recorder.count, db_duration=recorder.duration,
+                       template_duration=request._performance['template_duration'], over_budget=int(over_budget))
+        if settings.PERFORMANCE_LOG_REQUESTS:
+            logger.info('view=%s method=%s status=%s duration_ms=%.1f queries=%s db_ms=%.1f template_ms=%.1f',
+                        view, request.method, response.status_code, duration * 1000, recorder.count,
+                        recorder.duration * 1000, request._performance['template_duration'] * 1000)
+        if over_budget:
+            message = '%s ran %s queries, over its budget of %s.' % (view, recorder.count, budget)
+            if settings.QUERY_BUDGETS_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request._performance['query_budget'] = getattr(view_class, 'query_budget', None)
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._performance['template_duration'] += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+
+from core import benchmarking
+from core.models import RequestedItem, Requester
+
+
+FOREIGN_KEY_INDEXES = [
+    models.Index(fields=['requester'], name='benchmark_requester_fk_idx'),
+    models.Index(fields=['shopper'], name='benchmark_shopper_fk_idx'),
+]
+
+
+def swap_indexes(remove, add):
+    with connection.schema_editor() as schema_editor:
+        for index in remove:
+            schema_editor.remove_index(RequestedItem, index)
+        for index in add:
+            schema_editor.add_index(RequestedItem, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database with requested items and compare EXPLAIN plans and latency of the hot '
+            'RequestedItem queries using bare foreign key indexes (before) and the composite indexes (after).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--requesters', type=int, default=1000)
+        parser.add_argument('--shoppers', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def handle(self, *args, **options):
+        composite_indexes = RequestedItem._meta.indexes
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            swap_indexes(remove=composite_indexes, add=[])
+            self.stderr.write('Seeding %s requested items...' % options['rows'])
+            benchmarking.seed_requested_items(options['rows'], requesters=options['requesters'], shoppers=options['shoppers'])
+            requester = Requester.objects.filter(shoppers__isnull=False).order_by('pk').first()
+            shopper = requester.shoppers.order_by('pk').first()
+            queries = benchmarking.requested_item_access_patterns(requester, shopper)
+
+            swap_indexes(remove=[], add=FOREIGN_KEY_INDEXES)
+            before = benchmarking.profile_queries(queries, options['repeat'])
+            swap_indexes(remove=FOREIGN_KEY_INDEXES, add=composite_indexes)
+            after = benchmarking.profile_queries(queries, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        results = {name: {'before': before[name], 'after': after[name]} for name in queries}
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label in ('before', 'after'):
+                self.stdout.write('  %s: median %.2fms, max %.2fms' % (label, result[label]['median_ms'], result[label]['max_ms']))
+                for line in result[label]['plan'].splitlines():
+                    self.stdout.write('    %s' % line)
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from core import benchmarking, search
+from core.models import Comment, Item, RequestedItem, Requester
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database with requested items and comments and compare EXPLAIN plans and latency '
+            'of searching them with a LIKE scan (before) and the full-text indexes (after).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--rows', type=int, default=20000, help='Requested items to attach the comments to.')
+        parser.add_argument('--query', default='organic brand')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def handle(self, *args, **options):
+        query = options['query']
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stderr.write('Seeding %s requested items and %s comments...' % (options['rows'], options['comments']))
+            benchmarking.seed_requested_items(options['rows'])
+            benchmarking.seed_comments(options['comments'])
+            search.rebuild_index()
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            requester = Requester.objects.filter(requested_items__comments__isnull=False).order_by('pk').first()
+            requested_items = RequestedItem.objects.filter(requester=requester)
+            terms = query.split()
+            scan = requested_items.filter(
+                Q(item__in=Item.objects.filter(*[Q(name__icontains=term) for term in terms]).values('pk')) |
+                Q(pk__in=Comment.objects.filter(*[Q(body__icontains=term) for term in terms]).values('requested_item')))
+            indexed = search.search_requested_items(requested_items, query)
+            before = benchmarking.profile_queries({'search': scan}, options['repeat'])['search']
+            after = benchmarking.profile_queries({'search': indexed}, options['repeat'])['search']
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        results = {'before': before, 'after': after}
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(self.style.MIGRATE_HEADING('search for "%s"' % query))
+        for label, result in results.items():
+            self.stdout.write('  %s: median %.2fms, max %.2fms' % (label, result['median_ms'], result['max_ms']))
+            for line in result['plan'].splitlines():
+                self.stdout.write('    %s' % line)
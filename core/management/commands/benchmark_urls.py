@@ -0,0 +1,64 @@
+import json
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core import benchmarking, urls
+from core.models import RequestedItem, Requester
+
+
+class Command(BaseCommand):
+    help = ('Measure latency and query counts of every core URL against throwaway test databases seeded at several '
+            'scales, and compare them with a stored baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1000,10000', help='Comma separated numbers of requested items.')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', help='Compare with results previously written by --output.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed median latency increase over the baseline.')
+
+    def handle(self, *args, **options):
+        names = {pattern.name for pattern in urls.urlpatterns} - set(benchmarking.SKIPPED_URLS)
+        results = {}
+        for scale in [int(scale) for scale in options['scales'].split(',')]:
+            self.stderr.write('Benchmarking at %s requested items...' % scale)
+            results[str(scale)] = self.benchmark(scale, names, options['repeat'])
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            if not os.path.exists(options['baseline']):
+                raise CommandError('Baseline %s does not exist.' % options['baseline'])
+            with open(options['baseline']) as f:
+                regressions = benchmarking.compare_to_baseline(results, json.load(f), options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against %s:\n%s' % (options['baseline'], '\n'.join(regressions)))
+            self.stderr.write(self.style.SUCCESS('No regressions against %s.' % options['baseline']))
+
+    def benchmark(self, scale, names, repeat):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            benchmarking.generate_population(**benchmarking.population_for_scale(scale))
+            requester = Requester.objects.filter(shoppers__isnull=False, requested_items__comments__isnull=False).first()
+            shopper = requester.shoppers.first()
+            requested_item = RequestedItem.objects.filter(requester=requester, comments__isnull=False).order_by(
+                'shopper', 'pk').first()
+            comment = requested_item.comments.first()
+            staff = User.objects.create(username='benchmark-staff', password='!', is_staff=True)
+            benchmarks = benchmarking.url_benchmarks(requester, shopper, requested_item, comment, staff)
+            missing = names - set(benchmarks)
+            if missing:
+                raise CommandError('No benchmark for %s.' % ', '.join(sorted(missing)))
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                return benchmarking.profile_urls(benchmarks, repeat)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import transfer
+from core.management.commands.import_requested_items import format_for_path
+from core.models import RequestedItem, Requester
+
+
+class Command(BaseCommand):
+    help = "Export requested items as CSV or JSON lines, streaming them from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requester', help='Username of the requester to export. Defaults to every requester.')
+        parser.add_argument('--output', help='File to write. Defaults to standard output.')
+        parser.add_argument('--format', choices=sorted(transfer.FORMATS), help='Defaults to the output extension, or csv.')
+
+    def handle(self, *args, **options):
+        requested_items = RequestedItem.objects.all()
+        if options['requester']:
+            requester = Requester.objects.filter(user__username=options['requester']).first()
+            if requester is None:
+                raise CommandError('Requester %s does not exist.' % options['requester'])
+            requested_items = requested_items.for_requester(requester)
+        export_format = options['format'] or format_for_path(options['output'] or '')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(transfer.export_requested_items(requested_items, export_format))
+        else:
+            for chunk in transfer.export_requested_items(requested_items, export_format):
+                self.stdout.write(chunk, ending='')
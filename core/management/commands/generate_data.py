@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import benchmarking
+
+
+class Command(BaseCommand):
+    help = 'Bulk insert a synthetic population of accounts, requesters, shoppers, items, requested items and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requested-items', type=int, default=10000)
+        parser.add_argument('--requesters', type=int, help='Defaults to one per 100 requested items.')
+        parser.add_argument('--shoppers', type=int, help='Defaults to one per 500 requested items.')
+        parser.add_argument('--shoppers-per-requester', type=int)
+        parser.add_argument('--items', type=int, help='Defaults to one per 20 requested items.')
+        parser.add_argument('--comments', type=int, help='Defaults to one per requested item.')
+        parser.add_argument('--accounts', type=int, default=1)
+        parser.add_argument('--claimed-ratio', type=float, default=0.5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        population = benchmarking.population_for_scale(options['requested_items'])
+        for field in population:
+            if options.get(field) is not None:
+                population[field] = options[field]
+        with transaction.atomic():
+            benchmarking.generate_population(claimed_ratio=options['claimed_ratio'], accounts=options['accounts'],
+                                             seed=options['seed'], **population)
+        self.stdout.write(self.style.SUCCESS('Generated %s.' % ', '.join(
+            '%s %s' % (count, field.replace('_', ' ')) for field, count in population.items() if field != 'shoppers_per_requester')))
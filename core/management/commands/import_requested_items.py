@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import transfer
+from core.models import Requester
+
+
+def format_for_path(path, default='csv'):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in transfer.FORMATS else default
+
+
+class Command(BaseCommand):
+    help = "Import requested items for a requester from a CSV or JSON lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Username of the requester.')
+        parser.add_argument('path', help='File to import, with item, quantity and priority columns.')
+        parser.add_argument('--format', choices=sorted(transfer.FORMATS), help='Defaults to the file extension, or csv.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            requester = Requester.objects.get(user__username=options['username'])
+        except Requester.DoesNotExist:
+            raise CommandError('Requester %s does not exist.' % options['username'])
+        import_format = options['format'] or format_for_path(options['path'])
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            result = transfer.import_requested_items(requester, transfer.read_requested_items(stream, import_format),
+                                                     batch_size=options['batch_size'])
+        for line_number, message in result.errors:
+            self.stderr.write('Line %s: %s' % (line_number, message))
+        if result.error_count > len(result.errors):
+            self.stderr.write('... and %s more.' % (result.error_count - len(result.errors)))
+        self.stdout.write(self.style.SUCCESS('Imported %s requested item(s), skipped %s row(s).' % (result.created, result.error_count)))
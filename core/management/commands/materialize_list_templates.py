@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.models import ListTemplate
+
+
+class Command(BaseCommand):
+    help = "Add the items of every due recurring list to its requester's list. Safe to run from several workers at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Templates materialized per transaction.')
+
+    def handle(self, *args, **options):
+        created = ListTemplate.objects.materialize_due(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Created %s requested item(s).' % created))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Item
+
+
+class Command(BaseCommand):
+    help = "Merge duplicate items into one, repointing their requested items."
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', type=int, help='Id of the item to keep.')
+        parser.add_argument('duplicates', type=int, nargs='+', help='Ids of the items to merge into the target and delete.')
+
+    def handle(self, *args, **options):
+        try:
+            target = Item.objects.get(pk=options['target'])
+        except Item.DoesNotExist:
+            raise CommandError('Item %s does not exist.' % options['target'])
+        duplicates = list(Item.objects.filter(pk__in=options['duplicates']).exclude(pk=target.pk))
+        missing = set(options['duplicates']) - {item.pk for item in duplicates} - {target.pk}
+        if missing:
+            raise CommandError('Items %s do not exist.' % ', '.join(map(str, sorted(missing))))
+        repointed = target.merge(duplicates)
+        self.stdout.write(self.style.SUCCESS('Merged %s item(s) into "%s", repointing %s requested item(s).' % (
+            len(duplicates), target, repointed)))
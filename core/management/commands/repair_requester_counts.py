@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Requester
+
+
+class Command(BaseCommand):
+    help = "Recompute the requested item counters stored on each Requester and repair those that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report requesters whose counters drifted.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drifted = list(Requester.objects.with_item_count_drift().values_list('pk', flat=True))
+        self.stdout.write('%s requester(s) with drifted counters.' % len(drifted))
+        if options['dry_run']:
+            return
+        batch_size = options['batch_size']
+        for start in range(0, len(drifted), batch_size):
+            with transaction.atomic():
+                Requester.objects.filter(pk__in=drifted[start:start + batch_size]).select_for_update().recount_items()
+        self.stdout.write(self.style.SUCCESS('Repaired %s requester(s).' % len(drifted)))
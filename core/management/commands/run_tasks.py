@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = "Run queued tasks, polling for new ones until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Tasks taken per transaction.')
+        parser.add_argument('--poll-interval', type=float, default=1, help='Seconds to wait when no task is due.')
+        parser.add_argument('--once', action='store_true', help='Exit once no task is due.')
+        parser.add_argument('--max-seconds', type=float, help='Exit once idle after this long, e.g. to be restarted by cron with new code.')
+
+    def handle(self, *args, **options):
+        run = 0
+        deadline = time.monotonic() + options['max_seconds'] if options['max_seconds'] else None
+        while True:
+            count = tasks.run_due_tasks(batch_size=options['batch_size'])
+            run += count
+            if count:
+                continue
+            if options['once'] or (deadline is not None and time.monotonic() >= deadline):
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('Ran %s task(s).' % run))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import notifications
+
+
+class Command(BaseCommand):
+    help = "Email each user whose digest window has passed their pending claim and comment notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users-per-batch', type=int, default=100, help='Users whose digests are sent per transaction.')
+
+    def handle(self, *args, **options):
+        sent = notifications.send_digests(users_per_batch=options['users_per_batch'])
+        self.stdout.write(self.style.SUCCESS('Sent %s digest(s).' % sent))
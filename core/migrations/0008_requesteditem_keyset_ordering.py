@@ -0,0 +1,17 @@
+# Generated by Django 3.0.6 on 2026-10-17 22:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_auto_20200529_1222'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='requesteditem',
+            options={'ordering': ['-priority', 'id']},
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.0.6 on 2026-10-17 22:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_requesteditem_keyset_ordering'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requesteditem',
+            index=models.Index(fields=['requester', '-priority', 'id'], name='requesteditem_requester_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requesteditem',
+            index=models.Index(fields=['shopper', '-priority', 'id'], name='requesteditem_shopper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requesteditem',
+            index=models.Index(condition=models.Q(shopper__isnull=True), fields=['requester', '-priority', 'id'], name='requesteditem_unclaimed_idx'),
+        ),
+        migrations.AlterField(
+            model_name='requesteditem',
+            name='requester',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='requested_items', to='core.Requester'),
+        ),
+        migrations.AlterField(
+            model_name='requesteditem',
+            name='shopper',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='assigned_items', to='core.Shopper'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.6 on 2026-10-17 22:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_requesteditem_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requesteditem',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='requester',
+            name='items_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='requester',
+            name='items_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
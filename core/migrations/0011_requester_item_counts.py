@@ -0,0 +1,47 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:00
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+HIGH_PRIORITY = 2
+
+
+def count_requested_items(apps, schema_editor):
+    Requester = apps.get_model('core', 'Requester')
+    RequestedItem = apps.get_model('core', 'RequestedItem')
+    requested_items = RequestedItem.objects.filter(requester=models.OuterRef('pk')).order_by().values('requester')
+
+    def count(**filters):
+        return Coalesce(models.Subquery(requested_items.filter(**filters).annotate(count=models.Count('pk')).values('count')), 0)
+
+    Requester.objects.update(
+        open_items_count=count(shopper__isnull=True),
+        claimed_items_count=count(shopper__isnull=False),
+        high_priority_open_items_count=count(shopper__isnull=True, priority=HIGH_PRIORITY),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_requested_item_change_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requester',
+            name='claimed_items_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='requester',
+            name='high_priority_open_items_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='requester',
+            name='open_items_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_requested_items, migrations.RunPython.noop),
+    ]
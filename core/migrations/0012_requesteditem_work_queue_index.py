@@ -0,0 +1,17 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_requester_item_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requesteditem',
+            index=models.Index(condition=models.Q(shopper__isnull=True), fields=['-priority', 'id'], name='requesteditem_queue_idx'),
+        ),
+    ]
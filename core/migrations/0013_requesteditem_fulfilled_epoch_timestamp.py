@@ -0,0 +1,18 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_requesteditem_work_queue_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requesteditem',
+            name='fulfilled_epoch_timestamp',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
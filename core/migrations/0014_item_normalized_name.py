@@ -0,0 +1,38 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:10
+
+from django.db import migrations, models
+
+
+def normalize_item_name(name):
+    return ' '.join(name.split()).casefold()[:300]
+
+
+def merge_duplicate_items(apps, schema_editor):
+    Item = apps.get_model('core', 'Item')
+    RequestedItem = apps.get_model('core', 'RequestedItem')
+    kept = {}
+    for item in Item.objects.order_by('pk').iterator():
+        normalized_name = normalize_item_name(item.name)
+        if normalized_name in kept:
+            RequestedItem.objects.filter(item=item).update(item=kept[normalized_name])
+            item.delete()
+        else:
+            kept[normalized_name] = item
+            Item.objects.filter(pk=item.pk).update(normalized_name=normalized_name)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_requesteditem_fulfilled_epoch_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=300, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+    ]
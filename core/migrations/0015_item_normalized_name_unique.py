@@ -0,0 +1,30 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:10
+
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute('CREATE INDEX core_item_normalized_name_trgm ON core_item USING gin (normalized_name gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_item_normalized_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_item_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=300, unique=True),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
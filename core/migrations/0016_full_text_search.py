@@ -0,0 +1,38 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:20
+
+from django.db import migrations
+
+FTS_TABLES = [
+    ('core_item', 'name', 'core_item_fts'),
+    ('core_comment', 'body', 'core_comment_fts'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, column, fts_table in FTS_TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute("CREATE INDEX %s ON %s USING gin (to_tsvector('english', %s))" % (fts_table, table, column))
+        elif vendor == 'sqlite':
+            schema_editor.execute("CREATE VIRTUAL TABLE %s USING fts5(%s, tokenize='porter unicode61')" % (fts_table, column))
+            schema_editor.execute('INSERT INTO %s (rowid, %s) SELECT id, %s FROM %s' % (fts_table, column, column, table))
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, column, fts_table in FTS_TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute('DROP INDEX IF EXISTS %s' % fts_table)
+        elif vendor == 'sqlite':
+            schema_editor.execute('DROP TABLE IF EXISTS %s' % fts_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_item_normalized_name_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['-created', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['requested_item', '-created', '-id'], name='comment_thread_idx'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='requested_item',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.RequestedItem'),
+        ),
+    ]
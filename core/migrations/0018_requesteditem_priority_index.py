@@ -0,0 +1,17 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_comment_thread_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requesteditem',
+            index=models.Index(fields=['-priority', 'id'], name='requesteditem_priority_idx'),
+        ),
+    ]
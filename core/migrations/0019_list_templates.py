@@ -0,0 +1,39 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:20
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_requesteditem_priority_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListTemplate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('interval_days', models.PositiveIntegerField(choices=[(1, 'Daily'), (7, 'Weekly'), (14, 'Fortnightly')], default=7)),
+                ('next_run', models.DateTimeField(db_index=True)),
+                ('last_run', models.DateTimeField(blank=True, null=True)),
+                ('requester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='list_templates', to='core.Requester')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ListTemplateItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('priority', models.IntegerField(choices=[(0, 'Low'), (1, 'Medium'), (2, 'High')], default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Item')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='core.ListTemplate')),
+            ],
+            options={
+                'unique_together': {('template', 'item')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.6 on 2026-10-17 23:57
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_notifications'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='requesteditem',
+            name='requesteditem_queue_idx',
+        ),
+    ]
@@ -1,12 +1,27 @@
+import collections
+import datetime
+import functools
+import operator
 import uuid
 from django.utils import timezone
 from urllib.parse import urljoin
 
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce, Greatest
+from django.dispatch import Signal
 from django.conf import settings
-from django.urls import reverse
+
+from core.aggregates import GroupConcat
+from core.utils import memoized_reverse, ngram_similarity, ngrams, normalize_item_name
+
+
+# Sent whenever requested items, or their comments, change. Receives requester_ids,
+# requested_item_ids, action (one of the RequestedItem action constants) and, when the
+# requester counters move, count_changes (see item_count_changes).
+requested_items_changed = Signal()
 
 
 class Account(models.Model):
@@ -29,95 +44,567 @@ class Profile(models.Model):
 
     @classmethod
     def user_is_requester(cls, user):
-        return hasattr(user, cls.REQUESTER)
+        # Answered from the cached relationships, invalidated by core.signals when profiles change.
+        from core.permissions import cached_relationships
+        return cached_relationships(user)['requester_id'] is not None
 
     @classmethod
     def user_is_shopper(cls, user):
-        return hasattr(user, cls.SHOPPER)
+        from core.permissions import cached_relationships
+        return cached_relationships(user)['shopper_id'] is not None
 
     class Meta:
         abstract = True
 
 
 class Shopper(Profile):
+    ALREADY_HELD = 'held'
 
     def claim_requested_item(self, requested_item):
-        requested_item.shopper = self
-        requested_item.claimed_epoch_timestamp = timezone.now().timestamp()
-        requested_item.save()
+        claimed_epoch_timestamp = int(timezone.now().timestamp())
+        # Matching the loaded requester and priority pins the claimed row's prior state, so the counter change
+        # needs no locking read. A concurrent change to either fails the claim, like a concurrent claim.
+        stored = (requested_item.requester_id, None, requested_item.priority)
+        claimed = RequestedItem.objects.filter(pk=requested_item.pk, requester=requested_item.requester_id,
+                                               priority=requested_item.priority).claim(self, claimed_epoch_timestamp)
+        if claimed:
+            requested_item.shopper = self
+            requested_item.claimed_epoch_timestamp = claimed_epoch_timestamp
+            requested_items_changed.send(sender=RequestedItem, requester_ids={requested_item.requester_id},
+                                         requested_item_ids=[requested_item.pk], action=RequestedItem.CLAIMED,
+                                         count_changes=item_count_changes(removed=[stored], added=[requested_item.counted_row]))
+        return bool(claimed)
+
+    def claim_requested_items(self, requested_items):
+        """
+        Claim the unclaimed `requested_items`. Maps each claimed pk to CLAIMED and each pk this shopper already
+        held to ALREADY_HELD.
+        """
+        claimed_epoch_timestamp = int(timezone.now().timestamp())
+        results = dict.fromkeys(requested_items.filter(shopper=self).values_list('pk', flat=True), self.ALREADY_HELD)
+        claimed = self.change_requested_items(requested_items.unclaimed(), RequestedItem.CLAIMED,
+                                              lambda claimable: claimable.claim(self, claimed_epoch_timestamp), self.pk)
+        results.update(dict.fromkeys(claimed, RequestedItem.CLAIMED))
+        return results
+
+    def release_requested_items(self, requested_items):
+        """
+        Release the `requested_items` this shopper holds. Maps each released pk to RELEASED.
+        """
+        released = self.change_requested_items(requested_items.filter(shopper=self), RequestedItem.RELEASED,
+                                               lambda releasable: releasable.release(self), None)
+        return dict.fromkeys(released, RequestedItem.RELEASED)
+
+    def fulfil_requested_items(self, requested_items):
+        """
+        Fulfil the unfulfilled requested items this shopper holds. Returns the number fulfilled.
+        """
+        fulfilled_epoch_timestamp = int(timezone.now().timestamp())
+        return len(self.change_requested_items(requested_items.filter(shopper=self).unfulfilled(), RequestedItem.FULFILLED,
+                                               lambda fulfillable: fulfillable.fulfil(self, fulfilled_epoch_timestamp), self.pk))
+
+    def change_requested_items(self, requested_items, action, change, shopper_id):
+        """
+        Lock `requested_items`, apply `change` to them and announce the change, moving the requester counters
+        from their current shopper to `shopper_id`. Returns the pks of the requested items changed.
+        """
+        with transaction.atomic():
+            rows = list(requested_items.select_for_update().values_list('pk', 'requester_id', 'shopper_id', 'priority'))
+            changed = change(RequestedItem.objects.filter(pk__in=[pk for pk, _, _, _ in rows])) if rows else 0
+            if changed:
+                requested_items_changed.send(
+                    sender=RequestedItem, requester_ids={requester_id for _, requester_id, _, _ in rows},
+                    requested_item_ids=[pk for pk, _, _, _ in rows], action=action,
+                    count_changes=item_count_changes(removed=[row[1:] for row in rows],
+                                                     added=[(requester_id, shopper_id, priority) for _, requester_id, _, priority in rows]))
+        return [pk for pk, _, _, _ in rows] if changed else []
 
     def __str__(self):
         return 'Shopper - %s' % self.user.username
 
 
+def requested_item_counts():
+    """
+    Correlated subqueries counting each requester's requested items, keyed by Requester counter field.
+    """
+    requested_items = RequestedItem.objects.filter(requester=models.OuterRef('pk')).order_by().values('requester')
+
+    def count(**filters):
+        return Coalesce(models.Subquery(requested_items.filter(**filters).annotate(count=models.Count('pk')).values('count')), 0)
+
+    return {
+        'open_items_count': count(shopper__isnull=True),
+        'claimed_items_count': count(shopper__isnull=False),
+        'high_priority_open_items_count': count(shopper__isnull=True, priority=RequestedItem.HIGH),
+    }
+
+
+def item_count_changes(removed=(), added=()):
+    """
+    Change to each requester's counters when the `removed` requested items, given as
+    (requester id, shopper id, priority) rows, are replaced by the `added` ones.
+    """
+    changes = {}
+    for sign, rows in ((-1, removed), (1, added)):
+        for requester_id, shopper_id, priority in rows:
+            counts = changes.setdefault(requester_id, collections.Counter())
+            if shopper_id is not None:
+                counts['claimed_items_count'] += sign
+            else:
+                counts['open_items_count'] += sign
+                if priority == RequestedItem.HIGH:
+                    counts['high_priority_open_items_count'] += sign
+    return {requester_id: {field: change for field, change in counts.items() if change} for requester_id, counts in changes.items()}
+
+
+class RequesterQueryset(models.QuerySet):
+    def touch_items(self):
+        return self.update(items_version=models.F('items_version') + 1, items_modified=timezone.now())
+
+    def move_counters(self, count_changes):
+        """
+        Add `count_changes`, as returned by item_count_changes, to the counters, with one UPDATE per distinct change.
+        """
+        groups = {}
+        for requester_id, changes in count_changes.items():
+            if changes:
+                groups.setdefault(tuple(sorted(changes.items())), []).append(requester_id)
+        moved = 0
+        for changes, ids in groups.items():
+            # Never below zero, should the counters have drifted.
+            moved += self.filter(pk__in=ids).update(**{field: Greatest(models.F(field) + change, 0) for field, change in changes})
+        return moved
+
+    def recount_items(self):
+        return self.update(**requested_item_counts())
+
+    def with_item_count_drift(self):
+        counts = requested_item_counts()
+        drift = models.Q()
+        for field in counts:
+            drift |= ~models.Q(**{field: models.F('actual_%s' % field)})
+        return self.annotate(**{'actual_%s' % field: expression for field, expression in counts.items()}).filter(drift)
+
+
 class Requester(Profile):
+    objects = models.Manager.from_queryset(RequesterQueryset)()
     shoppers = models.ManyToManyField(Shopper, blank=True, null=True, related_name='requesters')
     invite_token = models.CharField(default=uuid.uuid4, max_length=200)
+    # Bumped whenever any of the requester's items or their comments change, see core.signals.
+    items_version = models.PositiveIntegerField(default=0)
+    items_modified = models.DateTimeField(default=timezone.now)
+    # Maintained alongside items_version, repaired by the repair_requester_counts command.
+    open_items_count = models.PositiveIntegerField(default=0)
+    claimed_items_count = models.PositiveIntegerField(default=0)
+    high_priority_open_items_count = models.PositiveIntegerField(default=0)
 
     def add_shopper(self, shopper):
         self.shoppers.add(shopper)
         self.invite_token = uuid.uuid4()
-        self.save()
+        # Only the token: the instance may hold stale items_version and counters.
+        self.save(update_fields=['invite_token'])
 
     def remove_shopper(self, shopper):
         self.shoppers.remove(shopper)
-        self.save()
+
+    @property
+    def last_activity(self):
+        return self.items_modified
 
     @property
     def invite_link(self):
-        return urljoin(settings.SITE_URL, reverse('core:add-shopper', kwargs={'pk': self.pk, 'invite_token': self.invite_token}))
+        return urljoin(settings.SITE_URL, memoized_reverse('core:add-shopper', pk=self.pk, invite_token=self.invite_token))
 
     def __str__(self):
         return 'Requester - %s' % self.user.username
 
 
+class ItemQueryset(models.QuerySet):
+    def get_or_create_by_name(self, name):
+        return self.get_or_create(normalized_name=normalize_item_name(name), defaults={'name': ' '.join(name.split())})
+
+    def ids_by_normalized_name(self, names):
+        """
+        Map the normalized form of each name to its item id, bulk creating the missing items.
+        Returns the map and the created items, which skipped post_save and so are not yet indexed for search.
+        """
+        names = {normalize_item_name(name): ' '.join(name.split()) for name in names}
+        ids = dict(self.filter(normalized_name__in=names).values_list('normalized_name', 'pk'))
+        missing = [normalized for normalized in names if normalized not in ids]
+        if not missing:
+            return ids, []
+        self.bulk_create([self.model(name=names[normalized], normalized_name=normalized) for normalized in missing], ignore_conflicts=True)
+        created = list(self.filter(normalized_name__in=missing))
+        ids.update((item.normalized_name, item.pk) for item in created)
+        return ids, created
+
+    def with_prefix(self, prefix):
+        # On PostgreSQL the unique field also gets a pattern_ops index, which serves this LIKE under any collation.
+        return self.filter(normalized_name__startswith=prefix)
+
+    def similar_to(self, name, limit, min_similarity=0.3):
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import TrigramSimilarity
+            return list(self.annotate(similarity=TrigramSimilarity('normalized_name', name)).filter(
+                similarity__gte=min_similarity).order_by('-similarity', 'normalized_name')[:limit])
+        # Only rows sharing a trigram with the name are fetched and scored.
+        candidates = self.filter(functools.reduce(operator.or_, [
+            models.Q(normalized_name__contains=ngram.strip()) for ngram in ngrams(name) if ngram.strip()]))
+        scored = [(ngram_similarity(name, item.normalized_name), item) for item in candidates.only('name', 'normalized_name')]
+        scored = [(similarity, item) for similarity, item in scored if similarity >= min_similarity]
+        return [item for similarity, item in sorted(scored, key=lambda pair: (-pair[0], pair[1].normalized_name))[:limit]]
+
+    def typeahead(self, query, limit=10):
+        """
+        Items whose normalized name starts with the query, then the most similar other items.
+        """
+        query = normalize_item_name(query)
+        if not query:
+            return []
+        items = list(self.with_prefix(query).order_by('normalized_name')[:limit])
+        if len(items) < limit:
+            items += self.exclude(pk__in=[item.pk for item in items]).similar_to(query, limit - len(items))
+        return items
+
+
 class Item(models.Model):
+    objects = models.Manager.from_queryset(ItemQueryset)()
     name = models.CharField(max_length=300)
+    normalized_name = models.CharField(max_length=300, unique=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_item_name(self.name)
+        super(Item, self).save(*args, **kwargs)
+
+    def validate_unique(self, exclude=None):
+        super(Item, self).validate_unique(exclude)
+        # normalized_name is not editable, so model forms leave it out of their checks.
+        if 'name' not in (exclude or []) and Item.objects.filter(normalized_name=normalize_item_name(self.name)).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': 'An item with this name already exists.'})
+
+    def merge(self, items):
+        """
+        Repoint the requested items and list template items of `items` to this item and delete them.
+        """
+        with transaction.atomic():
+            items = Item.objects.filter(pk__in=[item.pk for item in items]).exclude(pk=self.pk)
+            requested_items = RequestedItem.objects.filter(item__in=items)
+            changed = list(requested_items.values_list('pk', 'requester_id'))
+            requested_items.update(item=self, modified=timezone.now())
+            self.merge_list_template_items(items)
+            items.delete()
+            if changed:
+                requested_items_changed.send(sender=RequestedItem, requester_ids={requester_id for pk, requester_id in changed},
+                                             requested_item_ids=[pk for pk, requester_id in changed], action=RequestedItem.UPDATED)
+        return len(changed)
+
+    def merge_list_template_items(self, items):
+        # A template keeps one entry per item, so entries for the same template are folded into one.
+        duplicates = list(ListTemplateItem.objects.filter(item__in=items).order_by('id'))
+        kept = {template_item.template_id: template_item for template_item in
+                ListTemplateItem.objects.filter(item=self, template__in={template_item.template_id for template_item in duplicates})}
+        folded = []
+        for template_item in duplicates:
+            if template_item.template_id in kept:
+                into = kept[template_item.template_id]
+                into.quantity += template_item.quantity
+                into.priority = max(into.priority, template_item.priority)
+                folded.append(template_item.pk)
+            else:
+                template_item.item = self
+                kept[template_item.template_id] = template_item
+        ListTemplateItem.objects.filter(pk__in=folded).delete()
+        ListTemplateItem.objects.bulk_update(list(kept.values()), ['item', 'quantity', 'priority'])
 
     def __str__(self):
         return '%s' % self.name
 
 
 class RequestedItemQueryset(models.QuerySet):
+    table_fields = ['id', 'requester', 'shopper', 'item', 'item__name', 'quantity', 'priority', 'claimed_epoch_timestamp',
+                    'modified']
+
     def for_user(self, user):
         return self.filter(requester__user=user)
 
+    def bulk_create_with_pks(self, requested_items):
+        """
+        bulk_create `requested_items`, re-selecting their pks where the backend does not return them. Call within
+        a transaction: on those backends (SQLite) it holds the write lock, so the batch is the newest rows.
+        """
+        requested_items = self.bulk_create(requested_items)
+        if requested_items and requested_items[0].pk is None:
+            pks = reversed(self.model.objects.order_by('-pk').values_list('pk', flat=True)[:len(requested_items)])
+            for requested_item, pk in zip(requested_items, pks):
+                requested_item.pk = pk
+        return requested_items
+
+    def for_requester(self, requester):
+        return self.filter(requester=requester)
+
+    def for_table(self):
+        return self.select_related('item').only(*self.table_fields)
+
+    def work_queue(self, requester_ids):
+        """
+        Unclaimed items of the given requesters, most urgent and then oldest first.
+        """
+        return self.filter(requester__in=requester_ids).unclaimed().order_by('-priority', 'id')
+
+    def for_work_queue(self):
+        return self.select_related('item', 'requester__user').only(*self.table_fields, 'requester__user__username')
+
+    def totals_by_item(self):
+        return self.order_by().values('item', 'item__name').annotate(
+            total_quantity=models.Sum('quantity'), requested_items=models.Count('pk'), priority=models.Max('priority'),
+        ).order_by('-priority', 'item__name')
+
+    def unclaimed(self):
+        return self.filter(shopper__isnull=True)
+
+    def claim(self, shopper, claimed_epoch_timestamp):
+        # A single conditional UPDATE, so concurrent claims cannot both win or overwrite other columns.
+        return self.unclaimed().update(shopper=shopper, claimed_epoch_timestamp=claimed_epoch_timestamp,
+                                       modified=timezone.now())
+
+    def release(self, shopper):
+        return self.filter(shopper=shopper).update(shopper=None, claimed_epoch_timestamp=None, fulfilled_epoch_timestamp=None,
+                                                   modified=timezone.now())
+
+    def unfulfilled(self):
+        return self.filter(fulfilled_epoch_timestamp__isnull=True)
+
+    def fulfil(self, shopper, fulfilled_epoch_timestamp):
+        return self.filter(shopper=shopper).unfulfilled().update(fulfilled_epoch_timestamp=fulfilled_epoch_timestamp,
+                                                                 modified=timezone.now())
+
+    def shopping_list(self):
+        """
+        One row per item with the summed quantity, highest priority and usernames of the requesters wanting it.
+        """
+        return self.order_by().values('item', 'item__name').annotate(
+            total_quantity=models.Sum('quantity'), priority=models.Max('priority'),
+            requesters=GroupConcat('requester__user__username'),
+        ).order_by('-priority', 'item__name')
+
 
 class RequestedItem(models.Model):
     LOW = 0
     MEDIUM = 1
     HIGH = 2
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    CLAIMED = 'claimed'
+    RELEASED = 'released'
+    FULFILLED = 'fulfilled'
+    COMMENTED = 'commented'
+    COMMENT_UPDATED = 'comment_updated'
+    COMMENT_DELETED = 'comment_deleted'
     priority_levels = (
         (LOW, 'Low'),
         (MEDIUM, 'Medium'),
         (HIGH, 'High')
     )
+    priority_names = dict(priority_levels)
     objects = models.Manager.from_queryset(RequestedItemQueryset)()
-    requester = models.ForeignKey(Requester, on_delete=models.CASCADE, related_name='requested_items')
-    shopper = models.ForeignKey(Shopper, on_delete=models.CASCADE, blank=True, null=True, related_name='assigned_items')
+    # Both foreign keys are covered by the leading column of the composite indexes below.
+    requester = models.ForeignKey(Requester, on_delete=models.CASCADE, related_name='requested_items', db_index=False)
+    shopper = models.ForeignKey(Shopper, on_delete=models.CASCADE, blank=True, null=True, related_name='assigned_items', db_index=False)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
     priority = models.IntegerField(choices=priority_levels, max_length=100)
     claimed_epoch_timestamp = models.BigIntegerField(blank=True, null=True)
+    fulfilled_epoch_timestamp = models.BigIntegerField(blank=True, null=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        # The requester counters move from the stored row to the saved one. Locking it until the save commits keeps
+        # a concurrent claim from changing it in between.
+        with transaction.atomic():
+            self._stored_counted_row = None if self._state.adding else RequestedItem.objects.select_for_update().filter(
+                pk=self.pk).values_list('requester_id', 'shopper_id', 'priority').first()
+            super(RequestedItem, self).save(*args, **kwargs)
 
     @property
     def is_claimed(self):
-        return self.shopper is not None
+        return self.shopper_id is not None
     
     @property
     def priority_string(self):
-        return dict((key, value) for key, value in self.priority_levels)[self.priority]
+        return self.priority_names[self.priority]
+
+    @property
+    def counted_row(self):
+        # What the requester counters depend on, as taken by item_count_changes.
+        return self.requester_id, self.shopper_id, self.priority
     
     class Meta:
-        ordering = ['-priority']
+        ordering = ['-priority', 'id']
+        indexes = [
+            models.Index(fields=['requester', '-priority', 'id'], name='requesteditem_requester_idx'),
+            models.Index(fields=['shopper', '-priority', 'id'], name='requesteditem_shopper_idx'),
+            models.Index(fields=['requester', '-priority', 'id'], name='requesteditem_unclaimed_idx',
+                         condition=models.Q(shopper__isnull=True)),
+            # Serves the admin changelist, filtered by priority or not, in its default order.
+            models.Index(fields=['-priority', 'id'], name='requesteditem_priority_idx'),
+        ]
 
 
 class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
-    requested_item = models.ForeignKey(RequestedItem, on_delete=models.CASCADE, related_name='comments')
+    # Covered by the leading column of the thread index below.
+    requested_item = models.ForeignKey(RequestedItem, on_delete=models.CASCADE, related_name='comments', db_index=False)
     body = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-created']
+        ordering = ['-created', '-id']
+        indexes = [
+            models.Index(fields=['requested_item', '-created', '-id'], name='comment_thread_idx'),
+        ]
+
+
+class ListTemplateQueryset(models.QuerySet):
+    def due(self, now):
+        return self.filter(next_run__lte=now)
+
+    def materialize_due(self, now=None, batch_size=100):
+        """
+        Add the items of every due template to its requester's list, a batch of templates at a time, and
+        schedule each template's next run. Returns the number of requested items created.
+
+        Each batch is locked, skipping templates locked by other workers, and rescheduled in the same
+        transaction, so a template is materialized once per period however many workers run.
+        """
+        now = now or timezone.now()
+        created = 0
+        while True:
+            with transaction.atomic():
+                templates = list(self.due(now).order_by('next_run', 'id').select_for_update(skip_locked=True)
+                                 .prefetch_related('items')[:batch_size])
+                if not templates:
+                    return created
+                created += ListTemplate.materialize(templates, now)
+
+
+class ListTemplate(models.Model):
+    DAILY = 1
+    WEEKLY = 7
+    FORTNIGHTLY = 14
+    intervals = (
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+        (FORTNIGHTLY, 'Fortnightly'),
+    )
+    objects = models.Manager.from_queryset(ListTemplateQueryset)()
+    requester = models.ForeignKey(Requester, on_delete=models.CASCADE, related_name='list_templates')
+    name = models.CharField(max_length=200)
+    interval_days = models.PositiveIntegerField(choices=intervals, default=WEEKLY)
+    next_run = models.DateTimeField(db_index=True)
+    last_run = models.DateTimeField(blank=True, null=True)
+
+    def next_occurrence(self, now):
+        # A template that missed several periods runs once and resumes on its schedule.
+        interval = datetime.timedelta(days=self.interval_days)
+        return self.next_run + interval * ((now - self.next_run) // interval + 1)
+
+    @classmethod
+    def materialize(cls, templates, now):
+        """
+        Create the requested items of `templates`, skipping items their requester is still waiting for,
+        and reschedule them. Call within a transaction holding the templates' locks.
+        """
+        requester_ids = {template.requester_id for template in templates}
+        waiting = set(RequestedItem.objects.filter(requester__in=requester_ids).unfulfilled().values_list('requester_id', 'item_id'))
+        requested_items = []
+        for template in templates:
+            for template_item in template.items.all():
+                if (template.requester_id, template_item.item_id) not in waiting:
+                    waiting.add((template.requester_id, template_item.item_id))
+                    requested_items.append(RequestedItem(requester_id=template.requester_id, item_id=template_item.item_id,
+                                                         quantity=template_item.quantity, priority=template_item.priority))
+            template.last_run = now
+            template.next_run = template.next_occurrence(now)
+        RequestedItem.objects.bulk_create_with_pks(requested_items)
+        cls.objects.bulk_update(templates, ['last_run', 'next_run'])
+        if requested_items:
+            # bulk_create skips post_save, so announce the batch at once.
+            requested_items_changed.send(sender=RequestedItem, requester_ids={requested_item.requester_id for requested_item in requested_items},
+                                         requested_item_ids=[requested_item.pk for requested_item in requested_items],
+                                         action=RequestedItem.CREATED,
+                                         count_changes=item_count_changes(added=[requested_item.counted_row for requested_item in requested_items]))
+        return len(requested_items)
+
+    def __str__(self):
+        return self.name
+
+
+class ListTemplateItem(models.Model):
+    template = models.ForeignKey(ListTemplate, on_delete=models.CASCADE, related_name='items')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    priority = models.IntegerField(choices=RequestedItem.priority_levels, default=RequestedItem.LOW)
+
+    class Meta:
+        unique_together = [('template', 'item')]
+
+
+class Task(models.Model):
+    """
+    Deferred work queued by core.tasks.enqueue and run by the run_tasks worker.
+    """
+    name = models.CharField(max_length=100)
+    payload = models.TextField()
+    # Queuing a task whose key is already waiting is a no-op. Cleared once a worker takes the task.
+    dedupe_key = models.CharField(max_length=200, unique=True, blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_after', 'id'], name='task_due_idx', condition=models.Q(failed=False)),
+        ]
+
+    def __str__(self):
+        return '%s #%s' % (self.name, self.pk)
+
+
+class NotificationPreference(models.Model):
+    NEVER = 0
+    EVERY_15_MINUTES = 15
+    HOURLY = 60
+    DAILY = 60 * 24
+    digest_windows = (
+        (EVERY_15_MINUTES, 'Every 15 minutes'),
+        (HOURLY, 'Hourly'),
+        (DAILY, 'Daily'),
+        (NEVER, 'Never'),
+    )
+    # In minutes, for users without preferences too.
+    DEFAULT_DIGEST_WINDOW = HOURLY
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_preference')
+    digest_window = models.PositiveIntegerField(choices=digest_windows, default=DEFAULT_DIGEST_WINDOW)
+    claims = models.BooleanField(default=True, help_text='When a shopper claims one of your items.')
+    comments = models.BooleanField(default=True, help_text='When someone comments on an item you requested or claimed.')
+
+
+class Notification(models.Model):
+    """
+    An event waiting to be sent to `user` in their next digest, see core.notifications.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications', db_index=False)
+    action = models.CharField(max_length=20)
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    requested_item = models.ForeignKey(RequestedItem, on_delete=models.CASCADE, related_name='+')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created'], name='notification_pending_idx'),
+        ]
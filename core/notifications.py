@@ -0,0 +1,118 @@
+import datetime
+import itertools
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.db.models import Min
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core import tasks
+from core.models import Comment, Notification, NotificationPreference, RequestedItem
+from core.utils import batched, memoized_reverse
+
+PREFERENCE_FIELDS = {
+    RequestedItem.CLAIMED: 'claims',
+    RequestedItem.COMMENTED: 'comments',
+}
+
+
+def claim_notifications(requested_item_ids):
+    requested_items = RequestedItem.objects.filter(pk__in=requested_item_ids, shopper__isnull=False)
+    for pk, user_id, actor_id in requested_items.values_list('pk', 'requester__user_id', 'shopper__user_id'):
+        yield Notification(user_id=user_id, action=RequestedItem.CLAIMED, actor_id=actor_id, requested_item_id=pk)
+
+
+def comment_notifications(comment_ids):
+    comments = Comment.objects.filter(pk__in=comment_ids).values_list(
+        'pk', 'author_id', 'requested_item_id', 'requested_item__requester__user_id', 'requested_item__shopper__user_id')
+    for pk, author_id, requested_item_id, requester_user_id, shopper_user_id in comments:
+        for user_id in {requester_user_id, shopper_user_id} - {None, author_id}:
+            yield Notification(user_id=user_id, action=RequestedItem.COMMENTED, actor_id=author_id, requested_item_id=requested_item_id,
+                               comment_id=pk)
+
+
+@tasks.handler('record_notifications')
+def record_notifications(payloads):
+    """
+    Store the notifications for a batch of claims and comments, leaving out those their users opted out of.
+    """
+    notifications = list(itertools.chain(
+        claim_notifications([pk for payload in payloads if payload['action'] == RequestedItem.CLAIMED for pk in payload['requested_items']]),
+        comment_notifications([payload['comment'] for payload in payloads if payload['action'] == RequestedItem.COMMENTED]),
+    ))
+    preferences = NotificationPreference.objects.in_bulk({notification.user_id for notification in notifications}, field_name='user_id')
+    Notification.objects.bulk_create([
+        notification for notification in notifications
+        if notification.user_id not in preferences or (
+            preferences[notification.user_id].digest_window != NotificationPreference.NEVER and
+            getattr(preferences[notification.user_id], PREFERENCE_FIELDS[notification.action]))
+    ])
+
+
+def queue_notifications(action, requested_item_ids, comment=None):
+    if action == RequestedItem.CLAIMED:
+        tasks.enqueue('record_notifications', {'action': action, 'requested_items': list(requested_item_ids)})
+    elif action == RequestedItem.COMMENTED:
+        tasks.enqueue('record_notifications', {'action': action, 'comment': comment.pk})
+
+
+def due_users(now):
+    """
+    Ids of the users whose oldest pending notification is older than their digest window.
+    """
+    oldest = dict(Notification.objects.order_by().values('user').annotate(oldest=Min('created')).values_list('user', 'oldest'))
+    windows = dict(NotificationPreference.objects.filter(user__in=oldest).values_list('user', 'digest_window'))
+    return [user_id for user_id, created in oldest.items()
+            if created <= now - datetime.timedelta(minutes=windows.get(user_id, NotificationPreference.DEFAULT_DIGEST_WINDOW))]
+
+
+def requested_item_url(requested_item_id):
+    return urljoin(settings.SITE_URL or '', memoized_reverse('core:requested-item-detail', pk=requested_item_id))
+
+
+def digest_message(user, notifications, connection):
+    claims = {}
+    for notification in notifications:
+        if notification.action == RequestedItem.CLAIMED:
+            claims.setdefault(notification.actor.username, []).append(notification.requested_item.item.name)
+    comments = [{
+        'author': notification.actor.username,
+        'item': notification.requested_item.item.name,
+        'body': notification.comment.body,
+        'url': requested_item_url(notification.requested_item_id),
+    } for notification in notifications if notification.action == RequestedItem.COMMENTED]
+    body = render_to_string('core/notification/digest.txt', {
+        'user': user, 'claims': sorted(claims.items()), 'comments': comments,
+        'preferences_url': urljoin(settings.SITE_URL or '', memoized_reverse('core:notification-preferences')),
+    })
+    return mail.EmailMessage('%s update(s) on your shopping' % len(notifications), body, to=[user.email], connection=connection)
+
+
+def send_digests(now=None, users_per_batch=100):
+    """
+    Send each due user one email with their pending notifications, a batch of users per transaction,
+    over a single mail connection. Returns the number of emails sent.
+    """
+    now = now or timezone.now()
+    due = due_users(now)
+    if not due:
+        return 0
+    sent = 0
+    connection = mail.get_connection()
+    with connection:
+        for user_ids in batched(due, users_per_batch):
+            with transaction.atomic():
+                notifications = list(Notification.objects.filter(user__in=user_ids, created__lte=now).order_by('user', 'created')
+                                     .select_for_update(skip_locked=True, of=('self',))
+                                     .select_related('user', 'actor', 'requested_item__item', 'comment'))
+                messages = [digest_message(user, list(user_notifications), connection)
+                            for user, user_notifications in itertools.groupby(notifications, key=lambda notification: notification.user)
+                            if user.email]
+                if messages:
+                    connection.send_messages(messages)
+                Notification.objects.filter(pk__in=[notification.pk for notification in notifications]).delete()
+            sent += len(messages)
+    return sent
@@ -0,0 +1,102 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder rounds to milliseconds, which would skip rows created within the same millisecond.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super(CursorEncoder, self).default(o)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=CursorEncoder).encode()).decode()
+
+
+def decode_cursor(cursor, fields):
+    """
+    The values in `cursor`, converted to the types of the model `fields` they were taken from.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor(cursor)
+    try:
+        values = [field.to_python(value) for field, value in zip(fields, values)]
+    except (TypeError, ValueError, ValidationError):
+        raise InvalidCursor(cursor)
+    if None in values:
+        raise InvalidCursor(cursor)
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+    Rows strictly after `values` in `ordering`, e.g. for ('-priority', 'id'):
+    priority < p OR (priority = p AND id > i).
+    """
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = '%s__%s' % (name, 'lt' if field.startswith('-') else 'gt')
+        equal = {previous.lstrip('-'): value for previous, value in zip(ordering[:position], values[:position])}
+        condition |= Q(**equal, **{lookup: values[position]})
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, object_list, cursor, next_cursor):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a unique, non-nullable ordering. The cursor encodes
+    the ordering values of the last row of a page, so fetching any page costs
+    the same index range scan as the first one.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = ordering
+        self.per_page = per_page
+
+    def key(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def page(self, cursor=None):
+        queryset = self.queryset
+        if cursor:
+            fields = [self.queryset.model._meta.get_field(field.lstrip('-')) for field in self.ordering]
+            queryset = queryset.filter(keyset_filter(self.ordering, decode_cursor(cursor, fields)))
+        object_list = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = encode_cursor(self.key(object_list[-1]))
+        return KeysetPage(object_list, cursor, next_cursor)
@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from core.models import Comment, RequestedItem, Requester, Shopper
+
+
+NO_RELATIONSHIPS = {
+    'requester_id': None,
+    'shopper_id': None,
+    'shopper_ids': frozenset(),
+    'requester_ids': frozenset(),
+}
+
+
+def permissions_cache_key(user_id):
+    return 'core:permissions:%s' % user_id
+
+
+def invalidate_permissions(*user_ids):
+    cache.delete_many([permissions_cache_key(user_id) for user_id in user_ids])
+
+
+def load_relationships(user):
+    requester_id = Requester.objects.filter(user=user).values_list('pk', flat=True).first()
+    shopper_id = Shopper.objects.filter(user=user).values_list('pk', flat=True).first()
+    links = Requester.shoppers.through.objects
+    relationships = dict(NO_RELATIONSHIPS, requester_id=requester_id, shopper_id=shopper_id)
+    if requester_id is not None:
+        relationships['shopper_ids'] = frozenset(links.filter(requester_id=requester_id).values_list('shopper_id', flat=True))
+    if shopper_id is not None:
+        relationships['requester_ids'] = frozenset(links.filter(shopper_id=shopper_id).values_list('requester_id', flat=True))
+    return relationships
+
+
+def cached_relationships(user):
+    if not user.is_authenticated:
+        return NO_RELATIONSHIPS
+    key = permissions_cache_key(user.pk)
+    relationships = cache.get(key)
+    if relationships is None:
+        relationships = load_relationships(user)
+        cache.set(key, relationships, settings.PERMISSIONS_CACHE_TIMEOUT)
+    return relationships
+
+
+def get_permission_resolver(request):
+    if not hasattr(request, '_permission_resolver'):
+        request._permission_resolver = PermissionResolver(request.user)
+    return request._permission_resolver
+
+
+class PermissionResolver:
+    """
+    Resolves what a user may see or do, once per request.
+
+    The user's requester/shopper relationships are kept in the cache between
+    requests (see core.signals for invalidation) and objects fetched to make a
+    decision are kept so the view can reuse them instead of querying again.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._objects = {}
+
+    @cached_property
+    def relationships(self):
+        return cached_relationships(self.user)
+
+    @property
+    def requester_id(self):
+        return self.relationships['requester_id']
+
+    @property
+    def shopper_id(self):
+        return self.relationships['shopper_id']
+
+    @property
+    def shopper_ids(self):
+        return self.relationships['shopper_ids']
+
+    @property
+    def requester_ids(self):
+        return self.relationships['requester_ids']
+
+    @property
+    def visible_requester_ids(self):
+        """
+        The user's own requester and those linked to their shopper.
+        """
+        requester_ids = set(self.requester_ids)
+        if self.requester_id is not None:
+            requester_ids.add(self.requester_id)
+        return requester_ids
+
+    @property
+    def is_requester(self):
+        return self.requester_id is not None
+
+    @property
+    def is_shopper(self):
+        return self.shopper_id is not None
+
+    def get_object(self, queryset, pk):
+        key = (queryset.model, pk)
+        if key not in self._objects:
+            self._objects[key] = queryset.filter(pk=pk).first()
+        return self._objects[key]
+
+    def requested_item(self, pk):
+        return self.get_object(RequestedItem.objects.select_related('item'), pk)
+
+    def comment(self, pk):
+        return self.get_object(Comment.objects.all(), pk)
+
+    def owns_requested_item(self, requested_item):
+        return self.is_requester and requested_item.requester_id == self.requester_id
+
+    def is_linked_to_requester(self, requester_id):
+        return requester_id in self.requester_ids
+
+    def is_linked_to_shopper(self, shopper_id):
+        return shopper_id in self.shopper_ids
+
+    def authorized_requested_items(self):
+        """
+        The requested items `is_authorized_on_requested_item` allows, as a queryset.
+        """
+        conditions = Q(pk__in=[])
+        if self.is_requester:
+            conditions |= Q(requester_id=self.requester_id)
+        if self.is_shopper:
+            conditions |= Q(shopper_id=self.shopper_id)
+        return RequestedItem.objects.filter(conditions)
+
+    def is_authorized_on_requested_item(self, requested_item):
+        return self.owns_requested_item(requested_item) or (
+            self.is_shopper and requested_item.shopper_id == self.shopper_id)
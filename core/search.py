@@ -0,0 +1,80 @@
+from django.db import connection
+from django.db.models import Func, Q
+from django.db.models.expressions import RawSQL
+
+from core.models import Comment, Item
+
+SEARCH_CONFIG = 'english'
+
+# Full-text indexes kept next to the searched tables, see migration 0016. PostgreSQL indexes the
+# to_tsvector() expressions itself, SQLite keeps FTS5 tables maintained from core.signals.
+FTS_TABLES = {
+    Item: ('core_item_fts', 'name'),
+    Comment: ('core_comment_fts', 'body'),
+}
+
+
+class ToTsVector(Func):
+    function = 'to_tsvector'
+    template = "%(function)s('" + SEARCH_CONFIG + "', %(expressions)s)"
+
+    @property
+    def output_field(self):
+        from django.contrib.postgres.search import SearchVectorField
+        return SearchVectorField()
+
+
+def fts5_query(query):
+    # Every term quoted, so user input cannot use FTS5 operators; terms are ANDed.
+    return ' '.join('"%s"' % term.replace('"', '""') for term in query.split())
+
+
+def matching(model, query):
+    """
+    Rows of `model` (Item or Comment) whose indexed text matches all words of `query`.
+    """
+    table, field = FTS_TABLES[model]
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery
+        return model.objects.annotate(document=ToTsVector(field)).filter(document=SearchQuery(query, config=SEARCH_CONFIG))
+    if connection.vendor == 'sqlite':
+        return model.objects.filter(pk__in=RawSQL('SELECT rowid FROM %s WHERE %s MATCH %%s' % (table, table), [fts5_query(query)]))
+    return model.objects.filter(*[Q(**{'%s__icontains' % field: term}) for term in query.split()])
+
+
+def search_requested_items(requested_items, query):
+    return requested_items.filter(Q(item__in=matching(Item, query).values('pk')) |
+                                  Q(pk__in=matching(Comment, query).values('requested_item')))
+
+
+def maintains_index():
+    # PostgreSQL searches an expression index, SQLite a separate FTS5 table that is written here.
+    return connection.vendor == 'sqlite'
+
+
+def index(instance):
+    if not maintains_index():
+        return
+    table, field = FTS_TABLES[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s WHERE rowid = %%s' % table, [instance.pk])
+        cursor.execute('INSERT INTO %s (rowid, %s) VALUES (%%s, %%s)' % (table, field), [instance.pk, getattr(instance, field)])
+
+
+def unindex(model, pk):
+    if not maintains_index():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLES[model][0], [pk])
+
+
+def rebuild_index():
+    """
+    Reindex every row, for data written without signals (bulk_create, raw SQL).
+    """
+    if not maintains_index():
+        return
+    with connection.cursor() as cursor:
+        for model, (table, field) in FTS_TABLES.items():
+            cursor.execute('DELETE FROM %s' % table)
+            cursor.execute('INSERT INTO %s (rowid, %s) SELECT id, %s FROM %s' % (table, field, field, model._meta.db_table))
@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core import notifications, search, tasks
+from core.events import broker
+from core.models import Comment, Item, RequestedItem, Requester, Shopper, item_count_changes, requested_items_changed
+from core.permissions import invalidate_permissions
+
+
+@receiver(post_save, sender=Requester)
+@receiver(post_save, sender=Shopper)
+@receiver(post_delete, sender=Requester)
+@receiver(post_delete, sender=Shopper)
+def invalidate_profile_permissions(sender, instance, **kwargs):
+    invalidate_permissions(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Requester.shoppers.through)
+def invalidate_shopper_link_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if pk_set is None:
+        related = instance.requesters.all() if reverse else instance.shoppers.all()
+    else:
+        related = (Requester if reverse else Shopper).objects.filter(pk__in=pk_set)
+    invalidate_permissions(instance.user_id, *related.values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=RequestedItem)
+def requested_item_saved(sender, instance, created, **kwargs):
+    stored = getattr(instance, '_stored_counted_row', None)
+    requester_ids = {instance.requester_id, stored[0]} if stored else {instance.requester_id}
+    requested_items_changed.send(sender=RequestedItem, requester_ids=requester_ids, requested_item_ids=[instance.pk],
+                                 action=RequestedItem.CREATED if created else RequestedItem.UPDATED,
+                                 count_changes=item_count_changes(removed=[stored] if stored else [], added=[instance.counted_row]))
+
+
+@receiver(post_delete, sender=RequestedItem)
+def requested_item_deleted(sender, instance, **kwargs):
+    requested_items_changed.send(sender=RequestedItem, requester_ids={instance.requester_id}, requested_item_ids=[instance.pk],
+                                 action=RequestedItem.DELETED, count_changes=item_count_changes(removed=[instance.counted_row]))
+
+
+def send_comment_changed(comment, action):
+    requester_id = RequestedItem.objects.filter(pk=comment.requested_item_id).values_list('requester_id', flat=True).first()
+    if requester_id is not None:
+        requested_items_changed.send(sender=RequestedItem, requester_ids={requester_id}, requested_item_ids=[comment.requested_item_id],
+                                     action=action, comment=comment)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    send_comment_changed(instance, RequestedItem.COMMENTED if created else RequestedItem.COMMENT_UPDATED)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    send_comment_changed(instance, RequestedItem.COMMENT_DELETED)
+
+
+@receiver(requested_items_changed)
+def touch_requester_items(sender, requester_ids, count_changes=None, **kwargs):
+    # The version bump is immediate, so cached pages never outlive the change. The counters follow from the task queue.
+    Requester.objects.filter(pk__in=requester_ids).touch_items()
+    payloads = [{'requester': requester_id, 'changes': changes} for requester_id, changes in (count_changes or {}).items() if changes]
+    if payloads:
+        tasks.enqueue('move_requester_counters', *payloads)
+
+
+@receiver(requested_items_changed)
+def queue_notifications(sender, requested_item_ids, action, comment=None, **kwargs):
+    notifications.queue_notifications(action, requested_item_ids, comment)
+
+
+@receiver(requested_items_changed)
+def publish_requested_items_changed(sender, requester_ids, requested_item_ids, action, **kwargs):
+    # Subscribers pick the requesters they may see from their cached relationships, so publishing needs no query.
+    requester_ids, requested_item_ids = set(requester_ids), list(requested_item_ids)
+
+    def publish():
+        for requester_id in requester_ids:
+            broker.publish({requester_id}, {'type': action, 'requester': requester_id, 'requested_items': requested_item_ids})
+
+    transaction.on_commit(publish)
+
+
+@receiver(post_save, sender=Item)
+def touch_item_requesters(sender, instance, created, **kwargs):
+    # Item pages show the item's name, so a rename must change their version stamps.
+    if not created:
+        Requester.objects.filter(pk__in=RequestedItem.objects.filter(item=instance).values('requester')).touch_items()
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Item)
+@receiver(post_delete, sender=Comment)
+def index_for_search(sender, instance, **kwargs):
+    if search.maintains_index():
+        tasks.enqueue('index_for_search', {'model': sender._meta.label_lower, 'pk': instance.pk})
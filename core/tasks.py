@@ -0,0 +1,135 @@
+import collections
+import datetime
+import json
+import logging
+import traceback
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from core import search
+from core.models import Requester, Task
+
+logger = logging.getLogger(__name__)
+
+Handler = namedtuple('Handler', ['function', 'dedupe', 'max_attempts', 'retry_delay'])
+handlers = {}
+
+
+def handler(name, dedupe=None, max_attempts=5, retry_delay=10):
+    """
+    Register a function run with a batch of queued payloads. Payloads with the same `dedupe(payload)`
+    are queued once until a worker takes them. Failed batches are retried with exponential backoff
+    from `retry_delay` seconds, up to `max_attempts` times.
+    """
+    def register(function):
+        handlers[name] = Handler(function, dedupe, max_attempts, retry_delay)
+        return function
+    return register
+
+
+def enqueue(name, *payloads):
+    """
+    Queue `payloads` for the handler `name`, in the current transaction: workers see them once it commits.
+    With TASKS_EAGER the handler runs at once instead.
+    """
+    task_handler = handlers[name]
+    if settings.TASKS_EAGER:
+        task_handler.function(list(payloads))
+        return
+    Task.objects.bulk_create([
+        Task(name=name, payload=json.dumps(payload),
+             dedupe_key='%s:%s' % (name, task_handler.dedupe(payload)) if task_handler.dedupe else None)
+        for payload in payloads
+    ], ignore_conflicts=True)
+
+
+def retry_at(task_handler, attempts, now):
+    return now + datetime.timedelta(seconds=task_handler.retry_delay * 2 ** (attempts - 1))
+
+
+def fail_batch(task_handler, tasks, error, now):
+    for task in tasks:
+        task.last_error = error
+        task.failed = task_handler is None or task.attempts >= task_handler.max_attempts
+        if not task.failed:
+            task.run_after = retry_at(task_handler, task.attempts, now)
+    Task.objects.bulk_update(tasks, ['last_error', 'failed', 'run_after'])
+
+
+def run_batch(task_name, tasks, now):
+    task_handler = handlers.get(task_name)
+    try:
+        if task_handler is None:
+            raise LookupError('No handler for task %s.' % task_name)
+        with transaction.atomic():
+            task_handler.function([json.loads(task.payload) for task in tasks])
+            Task.objects.filter(pk__in=[task.pk for task in tasks]).delete()
+    except Exception:
+        logger.exception('Task %s failed for %s payload(s).', task_name, len(tasks))
+        fail_batch(task_handler, tasks, traceback.format_exc(), now)
+        return False
+    return True
+
+
+def take_due_tasks(batch_size, now, lease):
+    """
+    Lease up to `batch_size` due tasks, skipping those locked by other workers, and commit at once so that
+    no lock is held while they run. Tasks whose worker stopped are taken again once their lease expires.
+    """
+    with transaction.atomic():
+        tasks = list(Task.objects.filter(failed=False, run_after__lte=now).order_by('run_after', 'id')
+                     .select_for_update(skip_locked=True)[:batch_size])
+        # Free the keys too, so that changes made while the tasks run queue them again.
+        Task.objects.filter(pk__in=[task.pk for task in tasks]).update(
+            dedupe_key=None, run_after=now + datetime.timedelta(seconds=lease), attempts=models.F('attempts') + 1)
+    for task in tasks:
+        task.attempts += 1
+    return tasks
+
+
+def run_due_tasks(batch_size=100, now=None, lease=300):
+    """
+    Take up to `batch_size` due tasks and run each handler once with all its payloads, in its own
+    transaction. Returns the number of tasks run, successfully or not.
+    """
+    now = now or timezone.now()
+    tasks = take_due_tasks(batch_size, now, lease)
+    batches = {}
+    for task in tasks:
+        batches.setdefault(task.name, []).append(task)
+    for task_name, batch in batches.items():
+        task_handler = handlers.get(task_name)
+        abandoned = [task for task in batch if task_handler and task.attempts > task_handler.max_attempts]
+        if abandoned:
+            fail_batch(task_handler, abandoned, 'The worker stopped while running this task.', now)
+            batch = [task for task in batch if task not in abandoned]
+        if batch:
+            run_batch(task_name, batch, now)
+    return len(tasks)
+
+
+@handler('move_requester_counters')
+def move_requester_counters(payloads):
+    count_changes = {}
+    for payload in payloads:
+        count_changes.setdefault(payload['requester'], collections.Counter()).update(payload['changes'])
+    Requester.objects.move_counters(count_changes)
+
+
+@handler('index_for_search', dedupe=lambda payload: '%s:%s' % (payload['model'], payload['pk']))
+def index_for_search(payloads):
+    pks = {}
+    for payload in payloads:
+        pks.setdefault(payload['model'], set()).add(payload['pk'])
+    for label, model_pks in pks.items():
+        model = apps.get_model(label)
+        instances = model.objects.in_bulk(model_pks)
+        for pk in model_pks:
+            if pk in instances:
+                search.index(instances[pk])
+            else:
+                search.unindex(model, pk)
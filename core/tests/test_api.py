@@ -0,0 +1,225 @@
+import json
+from unittest import mock
+
+from django.urls import reverse
+
+from core import api
+from core.models import Comment, RequestedItem
+from core.tests import utils as test_utils
+from core.tests.test_views import ViewTestCase
+
+
+class ApiTestCase(ViewTestCase):
+    def send_json(self, method, path, data):
+        return getattr(self.client, method)(path, data=json.dumps(data), content_type='application/json')
+
+    def assertResponseJSON(self, response, expected_status_code=200):
+        self.assertResponseStatusCode(response, expected_status_code, response.content)
+        return response.json()
+
+
+class RequestedItemsApiTests(ApiTestCase):
+    def test_anonymous_user_gets_unauthorized(self):
+        resp = self.get(reverse('core:api-requested-items'))
+        self.assertResponseJSON(resp, 401)
+
+    def test_requester_lists_own_requested_items(self):
+        requester = test_utils.create_requester()
+        requested_item = test_utils.create_requested_item(requester=requester)
+        test_utils.create_requested_item()
+        self.login_user(requester.user)
+        data = self.assertResponseJSON(self.get(reverse('core:api-requested-items')))
+        self.assertEqual([result['id'] for result in data['results']], [requested_item.pk])
+        self.assertEqual(data['results'][0]['item_name'], requested_item.item.name)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_field_selection(self):
+        requester = test_utils.create_requester()
+        requested_item = test_utils.create_requested_item(requester=requester)
+        self.login_user(requester.user)
+        data = self.assertResponseJSON(self.get(reverse('core:api-requested-items'), data={'fields': 'id,quantity'}))
+        self.assertEqual(data['results'], [{'id': requested_item.pk, 'quantity': requested_item.quantity}])
+
+    def test_unknown_field_is_bad_request(self):
+        requester = test_utils.create_requester()
+        test_utils.create_requested_item(requester=requester)
+        self.login_user(requester.user)
+        self.assertResponseJSON(self.get(reverse('core:api-requested-items'), data={'fields': 'password'}), 400)
+
+    def test_requester_creates_requested_item(self):
+        requester = test_utils.create_requester()
+        item = test_utils.create_item()
+        self.login_user(requester.user)
+        data = self.assertResponseJSON(self.send_json('post', reverse('core:api-requested-items'), {
+            'item': item.pk, 'quantity': 2, 'priority': RequestedItem.HIGH}), 201)
+        requested_item = RequestedItem.objects.get(pk=data['id'])
+        self.assertEqual(requested_item.requester, requester)
+        self.assertEqual(requested_item.quantity, 2)
+
+    def test_invalid_requested_item_reports_errors(self):
+        requester = test_utils.create_requester()
+        self.login_user(requester.user)
+        data = self.assertResponseJSON(self.send_json('post', reverse('core:api-requested-items'), {'quantity': 0}), 400)
+        self.assertIn('item', data['errors'])
+
+    def test_shopper_cannot_list_requested_items(self):
+        shopper = test_utils.create_shopper()
+        self.login_user(shopper.user)
+        self.assertResponseJSON(self.get(reverse('core:api-requested-items')), 403)
+
+
+class RequestedItemApiTests(ApiTestCase):
+    def test_linked_shopper_can_view_requested_item(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        data = self.assertResponseJSON(self.get(reverse('core:api-requested-item', args=[requested_item.pk])))
+        self.assertEqual(data['id'], requested_item.pk)
+
+    def test_unlinked_shopper_cannot_view_requested_item(self):
+        shopper = test_utils.create_shopper()
+        requested_item = test_utils.create_requested_item()
+        self.login_user(shopper.user)
+        self.assertResponseJSON(self.get(reverse('core:api-requested-item', args=[requested_item.pk])), 403)
+
+    def test_owner_can_update_requested_item(self):
+        requested_item = test_utils.create_requested_item(quantity=1, priority=RequestedItem.LOW)
+        self.login_user(requested_item.requester.user)
+        data = self.assertResponseJSON(self.send_json('patch', reverse('core:api-requested-item', args=[requested_item.pk]), {'quantity': 3}))
+        self.assertEqual(data['quantity'], 3)
+        requested_item.refresh_from_db()
+        self.assertEqual((requested_item.quantity, requested_item.priority), (3, RequestedItem.LOW))
+
+    def test_owner_can_delete_requested_item(self):
+        requested_item = test_utils.create_requested_item()
+        self.login_user(requested_item.requester.user)
+        resp = self.client.delete(reverse('core:api-requested-item', args=[requested_item.pk]))
+        self.assertResponseStatusCode(resp, 204)
+        self.assertFalse(RequestedItem.objects.filter(pk=requested_item.pk).exists())
+
+    def test_other_requester_cannot_delete_requested_item(self):
+        requested_item = test_utils.create_requested_item()
+        requester = test_utils.create_requester()
+        self.login_user(requester.user)
+        resp = self.client.delete(reverse('core:api-requested-item', args=[requested_item.pk]))
+        self.assertResponseJSON(resp, 403)
+
+
+class ClaimApiTests(ApiTestCase):
+    def test_shopper_can_claim_requested_item(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        data = self.assertResponseJSON(self.post(reverse('core:api-requested-item-claim', args=[requested_item.pk])))
+        self.assertEqual(data['shopper'], shopper.pk)
+
+    def test_claiming_claimed_item_is_conflict(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester, shopper=test_utils.create_shopper())
+        self.login_user(shopper.user)
+        self.assertResponseJSON(self.post(reverse('core:api-requested-item-claim', args=[requested_item.pk])), 409)
+
+    def test_bulk_claim_returns_per_item_results(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        available = test_utils.create_requested_item(requester=requester)
+        taken = test_utils.create_requested_item(requester=requester, shopper=test_utils.create_shopper())
+        self.login_user(shopper.user)
+        data = self.assertResponseJSON(self.send_json('post', reverse('core:api-requester-bulk-claim', args=[requester.pk]), {
+            'action': 'claim', 'requested_items': [available.pk, taken.pk]}))
+        self.assertEqual(data['results'], {str(available.pk): True, str(taken.pk): False})
+
+    def test_bulk_claim_reports_items_already_held(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        available = test_utils.create_requested_item(requester=requester)
+        held = test_utils.create_requested_item(requester=requester, shopper=shopper)
+        self.login_user(shopper.user)
+        data = self.assertResponseJSON(self.send_json('post', reverse('core:api-requester-bulk-claim', args=[requester.pk]), {
+            'action': 'claim', 'requested_items': [available.pk, held.pk]}))
+        self.assertEqual(data['results'], {str(available.pk): True, str(held.pk): False})
+        self.assertEqual(data['already_held'], [held.pk])
+
+
+class CommentApiTests(ApiTestCase):
+    def test_assigned_shopper_can_comment(self):
+        shopper = test_utils.create_shopper()
+        requested_item = test_utils.create_requested_item(shopper=shopper)
+        self.login_user(shopper.user)
+        data = self.assertResponseJSON(self.send_json('post', reverse('core:api-comments', args=[requested_item.pk]), {'body': 'Foo'}), 201)
+        comment = Comment.objects.get(pk=data['id'])
+        self.assertEqual((comment.author, comment.body), (shopper.user, 'Foo'))
+
+    def test_author_can_delete_comment(self):
+        comment = test_utils.create_comment()
+        self.login_user(comment.author)
+        resp = self.client.delete(reverse('core:api-comment', args=[comment.pk]))
+        self.assertResponseStatusCode(resp, 204)
+        self.assertFalse(Comment.objects.filter(pk=comment.pk).exists())
+
+    def test_other_user_cannot_delete_comment(self):
+        comment = test_utils.create_comment()
+        self.login_user(test_utils.create_requester().user)
+        self.assertResponseJSON(self.client.delete(reverse('core:api-comment', args=[comment.pk])), 403)
+
+
+class ProfileApiTests(ApiTestCase):
+    def test_requester_lists_shoppers(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        self.login_user(requester.user)
+        data = self.assertResponseJSON(self.get(reverse('core:api-shoppers')))
+        self.assertEqual(data['results'], [{'id': shopper.pk, 'username': shopper.user.username}])
+
+    def test_shopper_lists_requesters(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        self.login_user(shopper.user)
+        data = self.assertResponseJSON(self.get(reverse('core:api-requesters')))
+        self.assertEqual(data['results'], [{'id': requester.pk, 'username': requester.user.username}])
+
+
+class WorkQueueApiTests(ApiTestCase):
+    def test_shopper_lists_unclaimed_items_of_linked_requesters(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        test_utils.create_requested_item(requester=requester, shopper=shopper)
+        test_utils.create_requested_item()
+        self.login_user(shopper.user)
+        data = self.assertResponseJSON(self.get(reverse('core:api-work-queue')))
+        self.assertEqual([result['id'] for result in data['results']], [requested_item.pk])
+        self.assertEqual(data['results'][0]['requester_username'], requester.user.username)
+
+    def test_grouped_by_item(self):
+        shopper = test_utils.create_shopper()
+        requested_item = test_utils.create_requested_item(requester=test_utils.create_requester(shoppers=[shopper]), quantity=4)
+        self.login_user(shopper.user)
+        data = self.assertResponseJSON(self.get(reverse('core:api-work-queue'), data={'group': 'item', 'fields': 'item,total_quantity'}))
+        self.assertEqual(data['results'], [{'item': requested_item.item_id, 'total_quantity': 4}])
+
+    def test_grouped_by_item_is_capped(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        urgent = test_utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        test_utils.create_requested_item(requester=requester, priority=RequestedItem.LOW)
+        self.login_user(shopper.user)
+        with mock.patch.object(api.WorkQueueApiView, 'grouped_limit', 1):
+            data = self.assertResponseJSON(self.get(reverse('core:api-work-queue'), data={'group': 'item', 'fields': 'item'}))
+        self.assertEqual(data, {'results': [{'item': urgent.item_id}], 'truncated': True})
+
+    def test_requester_cannot_list_work_queue(self):
+        self.login_user(test_utils.create_requester().user)
+        self.assertResponseJSON(self.get(reverse('core:api-work-queue')), 403)
+
+
+class ItemsApiTests(ApiTestCase):
+    def test_requester_gets_typeahead_suggestions(self):
+        item = test_utils.create_item(name='Milk')
+        test_utils.create_item(name='Bread')
+        self.login_user(test_utils.create_requester().user)
+        data = self.assertResponseJSON(self.get(reverse('core:api-items'), data={'q': 'MI'}))
+        self.assertEqual(data['results'], [{'id': item.pk, 'name': 'Milk'}])
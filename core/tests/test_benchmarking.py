@@ -0,0 +1,43 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import benchmarking, search, urls
+from core.models import Account, Comment, Item, RequestedItem, Requester, Shopper
+from core.tests import utils as test_utils
+
+
+class GenerateDataTestCase(TestCase):
+    def test_population_is_generated_with_derived_data(self):
+        call_command('generate_data', requested_items=200, requesters=5, shoppers=3, items=10, comments=50, accounts=2,
+                     stdout=StringIO())
+        self.assertEqual((Requester.objects.count(), Shopper.objects.count(), Item.objects.count()), (5, 3, 10))
+        self.assertEqual((RequestedItem.objects.count(), Comment.objects.count()), (200, 50))
+        self.assertEqual(Account.objects.count(), 4)
+        self.assertEqual(Requester.objects.filter(shoppers__isnull=True).count(), 0)
+        self.assertFalse(Requester.objects.with_item_count_drift().exists())
+        word = Comment.objects.first().body.split()[0]
+        self.assertTrue(search.matching(Comment, word).exists())
+
+
+class UrlBenchmarkTestCase(TestCase):
+    def test_every_url_is_benchmarked_or_skipped(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        comment = test_utils.create_comment(requested_item=test_utils.create_requested_item(requester=requester))
+        benchmarks = benchmarking.url_benchmarks(requester, shopper, comment.requested_item, comment,
+                                                 test_utils.create_user(is_staff=True))
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(set(benchmarks) | set(benchmarking.SKIPPED_URLS), names)
+        self.assertFalse(set(benchmarks) & set(benchmarking.SKIPPED_URLS))
+        self.assertEqual(benchmarking.profile_urls({'metrics': benchmarks['metrics']}, repeat=1)['metrics']['status'], 200)
+
+    def test_regressions_against_baseline(self):
+        baseline = {'1000': {'index': {'queries': 2, 'median_ms': 10}, 'search': {'queries': 4, 'median_ms': 10}}}
+        results = {'1000': {'index': {'queries': 3, 'median_ms': 11}, 'search': {'queries': 4, 'median_ms': 20}},
+                   '10000': {'index': {'queries': 9, 'median_ms': 99}}}
+        self.assertEqual(benchmarking.compare_to_baseline(results, baseline), [
+            'index at 1000: 3 queries, was 2',
+            'search at 1000: median 20.00ms, was 10.00ms',
+        ])
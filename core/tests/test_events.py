@@ -0,0 +1,120 @@
+import threading
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import events
+from core.events import EventBroker
+from core.models import RequestedItem
+from core.permissions import PermissionResolver
+from core.tests import utils as test_utils
+from core.tests.test_views import ViewTestCase
+
+
+class EventBrokerTestCase(TestCase):
+    def test_events_are_delivered_to_their_audience_only(self):
+        broker = EventBroker(history=10)
+        start = broker.last_id
+        broker.publish({1, 2}, {'type': 'claimed'})
+        broker.publish({2}, {'type': 'created'})
+        self.assertEqual([event['type'] for event in broker.events_since({1}, start)], ['claimed'])
+        self.assertEqual([event['type'] for event in broker.events_since({2}, start)], ['claimed', 'created'])
+
+    def test_events_since_skips_seen_events(self):
+        broker = EventBroker(history=10)
+        first_id = broker.publish({1}, {'type': 'claimed'})
+        broker.publish({1}, {'type': 'created'})
+        self.assertEqual([event['type'] for event in broker.events_since({1}, first_id)], ['created'])
+
+    def test_wait_times_out_without_events(self):
+        broker = EventBroker(history=10)
+        self.assertEqual(broker.wait({1}, broker.last_id, timeout=0.01), [])
+
+    def test_history_is_bounded(self):
+        broker = EventBroker(history=2)
+        start = broker.last_id
+        for _ in range(3):
+            broker.publish({1}, {'type': 'created'})
+        self.assertEqual(len(broker.events_since({1}, start)), 2)
+
+    def test_ids_of_another_broker_resume_from_the_current_event(self):
+        broker, restarted = EventBroker(history=10), EventBroker(history=10)
+        for _ in range(3):
+            stale_id = broker.publish({1}, {'type': 'created'})
+        restarted.publish({1}, {'type': 'claimed'})
+        for last_id in (stale_id, 'foo', 5):
+            self.assertEqual(restarted.events_since({1}, last_id), [])
+        restarted.publish({1}, {'type': 'created'})
+        self.assertEqual([event['type'] for event in restarted.wait({1}, stale_id, timeout=0.01)], [])
+        self.assertEqual([event['type'] for event in restarted.events_since({1}, restarted.event_id(1))], ['created'])
+
+    def test_wait_resumes_an_unknown_id_once(self):
+        broker = EventBroker(history=10)
+        threading.Timer(0.01, broker.publish, args=({1}, {'type': 'created'})).start()
+        self.assertEqual([event['type'] for event in broker.wait({1}, 'foo', timeout=1)], ['created'])
+
+
+@override_settings(EVENTS_LONG_POLL_TIMEOUT=0.01)
+class EventPollViewTests(ViewTestCase):
+    def poll(self, last_event_id):
+        return self.get(reverse('core:events-poll'), data={'last_event_id': last_event_id})
+
+    def test_poll_returns_events_for_user(self):
+        requester = test_utils.create_requester()
+        last_event_id = events.broker.last_id
+        events.broker.publish({requester.pk}, {'type': 'created', 'requester': requester.pk})
+        self.login_user(requester.user)
+        data = self.poll(last_event_id).json()
+        self.assertEqual([event['type'] for event in data['events']], ['created'])
+        self.assertEqual(data['last_event_id'], events.broker.last_id)
+
+    def test_poll_times_out_without_events(self):
+        requester = test_utils.create_requester()
+        self.login_user(requester.user)
+        data = self.poll(events.broker.last_id).json()
+        self.assertEqual(data, {'events': [], 'last_event_id': events.broker.last_id})
+
+    def test_anonymous_user_cannot_poll(self):
+        self.assertResponseIsRedirect(self.poll(0))
+
+    def test_pages_poll_instead_of_holding_a_stream(self):
+        shopper = test_utils.create_shopper()
+        self.login_user(shopper.user)
+        resp = self.get(reverse('core:work-queue'))
+        self.assertContains(resp, reverse('core:events-poll'))
+        self.assertNotContains(resp, reverse('core:events-stream'))
+
+
+@override_settings(EVENTS_STREAM_DURATION=0.05, EVENTS_HEARTBEAT_INTERVAL=0.01)
+class EventStreamViewTests(ViewTestCase):
+    def test_stream_sends_missed_events(self):
+        requester = test_utils.create_requester()
+        last_event_id = events.broker.last_id
+        event_id = events.broker.publish({requester.pk}, {'type': 'created', 'requester': requester.pk})
+        self.login_user(requester.user)
+        resp = self.get(reverse('core:events-stream'), HTTP_LAST_EVENT_ID=str(last_event_id))
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        content = b''.join(resp.streaming_content).decode()
+        self.assertIn('id: %s\n' % event_id, content)
+
+
+class RequestedItemEventsTestCase(TransactionTestCase):
+    def test_claim_is_published_to_requester_and_linked_shoppers(self):
+        shopper = test_utils.create_shopper()
+        other_shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        last_event_id = events.broker.last_id
+        shopper.claim_requested_item(requested_item)
+        for user in (requester.user, shopper.user):
+            published = events.broker.events_since(PermissionResolver(user).visible_requester_ids, last_event_id)
+            self.assertEqual(published, [{'id': published[0]['id'], 'type': RequestedItem.CLAIMED,
+                                          'requester': requester.pk, 'requested_items': [requested_item.pk]}])
+        self.assertEqual(events.broker.events_since(PermissionResolver(other_shopper.user).visible_requester_ids, last_event_id), [])
+
+    def test_comment_is_published(self):
+        requested_item = test_utils.create_requested_item()
+        last_event_id = events.broker.last_id
+        test_utils.create_comment(requested_item=requested_item)
+        published = events.broker.events_since({requested_item.requester_id}, last_event_id)
+        self.assertEqual([event['type'] for event in published], [RequestedItem.COMMENTED])
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from core import views
+from core.instrumentation import QueryBudgetExceeded, metrics
+from core.tests import utils as test_utils
+from core.tests.test_views import ViewTestCase
+
+
+class PerformanceMiddlewareTests(ViewTestCase):
+    def setUp(self):
+        super(PerformanceMiddlewareTests, self).setUp()
+        metrics.reset()
+        self.requester = test_utils.create_requester()
+        test_utils.create_requested_item(requester=self.requester)
+        self.login_user(self.requester.user)
+
+    def test_requests_are_recorded_per_view(self):
+        self.get(reverse('core:requested-items'))
+        self.get(reverse('core:requested-items'))
+        totals = metrics.snapshot()['core:requested-items']
+        self.assertEqual(totals['requests'], 2)
+        self.assertGreater(totals['queries'], 0)
+        self.assertGreater(totals['duration'], totals['template_duration'])
+        self.assertGreater(totals['template_duration'], 0)
+        self.assertEqual(totals['over_budget'], 0)
+
+    def test_exceeding_query_budget_fails_in_tests(self):
+        with mock.patch.object(views.RequestedItemsListView, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.get(reverse('core:requested-items'))
+
+    @override_settings(QUERY_BUDGETS_STRICT=False)
+    def test_exceeding_query_budget_logs_a_warning_otherwise(self):
+        with mock.patch.object(views.RequestedItemsListView, 'query_budget', 1):
+            with self.assertLogs('shop4me', 'WARNING') as logs:
+                self.assertResponseOK(self.get(reverse('core:requested-items')))
+        self.assertIn('core:requested-items ran', logs.output[0])
+        self.assertEqual(metrics.snapshot()['core:requested-items']['over_budget'], 1)
+
+    @override_settings(PERFORMANCE_LOG_REQUESTS=True)
+    def test_requests_can_be_logged(self):
+        with self.assertLogs('shop4me', 'INFO') as logs:
+            self.get(reverse('core:requested-items'))
+        self.assertIn('view=core:requested-items method=GET status=200', logs.output[0])
+
+
+class MetricsViewTests(ViewTestCase):
+    def test_metrics_are_hidden_from_users(self):
+        self.login_user(test_utils.create_requester().user)
+        self.assertResponseIsPermissionDenied(self.get(reverse('core:metrics')))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_are_served_with_token(self):
+        metrics.reset()
+        self.get(reverse('core:index'))
+        resp = self.get(reverse('core:metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertResponseOK(resp)
+        self.assertIn('shop4me_view_requests_total{view="core:index"} 1', resp.content.decode())
+        self.assertResponseIsPermissionDenied(self.get(reverse('core:metrics'), HTTP_AUTHORIZATION='Bearer wrong'))
@@ -1,11 +1,24 @@
-from django.test import TestCase
+import datetime
+import threading
+from io import StringIO
 
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
 from core.tests import utils
-from core.models import RequestedItem, Requester
+from core.models import Item, ListTemplate, ListTemplateItem, Profile, RequestedItem, Requester
 
 
 class ModelTestCase(TestCase):
-    pass
+    def setUp(self):
+        super(ModelTestCase, self).setUp()
+        for cache in caches.all():
+            cache.clear()
 
 
 class RequestedItemModelTestCase(ModelTestCase):
@@ -14,3 +27,298 @@ class RequestedItemModelTestCase(ModelTestCase):
         high = utils.create_requested_item(priority=RequestedItem.HIGH)
         low = utils.create_requested_item(priority=RequestedItem.LOW)
         self.assertEqual(list(RequestedItem.objects.all()), [high, medium, low])
+
+    def test_bulk_created_requested_items_get_their_pks(self):
+        requester, item = utils.create_requester(), utils.create_item()
+        utils.create_requested_item()
+        requested_items = RequestedItem.objects.bulk_create_with_pks([
+            RequestedItem(requester=requester, item=item, quantity=quantity, priority=RequestedItem.LOW) for quantity in (1, 2)])
+        self.assertEqual([requested_item.pk for requested_item in requested_items],
+                         list(RequestedItem.objects.filter(requester=requester).order_by('quantity').values_list('pk', flat=True)))
+
+
+class ShopperClaimTestCase(ModelTestCase):
+    def test_shopper_can_claim_unclaimed_item(self):
+        shopper = utils.create_shopper()
+        requested_item = utils.create_requested_item()
+        self.assertTrue(shopper.claim_requested_item(requested_item))
+        requested_item.refresh_from_db()
+        self.assertEqual(requested_item.shopper, shopper)
+        self.assertIsNotNone(requested_item.claimed_epoch_timestamp)
+
+    def test_claiming_claimed_item_fails_without_changing_it(self):
+        winner = utils.create_shopper()
+        loser = utils.create_shopper()
+        requested_item = utils.create_requested_item()
+        stale_requested_item = RequestedItem.objects.get(pk=requested_item.pk)
+        winner.claim_requested_item(requested_item)
+        self.assertFalse(loser.claim_requested_item(stale_requested_item))
+        requested_item.refresh_from_db()
+        self.assertEqual(requested_item.shopper, winner)
+
+    def test_claim_does_not_overwrite_concurrent_edits(self):
+        shopper = utils.create_shopper()
+        requested_item = utils.create_requested_item(quantity=1)
+        RequestedItem.objects.filter(pk=requested_item.pk).update(quantity=5)
+        shopper.claim_requested_item(requested_item)
+        requested_item.refresh_from_db()
+        self.assertEqual(requested_item.quantity, 5)
+
+
+class ProfileLookupTestCase(ModelTestCase):
+    def test_profile_lookups_are_cached_until_profiles_change(self):
+        user = utils.create_user()
+        self.assertFalse(Profile.user_is_requester(user))
+        with self.assertNumQueries(0):
+            self.assertFalse(Profile.user_is_shopper(user))
+        requester = utils.create_requester(user=user)
+        self.assertTrue(Profile.user_is_requester(user))
+        requester.delete()
+        self.assertFalse(Profile.user_is_requester(user))
+
+
+class ShoppingListTestCase(ModelTestCase):
+    def test_claimed_items_are_merged_per_item(self):
+        shopper = utils.create_shopper()
+        item = utils.create_item()
+        requesters = [utils.create_requester() for _ in range(2)]
+        utils.create_requested_item(requester=requesters[0], shopper=shopper, item=item, quantity=2, priority=RequestedItem.LOW)
+        utils.create_requested_item(requester=requesters[1], shopper=shopper, item=item, quantity=3, priority=RequestedItem.HIGH)
+        utils.create_requested_item(requester=requesters[1], shopper=shopper, item=item, quantity=1, priority=RequestedItem.LOW)
+        row, = RequestedItem.objects.filter(shopper=shopper).shopping_list()
+        self.assertEqual((row['item'], row['total_quantity'], row['priority']), (item.pk, 6, RequestedItem.HIGH))
+        self.assertEqual(sorted(row['requesters'].split(',')), sorted(requester.user.username for requester in requesters))
+
+    def test_fulfilled_items_leave_the_list_until_released(self):
+        shopper = utils.create_shopper()
+        requested_item = utils.create_requested_item(shopper=shopper)
+        requested_items = RequestedItem.objects.filter(pk=requested_item.pk)
+        self.assertEqual(shopper.fulfil_requested_items(requested_items), 1)
+        self.assertFalse(RequestedItem.objects.filter(shopper=shopper).unfulfilled().exists())
+        self.assertEqual(shopper.fulfil_requested_items(requested_items), 0)
+        shopper.release_requested_items(requested_items)
+        requested_item.refresh_from_db()
+        self.assertIsNone(requested_item.fulfilled_epoch_timestamp)
+
+    def test_shopper_cannot_fulfil_items_of_another_shopper(self):
+        requested_item = utils.create_requested_item(shopper=utils.create_shopper())
+        results = utils.create_shopper().fulfil_requested_items(RequestedItem.objects.filter(pk=requested_item.pk))
+        self.assertEqual(results, 0)
+        requested_item.refresh_from_db()
+        self.assertIsNone(requested_item.fulfilled_epoch_timestamp)
+
+
+class ItemCatalogueTestCase(ModelTestCase):
+    def test_names_differing_in_case_and_spacing_are_one_item(self):
+        item, created = Item.objects.get_or_create_by_name('Semi Skimmed  Milk')
+        self.assertTrue(created)
+        self.assertEqual(Item.objects.get_or_create_by_name(' semi skimmed milk '), (item, False))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Item.objects.create(name='SEMI SKIMMED MILK')
+
+    def test_typeahead_lists_prefix_matches_before_similar_names(self):
+        milk = utils.create_item(name='Milk')
+        milk_2l = utils.create_item(name='Milk 2L')
+        oat_milk = utils.create_item(name='Oat milk')
+        utils.create_item(name='Bread')
+        self.assertEqual(Item.objects.typeahead('mil'), [milk, milk_2l])
+        self.assertEqual(Item.objects.typeahead('milk', limit=3), [milk, milk_2l, oat_milk])
+        self.assertEqual(Item.objects.typeahead('  '), [])
+
+    def test_merge_repoints_requested_items(self):
+        item, duplicate = utils.create_item(name='Milk'), utils.create_item(name='Milk 2L')
+        requested_item = utils.create_requested_item(item=duplicate)
+        version = Requester.objects.get(pk=requested_item.requester_id).items_version
+        call_command('merge_items', item.pk, duplicate.pk, stdout=StringIO())
+        requested_item.refresh_from_db()
+        self.assertEqual(requested_item.item, item)
+        self.assertFalse(Item.objects.filter(pk=duplicate.pk).exists())
+        self.assertGreater(Requester.objects.get(pk=requested_item.requester_id).items_version, version)
+
+    def test_merge_command_rejects_missing_items(self):
+        item = utils.create_item()
+        with self.assertRaises(CommandError):
+            call_command('merge_items', item.pk, item.pk + 1000, stdout=StringIO())
+
+
+class ConcurrentClaimTestCase(TransactionTestCase):
+    shopper_count = 8
+
+    def claim(self, shopper, requested_item, barrier, results):
+        barrier.wait()
+        try:
+            while True:
+                try:
+                    results[shopper.pk] = shopper.claim_requested_item(RequestedItem.objects.get(pk=requested_item.pk))
+                    return
+                except OperationalError:
+                    # SQLite reports lock contention instead of waiting, try again.
+                    continue
+        finally:
+            connection.close()
+
+    def test_only_one_concurrent_claim_wins(self):
+        requested_item = utils.create_requested_item()
+        shoppers = [utils.create_shopper() for _ in range(self.shopper_count)]
+        barrier = threading.Barrier(len(shoppers))
+        results = {}
+        threads = [threading.Thread(target=self.claim, args=(shopper, requested_item, barrier, results)) for shopper in shoppers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        winners = [shopper_pk for shopper_pk, claimed in results.items() if claimed]
+        self.assertEqual(len(results), len(shoppers))
+        self.assertEqual(len(winners), 1)
+        requested_item.refresh_from_db()
+        self.assertEqual(requested_item.shopper_id, winners[0])
+
+
+@override_settings(TASKS_EAGER=True)
+class RequesterCountsTestCase(ModelTestCase):
+    def assertCounts(self, requester, open_items, claimed_items, high_priority_open_items):
+        requester.refresh_from_db()
+        self.assertEqual(
+            (requester.open_items_count, requester.claimed_items_count, requester.high_priority_open_items_count),
+            (open_items, claimed_items, high_priority_open_items))
+
+    def test_counts_follow_item_changes(self):
+        requester = utils.create_requester()
+        shopper = utils.create_shopper()
+        high = utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        low = utils.create_requested_item(requester=requester, priority=RequestedItem.LOW)
+        self.assertCounts(requester, open_items=2, claimed_items=0, high_priority_open_items=1)
+        shopper.claim_requested_item(high)
+        self.assertCounts(requester, open_items=1, claimed_items=1, high_priority_open_items=0)
+        shopper.release_requested_items(RequestedItem.objects.filter(pk=high.pk))
+        self.assertCounts(requester, open_items=2, claimed_items=0, high_priority_open_items=1)
+        low.delete()
+        self.assertCounts(requester, open_items=1, claimed_items=0, high_priority_open_items=1)
+
+    def test_counts_move_only_with_the_items_that_changed(self):
+        requester = utils.create_requester()
+        shopper, other_shopper = utils.create_shopper(), utils.create_shopper()
+        high = utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        taken = utils.create_requested_item(requester=requester, shopper=other_shopper)
+        low = utils.create_requested_item(requester=requester, priority=RequestedItem.LOW)
+        requested_items = RequestedItem.objects.filter(requester=requester)
+        shopper.claim_requested_items(requested_items)
+        shopper.claim_requested_items(requested_items)
+        self.assertCounts(requester, open_items=0, claimed_items=3, high_priority_open_items=0)
+        shopper.fulfil_requested_items(requested_items)
+        shopper.release_requested_items(requested_items)
+        shopper.release_requested_items(requested_items)
+        self.assertCounts(requester, open_items=2, claimed_items=1, high_priority_open_items=1)
+        low.priority = RequestedItem.HIGH
+        low.save()
+        taken.shopper = None
+        taken.save()
+        high.delete()
+        self.assertCounts(requester, open_items=2, claimed_items=0, high_priority_open_items=1)
+        self.assertFalse(Requester.objects.with_item_count_drift().exists())
+
+    def test_moving_an_item_to_another_requester_moves_its_count(self):
+        requester, other_requester = utils.create_requester(), utils.create_requester()
+        requested_item = utils.create_requested_item(requester=requester)
+        requested_item.requester = other_requester
+        requested_item.save()
+        self.assertCounts(requester, open_items=0, claimed_items=0, high_priority_open_items=0)
+        self.assertCounts(other_requester, open_items=1, claimed_items=0, high_priority_open_items=0)
+
+    def test_shopper_changes_on_a_stale_instance_keep_version_and_counts(self):
+        requester = utils.create_requester()
+        stale = Requester.objects.get(pk=requester.pk)
+        utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        utils.create_requested_item(requester=requester)
+        version = Requester.objects.get(pk=requester.pk).items_version
+        shopper = utils.create_shopper()
+        stale.add_shopper(shopper)
+        stale.remove_shopper(shopper)
+        self.assertCounts(requester, open_items=2, claimed_items=0, high_priority_open_items=1)
+        self.assertEqual(requester.items_version, version)
+        self.assertEqual(requester.invite_token, str(stale.invite_token))
+
+    def test_comment_updates_last_activity(self):
+        requested_item = utils.create_requested_item()
+        requester = requested_item.requester
+        requester.refresh_from_db()
+        last_activity = requester.last_activity
+        utils.create_comment(requested_item=requested_item)
+        requester.refresh_from_db()
+        self.assertGreater(requester.last_activity, last_activity)
+
+    def test_repair_command_fixes_drifted_counts(self):
+        requester = utils.create_requester()
+        utils.create_requested_item(requester=requester)
+        Requester.objects.filter(pk=requester.pk).update(open_items_count=5, claimed_items_count=3)
+        out = StringIO()
+        call_command('repair_requester_counts', stdout=out)
+        self.assertIn('1 requester(s) with drifted counters.', out.getvalue())
+        self.assertCounts(requester, open_items=1, claimed_items=0, high_priority_open_items=0)
+
+    def test_repair_command_dry_run_changes_nothing(self):
+        requester = utils.create_requester()
+        Requester.objects.filter(pk=requester.pk).update(open_items_count=5)
+        call_command('repair_requester_counts', dry_run=True, stdout=StringIO())
+        self.assertCounts(requester, open_items=5, claimed_items=0, high_priority_open_items=0)
+
+
+class ListTemplateModelTestCase(ModelTestCase):
+    def create_template(self, requester, items, **kwargs):
+        kwargs.setdefault('next_run', timezone.now())
+        template = ListTemplate.objects.create(requester=requester, name='Weekly shop', **kwargs)
+        for item, quantity in items:
+            ListTemplateItem.objects.create(template=template, item=item, quantity=quantity)
+        return template
+
+    def test_merging_items_keeps_their_template_entries(self):
+        milk, milk_2l, milk_1l, bread = (utils.create_item(name=name) for name in ('Milk', 'Milk 2L', 'Milk 1L', 'Bread'))
+        both = self.create_template(utils.create_requester(), [(milk, 1), (milk_2l, 2), (milk_1l, 3)])
+        ListTemplateItem.objects.filter(template=both, item=milk_1l).update(priority=RequestedItem.HIGH)
+        duplicates_only = self.create_template(utils.create_requester(), [(milk_2l, 2), (bread, 1)])
+        milk.merge([milk_2l, milk_1l])
+        kept = ListTemplateItem.objects.get(template=both)
+        self.assertEqual((kept.item, kept.quantity, kept.priority), (milk, 6, RequestedItem.HIGH))
+        self.assertEqual(dict(duplicates_only.items.values_list('item', 'quantity')), {milk.pk: 2, bread.pk: 1})
+
+    def test_due_templates_are_materialized_once_per_period(self):
+        requesters = [utils.create_requester() for _ in range(3)]
+        milk, bread = utils.create_item(name='Milk'), utils.create_item(name='Bread')
+        start = timezone.now()
+        templates = [self.create_template(requester, [(milk, 2), (bread, 1)], next_run=start) for requester in requesters]
+        self.create_template(utils.create_requester(), [(milk, 1)], next_run=start + datetime.timedelta(days=1))
+        # Nine queries per batch of two templates, and three to find no more are due.
+        with self.assertNumQueries(23):
+            self.assertEqual(ListTemplate.objects.materialize_due(now=start, batch_size=2), 6)
+        self.assertEqual(ListTemplate.objects.materialize_due(now=start), 0)
+        tasks.run_due_tasks()
+        for requester, template in zip(requesters, templates):
+            self.assertEqual(sorted(RequestedItem.objects.filter(requester=requester).values_list('item__name', 'quantity')),
+                             [('Bread', 1), ('Milk', 2)])
+            template.refresh_from_db()
+            self.assertEqual((template.last_run, template.next_run), (start, start + datetime.timedelta(days=7)))
+            requester.refresh_from_db()
+            self.assertEqual(requester.open_items_count, 2)
+
+    def test_items_still_waiting_are_not_added_again(self):
+        requester = utils.create_requester()
+        milk, bread = utils.create_item(name='Milk'), utils.create_item(name='Bread')
+        utils.create_requested_item(requester=requester, item=milk)
+        utils.create_requested_item(requester=requester, item=bread, fulfilled_epoch_timestamp=1591012800)
+        self.create_template(requester, [(milk, 2), (bread, 1)])
+        self.assertEqual(ListTemplate.objects.materialize_due(), 1)
+        self.assertEqual(RequestedItem.objects.filter(requester=requester, item=milk).count(), 1)
+
+    def test_missed_periods_run_once(self):
+        now = timezone.now()
+        template = self.create_template(utils.create_requester(), [(utils.create_item(), 1)], interval_days=ListTemplate.DAILY,
+                                        next_run=now - datetime.timedelta(days=3, hours=1))
+        self.assertEqual(ListTemplate.objects.materialize_due(now=now), 1)
+        template.refresh_from_db()
+        self.assertEqual(template.next_run, now + datetime.timedelta(hours=23))
+
+    def test_command(self):
+        self.create_template(utils.create_requester(), [(utils.create_item(), 1)])
+        stdout = StringIO()
+        call_command('materialize_list_templates', stdout=stdout)
+        self.assertIn('Created 1 requested item(s).', stdout.getvalue())
@@ -0,0 +1,128 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import notifications
+from core.models import Notification, NotificationPreference, RequestedItem
+from core.tests import utils as test_utils
+from core.tests.test_models import ModelTestCase
+from core.tests.test_views import ViewTestCase
+
+
+def give_email(sender, instance, created, **kwargs):
+    if created and not instance.email:
+        User.objects.filter(pk=instance.pk).update(email=instance.username)
+        instance.email = instance.username
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', SITE_URL='https://shop.example', TASKS_EAGER=True)
+class NotificationTestCase(ModelTestCase):
+    def setUp(self):
+        super(NotificationTestCase, self).setUp()
+        # The factories leave emails empty, and users without one get no digest.
+        self.addCleanup(post_save.disconnect, give_email, sender=User)
+        post_save.connect(give_email, sender=User)
+
+    def later(self, minutes):
+        return timezone.now() + datetime.timedelta(minutes=minutes)
+
+    def test_claims_and_comments_are_recorded_for_the_other_party(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_items = [test_utils.create_requested_item(requester=requester) for _ in range(3)]
+        shopper.claim_requested_items(RequestedItem.objects.filter(pk__in=[requested_item.pk for requested_item in requested_items]))
+        test_utils.create_comment(requested_item=requested_items[0], author=requester.user)
+        test_utils.create_comment(requested_item=requested_items[1], author=shopper.user)
+        self.assertEqual(sorted(Notification.objects.values_list('user', 'action', 'actor')), sorted(
+            [(requester.user_id, RequestedItem.CLAIMED, shopper.user_id)] * 3 +
+            [(shopper.user_id, RequestedItem.COMMENTED, requester.user_id), (requester.user_id, RequestedItem.COMMENTED, shopper.user_id)]))
+
+    def test_opted_out_events_are_not_recorded(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        NotificationPreference.objects.create(user=requester.user, claims=False)
+        NotificationPreference.objects.create(user=shopper.user, digest_window=NotificationPreference.NEVER)
+        requested_item = test_utils.create_requested_item(requester=requester)
+        shopper.claim_requested_item(requested_item)
+        test_utils.create_comment(requested_item=requested_item, author=requester.user)
+        test_utils.create_comment(requested_item=requested_item, author=shopper.user)
+        self.assertEqual(list(Notification.objects.values_list('user', 'action')), [(requester.user_id, RequestedItem.COMMENTED)])
+
+    def test_events_are_coalesced_into_one_digest_per_user(self):
+        shoppers = [test_utils.create_shopper() for _ in range(2)]
+        requesters = [test_utils.create_requester(shoppers=shoppers[:1]) for _ in range(2)]
+        for requester in requesters:
+            requester.shoppers.add(shoppers[1])
+        for requester in requesters:
+            for shopper in shoppers:
+                shopper.claim_requested_items(RequestedItem.objects.filter(pk__in=[
+                    RequestedItem.objects.create(requester=requester, item=test_utils.create_item(name='Item %s' % i),
+                                                 priority=RequestedItem.LOW).pk
+                    for i in range(50)]))
+        self.assertEqual(Notification.objects.count(), 200)
+        send_messages = locmem.EmailBackend.send_messages
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', autospec=True, side_effect=send_messages) as sent:
+            self.assertEqual(notifications.send_digests(now=self.later(60)), 2)
+        self.assertEqual(sent.call_count, 1)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), sorted(requester.user.email for requester in requesters))
+        self.assertEqual(mail.outbox[0].subject, '100 update(s) on your shopping')
+        self.assertIn('%s claimed Item 0, Item 1' % shoppers[0].user.username, mail.outbox[0].body)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_digest_waits_for_the_users_window(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        NotificationPreference.objects.create(user=shopper.user, digest_window=NotificationPreference.DAILY)
+        requested_item = test_utils.create_requested_item(requester=requester, item=test_utils.create_item(name='Milk'))
+        shopper.claim_requested_item(requested_item)
+        test_utils.create_comment(requested_item=requested_item, author=requester.user, body='Semi-skimmed please')
+        self.assertEqual(notifications.send_digests(now=self.later(30)), 0)
+        self.assertEqual(notifications.send_digests(now=self.later(61)), 1)
+        self.assertEqual(mail.outbox[0].to, [requester.user.email])
+        self.assertEqual(notifications.send_digests(now=self.later(60 * 24 - 1)), 0)
+        test_utils.create_comment(requested_item=requested_item, author=requester.user, body='Or oat milk')
+        stdout = StringIO()
+        with mock.patch('django.utils.timezone.now', return_value=self.later(60 * 24 + 1)):
+            call_command('send_notification_digests', stdout=stdout)
+        self.assertIn('Sent 1 digest(s).', stdout.getvalue())
+        body = mail.outbox[1].body
+        self.assertEqual(mail.outbox[1].to, [shopper.user.email])
+        self.assertIn('commented on Milk:\n    Semi-skimmed please\n    https://shop.example%s' % reverse(
+            'core:requested-item-detail', args=[requested_item.pk]), body)
+        self.assertIn('Or oat milk', body)
+
+
+    def test_no_mail_connection_is_opened_without_due_digests(self):
+        shopper = test_utils.create_shopper()
+        shopper.claim_requested_item(test_utils.create_requested_item(requester=test_utils.create_requester(shoppers=[shopper])))
+        with mock.patch.object(notifications.mail, 'get_connection') as get_connection:
+            self.assertEqual(notifications.send_digests(now=self.later(30)), 0)
+        get_connection.assert_not_called()
+
+
+class NotificationPreferencesViewTests(ViewTestCase):
+    def test_user_saves_preferences(self):
+        requester = test_utils.create_requester()
+        self.login_user(requester.user)
+        self.assertEqual(self.get(reverse('core:notification-preferences')).status_code, 200)
+        resp = self.post(reverse('core:notification-preferences'), data={'digest_window': NotificationPreference.DAILY, 'comments': 'on'})
+        self.assertRedirects(resp, reverse('core:notification-preferences'))
+        preference = NotificationPreference.objects.get(user=requester.user)
+        self.assertEqual((preference.digest_window, preference.claims, preference.comments), (NotificationPreference.DAILY, False, True))
+
+    def test_turning_notifications_off_drops_pending_ones(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        shopper.claim_requested_item(test_utils.create_requested_item(requester=requester))
+        self.login_user(requester.user)
+        self.post(reverse('core:notification-preferences'), data={'digest_window': NotificationPreference.NEVER})
+        self.assertFalse(Notification.objects.exists())
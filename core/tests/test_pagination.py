@@ -0,0 +1,51 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Comment, RequestedItem
+from core.pagination import InvalidCursor, KeysetPaginator, encode_cursor
+from core.tests import utils
+
+
+class KeysetPaginatorTestCase(TestCase):
+    def paginator(self, per_page):
+        return KeysetPaginator(RequestedItem.objects.all(), ('-priority', 'id'), per_page)
+
+    def test_pages_follow_priority_then_id_ordering(self):
+        requester = utils.create_requester()
+        low = utils.create_requested_item(requester=requester, priority=RequestedItem.LOW)
+        high_one = utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        high_two = utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        medium = utils.create_requested_item(requester=requester, priority=RequestedItem.MEDIUM)
+        paginator = self.paginator(per_page=3)
+        first_page = paginator.page()
+        self.assertEqual(first_page.object_list, [high_one, high_two, medium])
+        self.assertTrue(first_page.has_next)
+        second_page = paginator.page(first_page.next_cursor)
+        self.assertEqual(second_page.object_list, [low])
+        self.assertFalse(second_page.has_next)
+
+    def test_last_full_page_has_no_next_cursor(self):
+        utils.create_requested_item()
+        utils.create_requested_item()
+        self.assertFalse(self.paginator(per_page=2).page().has_next)
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator(per_page=2).page('not a cursor')
+
+    def test_wrongly_typed_cursor_is_rejected(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator(per_page=2).page(encode_cursor(['high', 1]))
+
+    def test_datetime_cursor_keeps_microseconds(self):
+        requested_item = utils.create_requested_item()
+        comments = [utils.create_comment(requested_item=requested_item) for _ in range(3)]
+        created = timezone.now()
+        for microseconds, comment in zip([900, 500, 100], comments):
+            Comment.objects.filter(pk=comment.pk).update(created=created + datetime.timedelta(microseconds=microseconds))
+        paginator = KeysetPaginator(Comment.objects.all(), ('-created', '-id'), per_page=1)
+        first_page = paginator.page()
+        self.assertEqual(first_page.object_list, comments[:1])
+        self.assertEqual(paginator.page(first_page.next_cursor).object_list, comments[1:2])
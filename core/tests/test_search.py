@@ -0,0 +1,68 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import search
+from core.models import Comment, Item
+from core.tests import utils as test_utils
+from core.tests.test_views import ViewTestCase
+
+
+@override_settings(TASKS_EAGER=True)
+class SearchIndexTestCase(TestCase):
+    def test_items_and_comments_are_matched_by_words(self):
+        item = test_utils.create_item(name='Organic whole milk')
+        comment = test_utils.create_comment(body='Any brand is fine, just not the cheapest one')
+        self.assertEqual(list(search.matching(Item, 'milk organic')), [item])
+        self.assertEqual(list(search.matching(Comment, 'brand')), [comment])
+        self.assertEqual(list(search.matching(Comment, 'brand milk')), [])
+
+    def test_index_follows_changes(self):
+        comment = test_utils.create_comment(body='Get the red one')
+        comment.body = 'Get the blue one'
+        comment.save()
+        self.assertEqual(list(search.matching(Comment, 'red')), [])
+        self.assertEqual(list(search.matching(Comment, 'blue')), [comment])
+        comment.delete()
+        self.assertEqual(list(search.matching(Comment, 'blue')), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        test_utils.create_comment(body='Half "price" OR nothing')
+        self.assertEqual(search.matching(Comment, 'price" OR "x').count(), 0)
+        self.assertEqual(search.matching(Comment, 'NEAR(price').count(), 0)
+
+
+@override_settings(TASKS_EAGER=True)
+class SearchViewTests(ViewTestCase):
+    def search(self, query, url='core:search'):
+        return self.get(reverse(url), data={'q': query})
+
+    def test_requester_finds_own_items_by_name_and_comment(self):
+        requester = test_utils.create_requester()
+        by_name = test_utils.create_requested_item(requester=requester, item=test_utils.create_item(name='Basmati rice'))
+        by_comment = test_utils.create_requested_item(requester=requester)
+        test_utils.create_comment(requested_item=by_comment, body='Basmati if they have it')
+        test_utils.create_requested_item(item=test_utils.create_item(name='Basmati rice 5kg'))
+        self.login_user(requester.user)
+        resp = self.search('basmati')
+        self.assertResponseOK(resp)
+        self.assertEqual(sorted(requested_item.pk for requested_item in resp.context['requested_items']),
+                         [by_name.pk, by_comment.pk])
+        matching_comments = {requested_item.pk: requested_item.matching_comments for requested_item in resp.context['requested_items']}
+        self.assertEqual([comment.body for comment in matching_comments[by_comment.pk]], ['Basmati if they have it'])
+
+    def test_shopper_only_finds_items_assigned_to_them(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        item = test_utils.create_item(name='Sourdough bread')
+        assigned = test_utils.create_requested_item(requester=requester, shopper=shopper, item=item)
+        test_utils.create_requested_item(requester=requester, item=item)
+        self.login_user(shopper.user)
+        data = self.search('sourdough', url='core:api-search').json()
+        self.assertEqual([result['id'] for result in data['results']], [assigned.pk])
+
+    def test_empty_query_finds_nothing(self):
+        requester = test_utils.create_requester()
+        test_utils.create_requested_item(requester=requester)
+        self.login_user(requester.user)
+        self.assertEqual(list(self.search('  ').context['requested_items']), [])
+        self.assertResponseStatusCode(self.search('', url='core:api-search'), 400)
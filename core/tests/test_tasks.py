@@ -0,0 +1,133 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import search, tasks
+from core.models import Item, RequestedItem, Requester, Task
+from core.tests import utils as test_utils
+from core.tests.test_views import ViewTestCase
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTestCase(TestCase):
+    def setUp(self):
+        super(TaskQueueTestCase, self).setUp()
+        self.calls = []
+        self.handlers = mock.patch.dict(tasks.handlers)
+        self.handlers.start()
+        self.addCleanup(self.handlers.stop)
+
+    def register(self, name, function=None, **kwargs):
+        tasks.handler(name, **kwargs)(function or self.calls.append)
+
+    def test_payloads_run_in_one_batch_per_handler(self):
+        self.register('collect', dedupe=lambda payload: payload['n'])
+        tasks.enqueue('collect', {'n': 1}, {'n': 2}, {'n': 1})
+        tasks.enqueue('collect', {'n': 2}, {'n': 3})
+        self.assertEqual(self.calls, [])
+        self.assertEqual(tasks.run_due_tasks(), 3)
+        self.assertEqual(self.calls, [[{'n': 1}, {'n': 2}, {'n': 3}]])
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(tasks.run_due_tasks(), 0)
+
+    def test_failures_are_retried_with_backoff_then_kept(self):
+        def fail(payloads):
+            Item.objects.create(name='rolled back')
+            raise ValueError('mail relay down')
+        self.register('fail', fail, max_attempts=2, retry_delay=10)
+        tasks.enqueue('fail', {})
+        now = timezone.now()
+        self.assertEqual(tasks.run_due_tasks(now=now), 1)
+        task = Task.objects.get()
+        self.assertEqual((task.attempts, task.failed, task.run_after), (1, False, now + datetime.timedelta(seconds=10)))
+        self.assertIn('mail relay down', task.last_error)
+        self.assertFalse(Item.objects.exists())
+        self.assertEqual(tasks.run_due_tasks(now=now), 0)
+        self.assertEqual(tasks.run_due_tasks(now=now + datetime.timedelta(seconds=10)), 1)
+        task.refresh_from_db()
+        self.assertEqual((task.attempts, task.failed), (2, True))
+        self.assertEqual(tasks.run_due_tasks(now=now + datetime.timedelta(days=1)), 0)
+
+    def test_tasks_of_a_stopped_worker_run_again_after_their_lease(self):
+        self.register('collect', max_attempts=2)
+        tasks.enqueue('collect', {'n': 1})
+        now = timezone.now()
+        self.assertEqual(len(tasks.take_due_tasks(10, now, lease=60)), 1)
+        self.assertEqual(Task.objects.get().dedupe_key, None)
+        self.assertEqual(tasks.run_due_tasks(now=now + datetime.timedelta(seconds=59)), 0)
+        tasks.take_due_tasks(10, now + datetime.timedelta(seconds=60), lease=60)
+        self.assertEqual(tasks.run_due_tasks(now=now + datetime.timedelta(seconds=120)), 1)
+        self.assertEqual(self.calls, [])
+        task = Task.objects.get()
+        self.assertEqual((task.attempts, task.failed, task.last_error), (3, True, 'The worker stopped while running this task.'))
+
+    def test_one_failing_handler_does_not_hold_back_others(self):
+        self.register('collect')
+        tasks.enqueue('collect', {'n': 1})
+        Task.objects.create(name='removed', payload='{}')
+        self.assertEqual(tasks.run_due_tasks(), 2)
+        self.assertEqual(self.calls, [[{'n': 1}]])
+        self.assertEqual(list(Task.objects.values_list('name', 'failed')), [('removed', True)])
+
+    def test_taken_tasks_can_be_queued_again(self):
+        def requeue(payloads):
+            self.calls.append(payloads)
+            if len(self.calls) == 1:
+                tasks.enqueue('requeue', {'n': 1})
+        self.register('requeue', requeue, dedupe=lambda payload: payload['n'])
+        tasks.enqueue('requeue', {'n': 1})
+        tasks.run_due_tasks()
+        self.assertEqual(Task.objects.count(), 1)
+        tasks.run_due_tasks()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_requester_counters_follow_from_the_queue(self):
+        requester = test_utils.create_requester()
+        Task.objects.all().delete()
+        test_utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        test_utils.create_requested_item(requester=requester)
+        requester.refresh_from_db()
+        self.assertEqual(requester.open_items_count, 0)
+        self.assertEqual(Task.objects.filter(name='move_requester_counters').count(), 2)
+        version = requester.items_version
+        call_command('run_tasks', once=True, stdout=StringIO())
+        requester.refresh_from_db()
+        self.assertEqual((requester.open_items_count, requester.high_priority_open_items_count, requester.items_version), (2, 1, version))
+
+    def test_worker_exits_after_max_seconds(self):
+        self.register('collect')
+        tasks.enqueue('collect', {'n': 1})
+        stdout = StringIO()
+        call_command('run_tasks', max_seconds=0.01, poll_interval=0.001, stdout=stdout)
+        self.assertEqual(self.calls, [[{'n': 1}]])
+        self.assertIn('Ran 1 task(s).', stdout.getvalue())
+
+    def test_search_index_follows_from_the_queue(self):
+        if not search.maintains_index():
+            self.skipTest('The database indexes for search itself.')
+        item = test_utils.create_item(name='Oat milk')
+        self.assertEqual(search.matching(Item, 'oat').count(), 0)
+        tasks.run_due_tasks()
+        self.assertEqual(list(search.matching(Item, 'oat')), [item])
+        Item.objects.filter(pk=item.pk).delete()
+        tasks.run_due_tasks()
+        self.assertEqual(search.matching(Item, 'oat').count(), 0)
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueViewTests(ViewTestCase):
+    def test_claim_queues_the_counter_change(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        tasks.run_due_tasks()
+        self.login_user(shopper.user)
+        self.get(reverse('core:requested-item-claim', args=[requested_item.pk]))
+        self.assertEqual(Requester.objects.values_list('open_items_count', 'claimed_items_count').get(pk=requester.pk), (1, 0))
+        tasks.run_due_tasks()
+        self.assertEqual(Requester.objects.values_list('open_items_count', 'claimed_items_count').get(pk=requester.pk), (0, 1))
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core import utils
+
+
+class LocalizedEpochTimestampTestCase(SimpleTestCase):
+    # 2020-06-01 12:00:00 UTC, during British Summer Time.
+    epoch_timestamp = 1591012800
+
+    def set_server_timezone(self, timezone):
+        original = os.environ.get('TZ')
+        os.environ['TZ'] = timezone
+        time.tzset()
+
+        def restore():
+            if original is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = original
+            time.tzset()
+        self.addCleanup(restore)
+
+    def test_localized_datetime_is_independent_of_server_timezone(self):
+        self.set_server_timezone('America/New_York')
+        localized = utils.localized_datetime_from_epoch_timestamp(self.epoch_timestamp)
+        self.assertEqual(localized.isoformat(), '2020-06-01T13:00:00+01:00')
+
+    def test_datetime_string(self):
+        self.assertEqual(utils.localized_datetime_string_from_epoch_timestamp(self.epoch_timestamp), '2020-06-01 13:00:00 BST')
+
+    def test_datetime_string_is_memoized_per_second(self):
+        utils.localized_datetime_string_from_epoch_second.cache_clear()
+        utils.localized_datetime_string_from_epoch_timestamp(self.epoch_timestamp)
+        utils.localized_datetime_string_from_epoch_timestamp(self.epoch_timestamp + 0.5)
+        self.assertEqual(utils.localized_datetime_string_from_epoch_second.cache_info().hits, 1)
+
+    def test_column_of_timestamps_is_formatted_at_once(self):
+        formatted = utils.localized_datetime_strings_from_epoch_timestamps(
+            [self.epoch_timestamp, None, self.epoch_timestamp + 3600], timezone='UTC', date_format='%H:%M', empty='-')
+        self.assertEqual(formatted, ['12:00', '-', '13:00'])
+
+
+class MemoizedReverseTestCase(SimpleTestCase):
+    def test_matches_reverse(self):
+        self.assertEqual(utils.memoized_reverse('admin:core_item_change', object_id=42),
+                         reverse('admin:core_item_change', kwargs={'object_id': 42}))
+        self.assertEqual(utils.memoized_reverse('core:add-shopper', pk=7, invite_token='abc-123'),
+                         reverse('core:add-shopper', kwargs={'pk': 7, 'invite_token': 'abc-123'}))
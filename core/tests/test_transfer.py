@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core import search, tasks, transfer
+from core.models import Item, RequestedItem
+from core.tests import utils as test_utils
+from core.tests.test_views import ViewTestCase
+
+
+def rows_from_csv(text):
+    return transfer.read_requested_items(io.StringIO(text), 'csv')
+
+
+class ImportTestCase(TestCase):
+    def test_rows_are_created_in_batches_reusing_items(self):
+        requester = test_utils.create_requester()
+        milk = test_utils.create_item(name='Milk')
+        rows = rows_from_csv('item,quantity,priority\n milk ,2,High\nBread,,low\nEggs,12,1\nbread,1,2\n')
+        with self.assertNumQueries(20):
+            result = transfer.import_requested_items(requester, rows, batch_size=2)
+        self.assertEqual((result.created, result.errors), (4, []))
+        requested_items = list(RequestedItem.objects.filter(requester=requester).order_by('id').values_list('item__name', 'quantity', 'priority'))
+        self.assertEqual(requested_items, [('Milk', 2, RequestedItem.HIGH), ('Bread', 1, RequestedItem.LOW),
+                                           ('Eggs', 12, RequestedItem.MEDIUM), ('Bread', 1, RequestedItem.HIGH)])
+        tasks.run_due_tasks()
+        requester.refresh_from_db()
+        self.assertEqual((requester.open_items_count, requester.high_priority_open_items_count), (4, 2))
+        self.assertEqual(Item.objects.filter(normalized_name='milk').get(), milk)
+        self.assertEqual(list(search.matching(Item, 'eggs').values_list('name', flat=True)), ['Eggs'])
+        tasks.run_due_tasks()
+        requester.refresh_from_db()
+        self.assertEqual((requester.open_items_count, requester.high_priority_open_items_count), (4, 2))
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        requester = test_utils.create_requester()
+        rows = rows_from_csv('item,quantity,priority\nMilk,two,low\n,1,low\nEggs,0,low\nRice,1,urgent\nFlour,1,medium\n')
+        result = transfer.import_requested_items(requester, rows)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [
+            (2, 'The quantity "two" is not a whole number.'),
+            (3, 'Enter the name of the item.'),
+            (4, 'The quantity must be at least 1.'),
+            (5, 'Unknown priority "urgent".'),
+        ])
+
+    def test_jsonl_rows_that_are_not_objects_are_reported(self):
+        requester = test_utils.create_requester()
+        rows = transfer.read_requested_items(io.StringIO('{"item": "Milk", "quantity": 3}\n\n[1]\nnot json\n'), 'jsonl')
+        result = transfer.import_requested_items(requester, rows)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [(3, 'Not a JSON object.'), (4, 'Not a JSON object.')])
+
+    def test_import_stops_after_max_rows(self):
+        requester = test_utils.create_requester()
+        result = transfer.import_requested_items(requester, rows_from_csv('item\na\nb\nc\n'), batch_size=2, max_rows=2)
+        self.assertEqual(result.created, 2)
+        self.assertTrue(result.truncated)
+
+
+class ExportTestCase(TestCase):
+    def test_export_round_trips_through_import(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        test_utils.create_requested_item(requester=requester, item=test_utils.create_item(name='Milk, semi-skimmed'), quantity=2,
+                                         priority=RequestedItem.HIGH, shopper=shopper, claimed_epoch_timestamp=1591012800)
+        test_utils.create_requested_item(requester=requester, item=test_utils.create_item(name='Bread'), quantity=1,
+                                         priority=RequestedItem.LOW)
+        for export_format in transfer.FORMATS:
+            exported = ''.join(transfer.export_requested_items(RequestedItem.objects.for_requester(requester), export_format,
+                                                               lines_per_chunk=1))
+            other = test_utils.create_requester()
+            result = transfer.import_requested_items(other, transfer.read_requested_items(io.StringIO(exported), export_format))
+            self.assertEqual((result.created, result.errors), (2, []))
+            self.assertEqual(list(RequestedItem.objects.filter(requester=other).order_by('id').values_list('item__name', 'quantity', 'priority')),
+                             [('Milk, semi-skimmed', 2, RequestedItem.HIGH), ('Bread', 1, RequestedItem.LOW)])
+
+    def test_csv_export_columns(self):
+        shopper = test_utils.create_shopper()
+        requested_item = test_utils.create_requested_item(item=test_utils.create_item(name='Milk'), quantity=1,
+                                                          priority=RequestedItem.MEDIUM,
+                                                          shopper=shopper, claimed_epoch_timestamp=1591012800)
+        exported = ''.join(transfer.export_requested_items(RequestedItem.objects.all(), 'csv'))
+        self.assertEqual(list(csv.reader(io.StringIO(exported))), [
+            transfer.EXPORT_COLUMNS,
+            [str(requested_item.pk), 'Milk', '1', 'Medium', shopper.user.username, '1591012800', ''],
+        ])
+
+
+class CommandsTestCase(TestCase):
+    def test_import_then_export(self):
+        requester = test_utils.create_requester()
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'items.jsonl')
+            with open(source, 'w') as f:
+                f.write(json.dumps({'item': 'Milk', 'quantity': 2, 'priority': 'High'}) + '\n{"item": ""}\n')
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('import_requested_items', requester.user.username, source, stdout=stdout, stderr=stderr)
+            self.assertIn('Imported 1 requested item(s), skipped 1 row(s).', stdout.getvalue())
+            self.assertIn('Line 2: Enter the name of the item.', stderr.getvalue())
+            stdout = io.StringIO()
+            call_command('export_requested_items', requester=requester.user.username, format='jsonl', stdout=stdout)
+        self.assertEqual([json.loads(line)['item'] for line in stdout.getvalue().splitlines()], ['Milk'])
+
+    def test_unknown_requester(self):
+        with self.assertRaisesMessage(Exception, 'Requester nobody does not exist.'):
+            call_command('import_requested_items', 'nobody', 'items.csv')
+
+
+class TransferViewTests(ViewTestCase):
+    def test_requester_imports_a_file(self):
+        requester = test_utils.create_requester()
+        self.login_user(requester.user)
+        upload = SimpleUploadedFile('items.csv', b'\xef\xbb\xbfitem,quantity,priority\nMilk,2,high\nEggs,zero,low\n')
+        resp = self.post(reverse('core:requested-items-import'), data={'file': upload, 'format': 'csv'})
+        self.assertContains(resp, 'Imported 1 requested item(s).')
+        self.assertContains(resp, 'Line 3: The quantity &quot;zero&quot; is not a whole number.')
+        self.assertEqual(list(RequestedItem.objects.filter(requester=requester).values_list('item__name', 'quantity')), [('Milk', 2)])
+
+    def test_requester_exports_own_items_as_a_stream(self):
+        requester = test_utils.create_requester()
+        test_utils.create_requested_item(requester=requester, item=test_utils.create_item(name='Milk'))
+        test_utils.create_requested_item(item=test_utils.create_item(name='Someone else\'s'))
+        self.login_user(requester.user)
+        resp = self.get(reverse('core:requested-items-export'), data={'format': 'jsonl'})
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['item'] for line in lines], ['Milk'])
+        self.assertEqual(self.get(reverse('core:requested-items-export'), data={'format': 'xml'}).status_code, 404)
+
+    def test_shopper_cannot_import_or_export(self):
+        self.login_user(test_utils.create_shopper().user)
+        self.assertEqual(self.get(reverse('core:requested-items-import')).status_code, 403)
+        self.assertEqual(self.get(reverse('core:requested-items-export')).status_code, 403)
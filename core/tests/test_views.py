@@ -1,11 +1,24 @@
+from unittest import mock
+
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from core.models import RequestedItem
+from core import tasks, views
+from core.models import Item, ListTemplate, RequestedItem
+from core.pagination import encode_cursor
 from core.tests import utils as test_utils
 
 
 class ViewTestCase(TestCase):
+    def setUp(self):
+        super(ViewTestCase, self).setUp()
+        for cache in caches.all():
+            cache.clear()
+
     def get(self, path, **kwargs):
         return self.client.get(path, **kwargs)
 
@@ -39,6 +52,11 @@ class ViewTestCase(TestCase):
     def login_user(self, user):
         self.client.force_login(user)
 
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as context:
+            self.assertResponseOK(self.get(path))
+        return len(context.captured_queries)
+
 
 class AddShopperViewTests(ViewTestCase):
     def test_user_must_be_logged_in_to_accept_invite(self):
@@ -123,12 +141,70 @@ class RequestedItemsViewTests(ViewTestCase):
         resp = self.view_requested_items()
         self.assertResponseOK(resp)
 
+    def test_requested_items_list_query_count_does_not_depend_on_row_count(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester()
+        test_utils.create_requested_item(requester=requester)
+        self.login_user(requester.user)
+        self.view_requested_items()
+        query_count = self.count_queries(reverse('core:requested-items'))
+        for _ in range(5):
+            test_utils.create_requested_item(requester=requester, shopper=shopper)
+        self.assertEqual(self.count_queries(reverse('core:requested-items')), query_count)
+
+    def test_requested_items_list_is_paginated_by_cursor(self):
+        requester = test_utils.create_requester()
+        requested_items = [test_utils.create_requested_item(requester=requester) for _ in range(3)]
+        self.login_user(requester.user)
+        with mock.patch.object(views.RequestedItemsListView, 'paginate_by', 2):
+            first_page = self.view_requested_items()
+            self.assertEqual(list(first_page.context['object_list']), requested_items[:2])
+            next_cursor = first_page.context['page_obj'].next_cursor
+            second_page = self.get(reverse('core:requested-items'), data={'cursor': next_cursor})
+        self.assertEqual(list(second_page.context['object_list']), requested_items[2:])
+        self.assertFalse(second_page.context['page_obj'].has_next)
+
+    def test_requested_items_list_with_invalid_cursor_is_not_found(self):
+        requester = test_utils.create_requester()
+        self.login_user(requester.user)
+        resp = self.get(reverse('core:requested-items'), data={'cursor': 'foo'})
+        self.assertResponseNotFound(resp)
+
+    def test_requested_items_list_with_wrongly_typed_cursor_is_not_found(self):
+        requester = test_utils.create_requester()
+        self.login_user(requester.user)
+        for cursor in (encode_cursor(['a', 'b']), encode_cursor([None, 1]), encode_cursor([[1], {}])):
+            resp = self.get(reverse('core:requested-items'), data={'cursor': cursor})
+            self.assertResponseNotFound(resp)
+
+    def test_requested_item_rows_are_cached_until_the_item_changes(self):
+        requester = test_utils.create_requester()
+        requested_item = test_utils.create_requested_item(requester=requester, item=test_utils.create_item(name='Milk'))
+        self.login_user(requester.user)
+        self.assertContains(self.view_requested_items(), 'Milk')
+        Item.objects.filter(pk=requested_item.item_id).update(name='Bread')
+        self.assertContains(self.view_requested_items(), 'Bread')
+        requested_item.item.name = 'Oat milk'
+        requested_item.item.save()
+        self.assertContains(self.view_requested_items(), 'Oat milk')
+
     def test_requesters_can_create_requested_items(self):
         requester = test_utils.create_requester()
         self.login_user(requester.user)
         resp = self.visit_requested_items()
         self.assertResponseOK(resp)
 
+    def test_requested_item_is_created_from_item_name(self):
+        requester = test_utils.create_requester()
+        item = test_utils.create_item(name='Milk')
+        self.login_user(requester.user)
+        self.assertNotIn('<select name="item"', self.visit_requested_items().content.decode())
+        self.post(reverse('core:requested-item-create'), data={'item_name': ' milk', 'quantity': 1, 'priority': RequestedItem.LOW})
+        self.post(reverse('core:requested-item-create'), data={'item_name': 'Bread', 'quantity': 1, 'priority': RequestedItem.LOW})
+        self.assertEqual(sorted(RequestedItem.objects.for_requester(requester).values_list('item__name', flat=True)),
+                         ['Bread', item.name])
+        self.assertEqual(Item.objects.count(), 2)
+
     def test_shoppers_cannot_create_requested_items(self):
         shopper = test_utils.create_shopper()
         self.login_user(shopper.user)
@@ -178,6 +254,388 @@ class RequestedItemsViewTests(ViewTestCase):
         resp = self.claim_item(requested_item)
         self.assertResponseIsPermissionDenied(resp)
 
+    def test_claiming_item_claimed_by_another_shopper_is_conflict(self):
+        shopper = test_utils.create_shopper()
+        other_shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester, shopper=other_shopper)
+        self.login_user(shopper.user)
+        resp = self.claim_item(requested_item)
+        self.assertResponseStatusCode(resp, 409)
+        requested_item.refresh_from_db()
+        self.assertEqual(requested_item.shopper, other_shopper)
+
+    def test_claiming_own_claimed_item_again_redirects(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        self.assertResponseIsRedirect(self.claim_item(requested_item))
+        self.assertResponseIsRedirect(self.claim_item(requested_item))
+
+    def test_claiming_missing_requested_item_is_permission_denied(self):
+        shopper = test_utils.create_shopper()
+        self.login_user(shopper.user)
+        resp = self.get(reverse('core:requested-item-claim', args=[0]))
+        self.assertResponseIsPermissionDenied(resp)
+
+    def test_authorized_claim_uses_cached_relationships(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        other_requested_item = test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        self.claim_item(other_requested_item)
+        # user, requested item, claim, requester version, queued counter change and notification
+        with self.assertNumQueries(6):
+            resp = self.claim_item(requested_item)
+        self.assertResponseIsRedirect(resp)
+
+    def test_removed_shopper_loses_access_to_requested_items(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        self.assertResponseIsRedirect(self.claim_item(requested_item))
+        requester.remove_shopper(shopper)
+        self.assertResponseIsPermissionDenied(self.claim_item(requested_item))
+
+
+class ConditionalGetTests(ViewTestCase):
+    def revalidate(self, path, response):
+        return self.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_requested_items_list_is_not_modified(self):
+        requester = test_utils.create_requester()
+        test_utils.create_requested_item(requester=requester)
+        self.login_user(requester.user)
+        path = reverse('core:requested-items')
+        resp = self.get(path)
+        self.assertResponseOK(resp)
+        self.assertIn('Last-Modified', resp)
+        # user, version stamp; the session comes from the cache
+        with self.assertNumQueries(2):
+            self.assertResponseStatusCode(self.revalidate(path, resp), 304)
+
+    def test_requested_items_list_changes_when_item_is_renamed(self):
+        requester = test_utils.create_requester()
+        item = test_utils.create_requested_item(requester=requester, item=test_utils.create_item(name='Milk')).item
+        self.login_user(requester.user)
+        path = reverse('core:requested-items')
+        resp = self.get(path)
+        item.name = 'Oat milk'
+        item.save()
+        self.assertContains(self.revalidate(path, resp), 'Oat milk')
+
+    def test_requested_items_list_changes_when_item_is_added(self):
+        requester = test_utils.create_requester()
+        self.login_user(requester.user)
+        path = reverse('core:requested-items')
+        resp = self.get(path)
+        test_utils.create_requested_item(requester=requester)
+        self.assertResponseOK(self.revalidate(path, resp))
+
+    def test_requester_detail_changes_when_item_is_claimed(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_item = test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        path = reverse('core:requester-detail', args=[requester.pk])
+        resp = self.get(path)
+        self.assertResponseStatusCode(self.revalidate(path, resp), 304)
+        shopper.claim_requested_item(requested_item)
+        self.assertResponseOK(self.revalidate(path, resp))
+
+    def test_requested_item_detail_changes_when_comment_is_added(self):
+        requested_item = test_utils.create_requested_item()
+        self.login_user(requested_item.requester.user)
+        path = reverse('core:requested-item-detail', args=[requested_item.pk])
+        resp = self.get(path)
+        self.assertResponseStatusCode(self.revalidate(path, resp), 304)
+        test_utils.create_comment(requested_item=requested_item)
+        self.assertResponseOK(self.revalidate(path, resp))
+
+    def test_etag_differs_between_users(self):
+        shopper_one = test_utils.create_shopper()
+        shopper_two = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper_one])
+        requester.add_shopper(shopper_two)
+        path = reverse('core:requester-detail', args=[requester.pk])
+        self.login_user(shopper_one.user)
+        resp = self.get(path)
+        self.login_user(shopper_two.user)
+        self.assertResponseOK(self.revalidate(path, resp))
+
+    def test_unauthorized_user_is_denied_before_revalidation(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        path = reverse('core:requester-detail', args=[requester.pk])
+        self.login_user(shopper.user)
+        resp = self.get(path)
+        requester.remove_shopper(shopper)
+        self.assertResponseIsPermissionDenied(self.revalidate(path, resp))
+
+
+class RequestedItemDetailViewTests(ViewTestCase):
+    def view_requested_item(self, requested_item, **data):
+        return self.get(reverse('core:requested-item-detail', args=[requested_item.pk]), data=data)
+
+    def test_comments_are_loaded_newest_first_in_windows(self):
+        requester = test_utils.create_requester()
+        requested_item = test_utils.create_requested_item(requester=requester)
+        comments = [test_utils.create_comment(requested_item=requested_item, author=requester.user) for _ in range(3)]
+        self.login_user(requester.user)
+        with mock.patch.object(views.RequestedItemsDetailView, 'paginate_by', 2):
+            first_page = self.view_requested_item(requested_item)
+            older = self.view_requested_item(requested_item, cursor=first_page.context['page_obj'].next_cursor)
+        self.assertEqual(list(first_page.context['comments']), comments[:0:-1])
+        self.assertContains(first_page, 'Load older comments')
+        self.assertEqual(list(older.context['comments']), comments[:1])
+        self.assertNotContains(older, 'Load older comments')
+
+    def test_query_count_does_not_depend_on_comment_authors(self):
+        requester = test_utils.create_requester()
+        requested_item = test_utils.create_requested_item(requester=requester)
+        test_utils.create_comment(requested_item=requested_item)
+        self.login_user(requester.user)
+        self.view_requested_item(requested_item)
+        path = reverse('core:requested-item-detail', args=[requested_item.pk])
+        query_count = self.count_queries(path)
+        for _ in range(5):
+            test_utils.create_comment(requested_item=requested_item)
+        self.assertEqual(self.count_queries(path), query_count)
+
+
+class RequesterBulkClaimViewTests(ViewTestCase):
+    def bulk_claim(self, requester, requested_items, action='claim'):
+        data = {'action': action, 'requested_items': [requested_item.pk for requested_item in requested_items]}
+        return self.post(reverse('core:requester-bulk-claim', args=[requester.pk]), data=data)
+
+    def test_shopper_can_claim_many_items_at_once(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_items = [test_utils.create_requested_item(requester=requester) for _ in range(3)]
+        self.login_user(shopper.user)
+        resp = self.bulk_claim(requester, requested_items)
+        self.assertResponseIsRedirect(resp)
+        self.assertEqual(RequestedItem.objects.filter(shopper=shopper).count(), 3)
+
+    def test_bulk_claim_reports_items_claimed_by_someone_else(self):
+        shopper = test_utils.create_shopper()
+        other_shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        available = test_utils.create_requested_item(requester=requester)
+        taken = test_utils.create_requested_item(requester=requester, shopper=other_shopper)
+        self.login_user(shopper.user)
+        resp = self.bulk_claim(requester, [available, taken])
+        taken.refresh_from_db()
+        self.assertEqual(taken.shopper, other_shopper)
+        self.assertEqual(RequestedItem.objects.filter(shopper=shopper).get(), available)
+        messages = [str(message) for message in get_messages(resp.wsgi_request)]
+        self.assertIn('You claimed 1 item(s).', messages)
+        self.assertIn('These items could not be claimed: %s' % taken.item.name, messages)
+
+    def test_bulk_claim_reports_items_already_held_separately(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        available = test_utils.create_requested_item(requester=requester)
+        held = test_utils.create_requested_item(requester=requester, shopper=shopper)
+        self.login_user(shopper.user)
+        resp = self.bulk_claim(requester, [available, held])
+        messages = [str(message) for message in get_messages(resp.wsgi_request)]
+        self.assertEqual(messages, ['You claimed 1 item(s).', 'You already held 1 item(s).'])
+
+    def test_bulk_release_reports_only_items_released(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        own = test_utils.create_requested_item(requester=requester, shopper=shopper)
+        released = test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        resp = self.bulk_claim(requester, [own, released], action='release')
+        messages = [str(message) for message in get_messages(resp.wsgi_request)]
+        self.assertEqual(messages, ['You released 1 item(s).', 'These items could not be released: %s' % released.item.name])
+
+    def test_bulk_claim_ignores_items_of_other_requesters(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        other_requested_item = test_utils.create_requested_item()
+        self.login_user(shopper.user)
+        self.bulk_claim(requester, [other_requested_item])
+        other_requested_item.refresh_from_db()
+        self.assertIsNone(other_requested_item.shopper)
+
+    def test_shopper_can_release_own_items(self):
+        shopper = test_utils.create_shopper()
+        other_shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        own = test_utils.create_requested_item(requester=requester, shopper=shopper)
+        not_own = test_utils.create_requested_item(requester=requester, shopper=other_shopper)
+        self.login_user(shopper.user)
+        self.bulk_claim(requester, [own, not_own], action='release')
+        own.refresh_from_db()
+        not_own.refresh_from_db()
+        self.assertIsNone(own.shopper)
+        self.assertEqual(not_own.shopper, other_shopper)
+
+    def test_unauthorized_shopper_cannot_bulk_claim(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester()
+        requested_item = test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        resp = self.bulk_claim(requester, [requested_item])
+        self.assertResponseIsPermissionDenied(resp)
+
+
+class WorkQueueViewTests(ViewTestCase):
+    def view_work_queue(self, **data):
+        return self.get(reverse('core:work-queue'), data=data)
+
+    def test_shopper_sees_unclaimed_items_of_all_linked_requesters_by_priority(self):
+        shopper = test_utils.create_shopper()
+        requester, requester_two = [test_utils.create_requester(shoppers=[shopper]) for _ in range(2)]
+        low = test_utils.create_requested_item(requester=requester, priority=RequestedItem.LOW)
+        high = test_utils.create_requested_item(requester=requester_two, priority=RequestedItem.HIGH)
+        high_two = test_utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        test_utils.create_requested_item(requester=requester, shopper=test_utils.create_shopper())
+        test_utils.create_requested_item()
+        self.login_user(shopper.user)
+        resp = self.view_work_queue()
+        self.assertResponseOK(resp)
+        self.assertEqual(list(resp.context['requested_items']), [high, high_two, low])
+
+    def test_work_queue_query_count_does_not_depend_on_requester_count(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        self.view_work_queue()
+        query_count = self.count_queries(reverse('core:work-queue'))
+        for _ in range(3):
+            test_utils.create_requested_item(requester=test_utils.create_requester(shoppers=[shopper]))
+        self.view_work_queue()
+        self.assertEqual(self.count_queries(reverse('core:work-queue')), query_count)
+
+    def test_work_queue_is_paginated_by_cursor(self):
+        shopper = test_utils.create_shopper()
+        requested_items = [
+            test_utils.create_requested_item(requester=test_utils.create_requester(shoppers=[shopper]), priority=RequestedItem.LOW)
+            for _ in range(3)
+        ]
+        self.login_user(shopper.user)
+        with mock.patch.object(views.WorkQueueView, 'paginate_by', 2):
+            first_page = self.view_work_queue()
+            second_page = self.view_work_queue(cursor=first_page.context['page_obj'].next_cursor)
+        self.assertEqual(list(first_page.context['requested_items']), requested_items[:2])
+        self.assertEqual(list(second_page.context['requested_items']), requested_items[2:])
+
+    def test_work_queue_grouped_by_item_totals_quantities(self):
+        shopper = test_utils.create_shopper()
+        item = test_utils.create_item()
+        for quantity, priority in [(2, RequestedItem.LOW), (3, RequestedItem.MEDIUM)]:
+            test_utils.create_requested_item(requester=test_utils.create_requester(shoppers=[shopper]), item=item,
+                                             quantity=quantity, priority=priority)
+        self.login_user(shopper.user)
+        resp = self.view_work_queue(group='item')
+        self.assertResponseOK(resp)
+        totals, = resp.context['requested_items']
+        self.assertEqual((totals['item'], totals['total_quantity'], totals['requested_items'], totals['priority_string']),
+                         (item.pk, 5, 2, 'Medium'))
+
+    def test_work_queue_grouped_by_item_is_capped(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        urgent = test_utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        test_utils.create_requested_item(requester=requester, priority=RequestedItem.LOW)
+        self.login_user(shopper.user)
+        with mock.patch.object(views.WorkQueueView, 'grouped_limit', 1):
+            resp = self.view_work_queue(group='item')
+        self.assertEqual([totals['item'] for totals in resp.context['requested_items']], [urgent.item_id])
+        self.assertContains(resp, 'Showing the 1 most urgent items.')
+
+    def test_claiming_from_work_queue_returns_to_it(self):
+        shopper = test_utils.create_shopper()
+        requested_item = test_utils.create_requested_item(requester=test_utils.create_requester(shoppers=[shopper]))
+        self.login_user(shopper.user)
+        resp = self.get(reverse('core:requested-item-claim', args=[requested_item.pk]), data={'next': reverse('core:work-queue')})
+        self.assertRedirects(resp, reverse('core:work-queue'))
+        resp = self.get(reverse('core:requested-item-claim', args=[requested_item.pk]), data={'next': 'https://example.com/'})
+        self.assertRedirects(resp, reverse('core:requester-detail', args=[requested_item.requester_id]), fetch_redirect_response=False)
+
+    def test_unchanged_work_queue_is_not_modified(self):
+        shopper = test_utils.create_shopper()
+        requested_item = test_utils.create_requested_item(requester=test_utils.create_requester(shoppers=[shopper]))
+        self.login_user(shopper.user)
+        etag = self.view_work_queue()['ETag']
+        self.assertResponseStatusCode(self.get(reverse('core:work-queue'), HTTP_IF_NONE_MATCH=etag), 304)
+        test_utils.create_requested_item(requester=requested_item.requester)
+        self.assertResponseOK(self.get(reverse('core:work-queue'), HTTP_IF_NONE_MATCH=etag))
+
+    def test_requester_cannot_view_work_queue(self):
+        self.login_user(test_utils.create_requester().user)
+        self.assertResponseIsPermissionDenied(self.view_work_queue())
+
+
+class ShoppingListViewTests(ViewTestCase):
+    def setUp(self):
+        super(ShoppingListViewTests, self).setUp()
+        self.shopper = test_utils.create_shopper()
+        self.item = test_utils.create_item()
+        self.requesters = [test_utils.create_requester(shoppers=[self.shopper]) for _ in range(2)]
+        for requester, quantity in zip(self.requesters, [2, 3]):
+            test_utils.create_requested_item(requester=requester, shopper=self.shopper, item=self.item, quantity=quantity,
+                                             priority=RequestedItem.MEDIUM)
+        self.login_user(self.shopper.user)
+
+    def view_shopping_list(self, **data):
+        return self.get(reverse('core:shopping-list'), data=data)
+
+    def test_shopper_sees_claimed_items_merged_across_requesters(self):
+        resp = self.view_shopping_list()
+        self.assertResponseOK(resp)
+        row, = resp.context['shopping_list']
+        self.assertEqual((row['item'], row['total_quantity'], row['priority_string']), (self.item.pk, 5, 'Medium'))
+        self.assertEqual(row['requesters'], sorted(requester.user.username for requester in self.requesters))
+
+    def test_shopping_list_query_count_does_not_depend_on_row_count(self):
+        self.view_shopping_list()
+        query_count = self.count_queries(reverse('core:shopping-list'))
+        for _ in range(3):
+            test_utils.create_requested_item(requester=self.requesters[0], shopper=self.shopper)
+        self.assertEqual(self.count_queries(reverse('core:shopping-list')), query_count)
+
+    def test_shopping_list_exports(self):
+        resp = self.view_shopping_list(format='csv')
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        rows = resp.content.decode().splitlines()
+        self.assertEqual(rows[0], 'item_name,total_quantity,priority_string,requesters')
+        self.assertTrue(rows[1].startswith('%s,5,Medium,' % self.item.name))
+        data = self.view_shopping_list(format='json').json()
+        self.assertEqual(data['results'][0]['total_quantity'], 5)
+
+    def test_bought_items_leave_the_shopping_list(self):
+        other_item = test_utils.create_requested_item(requester=self.requesters[0], shopper=self.shopper).item
+        resp = self.post(reverse('core:shopping-list'), data={'items': [self.item.pk]})
+        self.assertResponseIsRedirect(resp)
+        self.assertEqual([row['item'] for row in self.view_shopping_list().context['shopping_list']], [other_item.pk])
+
+    def test_bought_message_counts_only_newly_fulfilled_items(self):
+        test_utils.create_requested_item(requester=self.requesters[0], shopper=self.shopper, item=self.item, fulfilled_epoch_timestamp=1591012800)
+        test_utils.create_requested_item(requester=self.requesters[0], shopper=test_utils.create_shopper(), item=self.item)
+        resp = self.post(reverse('core:shopping-list'), data={'items': [self.item.pk]})
+        self.assertIn('You bought 2 requested item(s).', [str(message) for message in get_messages(resp.wsgi_request)])
+
+    def test_items_claimed_by_others_are_not_listed_or_bought(self):
+        other_shopper = test_utils.create_shopper()
+        requested_item = test_utils.create_requested_item(requester=self.requesters[0], shopper=other_shopper)
+        self.assertNotIn(requested_item.item_id, [row['item'] for row in self.view_shopping_list().context['shopping_list']])
+        self.post(reverse('core:shopping-list'), data={'items': [requested_item.item_id]})
+        requested_item.refresh_from_db()
+        self.assertIsNone(requested_item.fulfilled_epoch_timestamp)
+
+    def test_requester_cannot_view_shopping_list(self):
+        self.login_user(self.requesters[0].user)
+        self.assertResponseIsPermissionDenied(self.view_shopping_list())
+
 
 class CommentViewTests(ViewTestCase):
     def create_comment(self, requested_item, data):
@@ -252,6 +710,20 @@ class RequestersForShopperViewTests(ViewTestCase):
     def view_requester_detail(self, requester):
         return self.get(reverse('core:requester-detail', args=[requester.pk]))
 
+    def test_shopper_sees_item_counts_for_each_requester(self):
+        shopper = test_utils.create_shopper()
+        requesters = [test_utils.create_requester(shoppers=[shopper]) for _ in range(3)]
+        for requester in requesters:
+            test_utils.create_requested_item(requester=requester, priority=RequestedItem.HIGH)
+        tasks.run_due_tasks()
+        self.login_user(shopper.user)
+        resp = self.get(reverse('core:requesters'))
+        self.assertResponseOK(resp)
+        self.assertEqual([requester.open_items_count for requester in resp.context['object_list']], [1, 1, 1])
+        # user, shopper, requesters with their users
+        with self.assertNumQueries(3):
+            self.get(reverse('core:requesters'))
+
     def test_requester_cannot_view_requesters_for_shopper(self):
         requester = test_utils.create_requester()
         self.login_user(requester.user)
@@ -265,9 +737,109 @@ class RequestersForShopperViewTests(ViewTestCase):
         resp = self.view_requester_detail(requester_two)
         self.assertResponseIsPermissionDenied(resp)
 
+    def test_requester_detail_query_count_does_not_depend_on_row_count(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        test_utils.create_requested_item(requester=requester)
+        self.login_user(shopper.user)
+        self.view_requester_detail(requester)
+        query_count = self.count_queries(reverse('core:requester-detail', args=[requester.pk]))
+        for _ in range(5):
+            test_utils.create_requested_item(requester=requester, shopper=shopper)
+        self.assertEqual(self.count_queries(reverse('core:requester-detail', args=[requester.pk])), query_count)
+
+    def test_requester_detail_items_are_paginated_by_cursor(self):
+        shopper = test_utils.create_shopper()
+        requester = test_utils.create_requester(shoppers=[shopper])
+        requested_items = [test_utils.create_requested_item(requester=requester) for _ in range(3)]
+        self.login_user(shopper.user)
+        with mock.patch.object(views.RequesterForShopperDetailView, 'paginate_by', 2):
+            first_page = self.view_requester_detail(requester)
+            next_cursor = first_page.context['page_obj'].next_cursor
+            second_page = self.get(reverse('core:requester-detail', args=[requester.pk]), data={'cursor': next_cursor})
+        self.assertEqual(list(first_page.context['requested_items']), requested_items[:2])
+        self.assertEqual(list(second_page.context['requested_items']), requested_items[2:])
+
     def test_shopper_cannot_view_detail_of_unauthorized_requester(self):
         shopper = test_utils.create_shopper()
         requester = test_utils.create_requester()
         self.login_user(shopper.user)
         resp = self.view_requester_detail(requester)
         self.assertResponseIsPermissionDenied(resp)
+
+
+class RequestedItemAdminTests(ViewTestCase):
+    def test_changelist_shows_claimed_datetimes(self):
+        admin_user = test_utils.create_user(is_staff=True, is_superuser=True)
+        test_utils.create_requested_item(shopper=test_utils.create_shopper(), claimed_epoch_timestamp=1591012800)
+        test_utils.create_requested_item()
+        self.login_user(admin_user)
+        resp = self.get(reverse('admin:core_requesteditem_changelist'))
+        self.assertContains(resp, '2020-06-01 13:00:00 BST')
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        admin_user = test_utils.create_user(is_staff=True, is_superuser=True)
+        test_utils.create_requested_item(shopper=test_utils.create_shopper(), claimed_epoch_timestamp=1591012800)
+        self.login_user(admin_user)
+        url = reverse('admin:core_requesteditem_changelist')
+        self.get(url)
+        with CaptureQueriesContext(connection) as few:
+            self.get(url)
+        for _ in range(5):
+            test_utils.create_requested_item(shopper=test_utils.create_shopper())
+        with CaptureQueriesContext(connection) as many:
+            resp = self.get(url)
+        self.assertEqual(len(few), len(many))
+        self.assertContains(resp, reverse('admin:core_shopper_change', args=[RequestedItem.objects.last().shopper_id]))
+
+    def test_changelist_search_uses_related_admin(self):
+        admin_user = test_utils.create_user(is_staff=True, is_superuser=True)
+        self.login_user(admin_user)
+        for url in ('admin:core_requester_changelist', 'admin:core_shopper_changelist', 'admin:core_item_changelist'):
+            self.assertEqual(self.get(reverse(url), data={'q': 'milk'}).status_code, 200)
+
+
+class ItemAdminTests(ViewTestCase):
+    def test_item_named_like_an_existing_one_is_rejected(self):
+        milk = test_utils.create_item(name='Milk')
+        bread = test_utils.create_item(name='Bread')
+        self.login_user(test_utils.create_user(is_staff=True, is_superuser=True))
+        resp = self.post(reverse('admin:core_item_add'), data={'name': '  milk '})
+        self.assertContains(resp, 'An item with this name already exists.')
+        resp = self.post(reverse('admin:core_item_change', args=[bread.pk]), data={'name': 'MILK'})
+        self.assertContains(resp, 'An item with this name already exists.')
+        resp = self.post(reverse('admin:core_item_change', args=[milk.pk]), data={'name': 'Milk '})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(Item.objects.count(), 2)
+
+
+class ListTemplateViewTests(ViewTestCase):
+    def test_requester_repeats_current_list(self):
+        requester = test_utils.create_requester()
+        milk = test_utils.create_item(name='Milk')
+        test_utils.create_requested_item(requester=requester, item=milk, quantity=1, priority=RequestedItem.LOW)
+        test_utils.create_requested_item(requester=requester, item=milk, quantity=3, priority=RequestedItem.HIGH)
+        test_utils.create_requested_item(requester=requester, item=test_utils.create_item(), fulfilled_epoch_timestamp=1591012800)
+        self.login_user(requester.user)
+        resp = self.post(reverse('core:list-template-create'),
+                         data={'name': 'Weekly shop', 'interval_days': ListTemplate.WEEKLY, 'next_run': '2020-06-01 10:00'})
+        self.assertRedirects(resp, reverse('core:list-templates'))
+        template = ListTemplate.objects.get(requester=requester)
+        self.assertEqual(list(template.items.values_list('item', 'quantity', 'priority')), [(milk.pk, 3, RequestedItem.HIGH)])
+        self.assertContains(self.get(reverse('core:list-templates')), 'Weekly shop')
+
+    def test_template_needs_current_items(self):
+        self.login_user(test_utils.create_requester().user)
+        resp = self.post(reverse('core:list-template-create'),
+                         data={'name': 'Weekly shop', 'interval_days': ListTemplate.WEEKLY, 'next_run': '2020-06-01 10:00'})
+        self.assertContains(resp, 'Request some items first')
+        self.assertFalse(ListTemplate.objects.exists())
+
+    def test_only_owner_deletes_template(self):
+        requester = test_utils.create_requester()
+        template = ListTemplate.objects.create(requester=requester, name='Weekly shop', next_run='2020-06-01T10:00Z')
+        self.login_user(test_utils.create_requester().user)
+        self.assertEqual(self.post(reverse('core:list-template-delete', args=[template.pk])).status_code, 403)
+        self.login_user(requester.user)
+        self.assertRedirects(self.post(reverse('core:list-template-delete', args=[template.pk])), reverse('core:list-templates'))
+        self.assertFalse(ListTemplate.objects.exists())
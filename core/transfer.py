@@ -0,0 +1,163 @@
+import csv
+import json
+from collections import namedtuple
+
+from django.db import transaction
+
+from core import search, tasks
+from core.models import Item, RequestedItem, item_count_changes, requested_items_changed
+from core.utils import batched, normalize_item_name
+
+EXPORT_COLUMNS = ['id', 'item', 'quantity', 'priority', 'shopper', 'claimed_epoch_timestamp', 'fulfilled_epoch_timestamp']
+PRIORITIES = dict([(name.lower(), level) for level, name in RequestedItem.priority_levels] +
+                  [(str(level), level) for level, _ in RequestedItem.priority_levels])
+MAX_ITEM_NAME_LENGTH = Item._meta.get_field('name').max_length
+
+
+class Echo:
+    """
+    A file-like object that returns what is written to it, so csv.writer can produce one line at a time.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_rows(requested_items, chunk_size=2000):
+    # iterator() reads in chunks, through a server-side cursor on PostgreSQL.
+    rows = requested_items.order_by('id').values_list(
+        'id', 'item__name', 'quantity', 'priority', 'shopper__user__username', 'claimed_epoch_timestamp', 'fulfilled_epoch_timestamp')
+    for row in rows.iterator(chunk_size=chunk_size):
+        row = list(row)
+        row[3] = RequestedItem.priority_names[row[3]]
+        yield row
+
+
+def write_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_jsonl(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row
+
+
+Format = namedtuple('Format', ['content_type', 'write', 'read'])
+FORMATS = {
+    'csv': Format('text/csv', write_csv, read_csv),
+    'jsonl': Format('application/x-ndjson', write_jsonl, read_jsonl),
+}
+
+
+def export_requested_items(requested_items, export_format, lines_per_chunk=500):
+    """
+    Yield the export in chunks of `lines_per_chunk` lines, holding one chunk of rows in memory at a time.
+    """
+    for lines in batched(FORMATS[export_format].write(export_rows(requested_items)), lines_per_chunk):
+        yield ''.join(lines)
+
+
+def read_requested_items(stream, import_format):
+    """
+    Yield (line number, row) for each row of a text stream. Rows are dicts, or None when they cannot be parsed.
+    """
+    return FORMATS[import_format].read(stream)
+
+
+def clean_row(row):
+    if not isinstance(row, dict):
+        raise ValueError('Not a JSON object.')
+    name = ' '.join(str(row.get('item') or '').split())
+    if not name:
+        raise ValueError('Enter the name of the item.')
+    if len(name) > MAX_ITEM_NAME_LENGTH:
+        raise ValueError('The item name is longer than %s characters.' % MAX_ITEM_NAME_LENGTH)
+    quantity = row.get('quantity')
+    try:
+        quantity = int(quantity) if quantity not in (None, '') else 1
+    except (TypeError, ValueError):
+        raise ValueError('The quantity "%s" is not a whole number.' % quantity)
+    if quantity < 1:
+        raise ValueError('The quantity must be at least 1.')
+    priority = str(row.get('priority') or 'low').strip().lower()
+    if priority not in PRIORITIES:
+        raise ValueError('Unknown priority "%s".' % row.get('priority'))
+    return name, quantity, PRIORITIES[priority]
+
+
+class ImportResult:
+    max_errors = 100
+
+    def __init__(self):
+        self.created = 0
+        self.error_count = 0
+        # (line number, message) for the first max_errors rows that were skipped.
+        self.errors = []
+        self.truncated = False
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_number, message))
+
+
+def create_requested_items(requester, rows):
+    with transaction.atomic():
+        item_ids, created_items = Item.objects.ids_by_normalized_name({name for name, _, _ in rows})
+        if created_items and search.maintains_index():
+            tasks.enqueue('index_for_search', *[{'model': Item._meta.label_lower, 'pk': item.pk} for item in created_items])
+        requested_items = RequestedItem.objects.bulk_create_with_pks([
+            RequestedItem(requester=requester, item_id=item_ids[normalize_item_name(name)], quantity=quantity, priority=priority)
+            for name, quantity, priority in rows
+        ])
+        # bulk_create skips post_save, so announce the batch at once.
+        requested_items_changed.send(sender=RequestedItem, requester_ids={requester.pk},
+                                     requested_item_ids=[requested_item.pk for requested_item in requested_items],
+                                     action=RequestedItem.CREATED,
+                                     count_changes=item_count_changes(added=[requested_item.counted_row for requested_item in requested_items]))
+    return len(requested_items)
+
+
+def import_requested_items(requester, rows, batch_size=1000, max_rows=None):
+    """
+    Create a requested item for each valid (line number, row) in `rows`, a batch at a time.
+    Invalid rows are skipped and reported. Stops after `max_rows` rows.
+    """
+    result = ImportResult()
+    read = 0
+    for batch in batched(rows, batch_size):
+        valid = []
+        for line_number, row in batch:
+            if max_rows is not None and read == max_rows:
+                result.truncated = True
+                break
+            read += 1
+            try:
+                valid.append(clean_row(row))
+            except ValueError as e:
+                result.add_error(line_number, str(e))
+        if valid:
+            result.created += create_requested_items(requester, valid)
+        if result.truncated:
+            break
+    return result
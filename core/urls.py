@@ -1,12 +1,17 @@
 from django.urls import path
 
-from core import views
+from core import api, views
 
 app_name = 'core'
 
 urlpatterns = [
     path('', views.IndexView.as_view(), name='index'),
     path('requested-items/', views.RequestedItemsListView.as_view(), name='requested-items'),
+    path('requested-items/import/', views.RequestedItemsImportView.as_view(), name='requested-items-import'),
+    path('requested-items/export/', views.RequestedItemsExportView.as_view(), name='requested-items-export'),
+    path('list-templates/', views.ListTemplatesView.as_view(), name='list-templates'),
+    path('list-template/new/', views.ListTemplateCreateView.as_view(), name='list-template-create'),
+    path('list-template/<int:pk>/delete/', views.ListTemplateDeleteView.as_view(), name='list-template-delete'),
     path('requested-item/new/', views.RequestedItemsCreateView.as_view(), name='requested-item-create'),
     path('requested-item/<int:pk>/', views.RequestedItemsDetailView.as_view(), name='requested-item-detail'),
     path('requested-item/<int:pk>/delete/', views.RequestedItemsDeleteView.as_view(), name='requested-item-delete'),
@@ -18,10 +23,32 @@ urlpatterns = [
 
     path('requesters/', views.RequesterForShopperListView.as_view(), name='requesters'),
     path('requester/<int:pk>/', views.RequesterForShopperDetailView.as_view(), name='requester-detail'),
+    path('requester/<int:pk>/claim/', views.RequesterBulkClaimView.as_view(), name='requester-bulk-claim'),
+    path('work-queue/', views.WorkQueueView.as_view(), name='work-queue'),
+    path('shopping-list/', views.ShoppingListView.as_view(), name='shopping-list'),
+    path('search/', views.SearchView.as_view(), name='search'),
 
     path('add-shopper/<int:pk>/<str:invite_token>/', views.AddShopperView.as_view(), name='add-shopper'),
     path('remove-shopper/<int:pk>/', views.RemoveShopperView.as_view(), name='remove-shopper'),
 
     path('requested-item/<int:pk>/comment/new/', views.CommentCreateView.as_view(), name='comment-create'),
     path('requested-item/comment/<int:pk>/delete/', views.CommentDeleteView.as_view(), name='comment-delete'),
+
+    path('notifications/', views.NotificationPreferencesView.as_view(), name='notification-preferences'),
+
+    path('events/stream/', views.EventStreamView.as_view(), name='events-stream'),
+    path('events/poll/', views.EventPollView.as_view(), name='events-poll'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+
+    path('api/requested-items/', api.RequestedItemsApiView.as_view(), name='api-requested-items'),
+    path('api/requested-item/<int:pk>/', api.RequestedItemApiView.as_view(), name='api-requested-item'),
+    path('api/requested-item/<int:pk>/claim/', api.RequestedItemClaimApiView.as_view(), name='api-requested-item-claim'),
+    path('api/requested-item/<int:pk>/comments/', api.CommentsApiView.as_view(), name='api-comments'),
+    path('api/comment/<int:pk>/', api.CommentApiView.as_view(), name='api-comment'),
+    path('api/requester/<int:pk>/claim/', api.RequesterBulkClaimApiView.as_view(), name='api-requester-bulk-claim'),
+    path('api/shoppers/', api.ShoppersApiView.as_view(), name='api-shoppers'),
+    path('api/requesters/', api.RequestersApiView.as_view(), name='api-requesters'),
+    path('api/work-queue/', api.WorkQueueApiView.as_view(), name='api-work-queue'),
+    path('api/items/', api.ItemsApiView.as_view(), name='api-items'),
+    path('api/search/', api.SearchApiView.as_view(), name='api-search'),
 ]
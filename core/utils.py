@@ -1,8 +1,14 @@
+import functools
 import pytz
 import time
 from datetime import datetime
+from urllib.parse import quote
+
+from django.urls import reverse
 
 default_date_format = '%Y/%m/%d'
+human_readable_datetime_format = '%Y-%m-%d %H:%M:%S %Z'
+default_timezone = 'Europe/London'
 
 
 def epoch_timestamp_from_date(date):
@@ -29,7 +35,76 @@ def datetime_from_epoch_timestamp(epoch_timestamp):
     return datetime.fromtimestamp(epoch_timestamp)
 
 
-def localized_datetime_from_epoch_timestamp(epoch_timestamp, timezone='Europe/London'):
-    bst = pytz.timezone(timezone)
-    naive_datetime = datetime_from_epoch_timestamp(epoch_timestamp)
-    return pytz.utc.localize(naive_datetime).astimezone(bst)
+@functools.lru_cache(maxsize=None)
+def get_timezone(timezone):
+    return pytz.timezone(timezone)
+
+
+def localized_datetime_from_epoch_timestamp(epoch_timestamp, timezone=default_timezone):
+    # Build an aware UTC datetime directly so the result does not depend on the server's local time zone.
+    return datetime.fromtimestamp(epoch_timestamp, tz=pytz.utc).astimezone(get_timezone(timezone))
+
+
+@functools.lru_cache(maxsize=8192)
+def localized_datetime_string_from_epoch_second(epoch_second, timezone, date_format):
+    return date_string_from_datetime_object(localized_datetime_from_epoch_timestamp(epoch_second, timezone), date_format)
+
+
+def localized_datetime_string_from_epoch_timestamp(epoch_timestamp, timezone=default_timezone, date_format=human_readable_datetime_format):
+    return localized_datetime_string_from_epoch_second(int(epoch_timestamp), timezone, date_format)
+
+
+def localized_datetime_strings_from_epoch_timestamps(epoch_timestamps, timezone=default_timezone,
+                                                     date_format=human_readable_datetime_format, empty=None):
+    """
+    Format a column of epoch timestamps at once. Each distinct second is
+    converted once, and empty values (None) are replaced by `empty`.
+    """
+    epoch_timestamps = list(epoch_timestamps)
+    formatted = {
+        epoch_second: localized_datetime_string_from_epoch_second(epoch_second, timezone, date_format)
+        for epoch_second in set(int(epoch_timestamp) for epoch_timestamp in epoch_timestamps if epoch_timestamp is not None)
+    }
+    return [empty if epoch_timestamp is None else formatted[int(epoch_timestamp)] for epoch_timestamp in epoch_timestamps]
+
+
+def batched(iterable, batch_size):
+    batch = []
+    for element in iterable:
+        batch.append(element)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def normalize_item_name(name, max_length=300):
+    return ' '.join(name.split()).casefold()[:max_length]
+
+
+def ngrams(text, n=3):
+    padded = ' %s ' % text
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+def ngram_similarity(a, b, n=3):
+    a, b = ngrams(a, n), ngrams(b, n)
+    return len(a & b) / len(a | b)
+
+
+@functools.lru_cache(maxsize=None)
+def url_template(viewname, *kwarg_names):
+    # Reverse once with numeric placeholders, which any path converter accepts, and turn them into format fields.
+    placeholders = {name: 900000000 + i for i, name in enumerate(kwarg_names)}
+    url = reverse(viewname, kwargs=placeholders)
+    for name, placeholder in placeholders.items():
+        url = url.replace(str(placeholder), '{%s}' % name)
+    return url
+
+
+def memoized_reverse(viewname, **kwargs):
+    """
+    reverse() for URLs built once per row, e.g. in admin changelists.
+    """
+    return url_template(viewname, *sorted(kwargs)).format(**{name: quote(str(value)) for name, value in kwargs.items()})
@@ -1,75 +1,201 @@
+import csv
+import hashlib
+import io
+
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.shortcuts import get_object_or_404, redirect
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max, Sum
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag, url_has_allowed_host_and_scheme
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views import View
-from django.views.generic import ListView, CreateView, DetailView, DeleteView, UpdateView, TemplateView
+from django.views.generic import ListView, CreateView, DetailView, DeleteView, FormView, UpdateView, TemplateView
 from django.views.generic.detail import SingleObjectMixin
 
-from core.models import RequestedItem, Shopper, Requester, Comment, Profile
+from core import events, search, transfer
+from core.instrumentation import metrics
+from core.forms import (BulkClaimForm, FulfilItemsForm, ImportRequestedItemsForm, ListTemplateForm, NotificationPreferenceForm,
+                        RequestedItemCreateForm)
+from core.models import (ListTemplate, ListTemplateItem, Notification, NotificationPreference, RequestedItem, Shopper, Requester,
+                         Comment)
+from core.pagination import InvalidCursor, KeysetPaginator
+from core.permissions import get_permission_resolver
+from core.utils import localized_datetime_strings_from_epoch_timestamps
 
 
 class UserTestMixin(LoginRequiredMixin, UserPassesTestMixin):
     tests = []
 
+    @property
+    def permissions(self):
+        return get_permission_resolver(self.request)
+
     def test_func(self):
-        return all([f(self) for f in self.tests])
+        return all(f(self) for f in self.tests)
+
+
+class ResolvedRequestedItemMixin:
+    def get_object(self, queryset=None):
+        requested_item = self.permissions.requested_item(self.kwargs[self.pk_url_kwarg])
+        if requested_item is None:
+            raise Http404
+        return requested_item
+
+
+class ResolvedCommentMixin:
+    def get_object(self, queryset=None):
+        comment = self.permissions.comment(self.kwargs[self.pk_url_kwarg])
+        if comment is None:
+            raise Http404
+        return comment
+
+
+class KeysetPaginationMixin:
+    paginate_by = 50
+    cursor_kwarg = 'cursor'
+    keyset_ordering = ('-priority', 'id')
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return paginator, page, page.object_list, page.has_next
+
+
+def requesters_version_stamp(requester_ids):
+    stamp = Requester.objects.filter(pk__in=requester_ids).aggregate(Sum('items_version'), Max('items_modified'))
+    if stamp['items_modified__max'] is None:
+        return None
+    # Versions only grow, but the set of requesters can change, so it is part of the version.
+    version = '%s:%s' % (','.join(map(str, sorted(requester_ids))), stamp['items_version__sum'])
+    return version, stamp['items_modified__max']
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET/HEAD with 304 Not Modified when the item version stamp of the
+    page's requesters is unchanged, without fetching the page's objects or rendering it.
+    """
+
+    def get_version_stamp_requester_ids(self):
+        """
+        The requesters whose items the page shows, by default all those the user can see.
+        """
+        return self.permissions.visible_requester_ids
+
+    def get_version_stamp(self):
+        """
+        Return (version, last_modified) for the page, or None to skip conditional handling.
+        """
+        return requesters_version_stamp(self.get_version_stamp_requester_ids())
+
+    def get_etag(self, version):
+        key = ':'.join([self.__class__.__name__, str(self.request.user.pk), str(version), self.request.get_full_path()])
+        return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+    def dispatch(self, request, *args, **kwargs):
+        # Pending flash messages are only shown on a full render.
+        if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+            return super().dispatch(request, *args, **kwargs)
+        stamp = self.get_version_stamp()
+        if stamp is None:
+            return super().dispatch(request, *args, **kwargs)
+        version, last_modified = stamp
+        etag, last_modified = self.get_etag(version), int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+def add_claimed_datetimes(requested_items):
+    claimed_datetimes = localized_datetime_strings_from_epoch_timestamps(
+        requested_item.claimed_epoch_timestamp for requested_item in requested_items)
+    for requested_item, claimed_datetime in zip(requested_items, claimed_datetimes):
+        requested_item.claimed_datetime = claimed_datetime
+    return requested_items
 
 
 def user_is_requester(view_cls):
-    return Profile.user_is_requester(view_cls.request.user)
+    return view_cls.permissions.is_requester
 
 
 def user_is_shopper(view_cls):
-    return Profile.user_is_shopper(view_cls.request.user)
+    return view_cls.permissions.is_shopper
 
 
 def requester_owns_requested_item(view_cls):
-    return user_is_requester(view_cls) and RequestedItem.objects.filter(pk=view_cls.kwargs[view_cls.pk_url_kwarg], requester=view_cls.request.user.requester).exists()
+    requested_item = view_cls.permissions.requested_item(view_cls.kwargs[view_cls.pk_url_kwarg])
+    return requested_item is not None and view_cls.permissions.owns_requested_item(requested_item)
+
+
+def requester_owns_list_template(view_cls):
+    return ListTemplate.objects.filter(pk=view_cls.kwargs['pk'], requester=view_cls.permissions.requester_id).exists()
 
 
 def user_is_authorized_shopper(view_cls):
-    requested_item = RequestedItem.objects.get(pk=view_cls.kwargs[view_cls.pk_url_kwarg])
-    requester = requested_item.requester
-    return user_is_shopper(view_cls) and view_cls.request.user.shopper in requester.shoppers.all()
+    requested_item = view_cls.permissions.requested_item(view_cls.kwargs[view_cls.pk_url_kwarg])
+    return requested_item is not None and view_cls.permissions.is_linked_to_requester(requested_item.requester_id)
 
 
 def shopper_is_authorized_for_requester(view_cls):
-    return user_is_requester(view_cls) and view_cls.kwargs['pk'] in view_cls.request.user.requester.shoppers.all().values_list('id', flat=True)
+    return user_is_requester(view_cls) and view_cls.permissions.is_linked_to_shopper(view_cls.kwargs['pk'])
 
 
 def requester_is_authorized_for_shopper(view_cls):
-    return user_is_shopper(view_cls) and view_cls.kwargs['pk'] in view_cls.request.user.shopper.requesters.all().values_list('id', flat=True)
+    return user_is_shopper(view_cls) and view_cls.permissions.is_linked_to_requester(view_cls.kwargs['pk'])
 
 
 def user_is_authorized_on_requested_item(view_cls):
-    requested_item = RequestedItem.objects.get(pk=view_cls.kwargs['pk'])
-    authorized_users = [requested_item.requester.user]
-    if requested_item.shopper is not None:
-        authorized_users.append(requested_item.shopper.user)
-    return view_cls.request.user in authorized_users
+    requested_item = view_cls.permissions.requested_item(view_cls.kwargs['pk'])
+    return requested_item is not None and view_cls.permissions.is_authorized_on_requested_item(requested_item)
 
 
 def comment_belongs_to_user(view_cls):
-    return view_cls.request.user == view_cls.model.objects.get(pk=view_cls.kwargs[view_cls.pk_url_kwarg]).author
+    comment = view_cls.permissions.comment(view_cls.kwargs[view_cls.pk_url_kwarg])
+    return comment is not None and comment.author_id == view_cls.request.user.pk
 
 
 class IndexView(TemplateView):
     template_name = 'core/index.html'
 
 
-class RequestedItemsListView(UserTestMixin, ListView):
+class RequestedItemsListView(UserTestMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = RequestedItem
     template_name = 'core/requested_item/requested_item_list.html'
     tests = [user_is_requester]
+    query_budget = 10
+
+    def get_version_stamp_requester_ids(self):
+        return {self.permissions.requester_id}
 
     def get_queryset(self):
-        return RequestedItem.objects.for_user(self.request.user)
+        return RequestedItem.objects.for_requester(self.permissions.requester_id).for_table()
+
+    def get_context_data(self, **kwargs):
+        context = super(RequestedItemsListView, self).get_context_data(**kwargs)
+        context['requester_id'] = self.permissions.requester_id
+        add_claimed_datetimes(context['object_list'])
+        return context
 
 
 class RequestedItemsCreateView(UserTestMixin, CreateView):
     model = RequestedItem
     template_name = 'core/requested_item/requested_item_create.html'
-    fields = ['item', 'quantity', 'priority']
+    form_class = RequestedItemCreateForm
     tests = [user_is_requester]
 
     def get_success_url(self):
@@ -77,17 +203,60 @@ class RequestedItemsCreateView(UserTestMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.requester = self.request.user.requester
-        form.instance.save()
         return super().form_valid(form)
 
 
-class RequestedItemsDetailView(LoginRequiredMixin, DetailView):
+class RequestedItemsImportView(UserTestMixin, FormView):
+    template_name = 'core/requested_item/requested_item_import.html'
+    form_class = ImportRequestedItemsForm
+    tests = [user_is_requester]
+    max_rows = 10000
+
+    def form_valid(self, form):
+        stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', errors='replace', newline='')
+        result = transfer.import_requested_items(self.request.user.requester, transfer.read_requested_items(stream, form.cleaned_data['format']),
+                                                 max_rows=self.max_rows)
+        messages.success(self.request, 'Imported %s requested item(s).' % result.created)
+        if result.truncated:
+            messages.warning(self.request, 'Only the first %s rows were read.' % self.max_rows)
+        return self.render_to_response(self.get_context_data(form=self.form_class(), result=result))
+
+
+class RequestedItemsExportView(UserTestMixin, View):
+    tests = [user_is_requester]
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in transfer.FORMATS:
+            raise Http404
+        requested_items = RequestedItem.objects.for_requester(self.permissions.requester_id)
+        response = StreamingHttpResponse(transfer.export_requested_items(requested_items, export_format),
+                                         content_type=transfer.FORMATS[export_format].content_type)
+        response['Content-Disposition'] = 'attachment; filename="requested-items.%s"' % export_format
+        return response
+
+
+class RequestedItemsDetailView(UserTestMixin, ConditionalGetMixin, KeysetPaginationMixin, ResolvedRequestedItemMixin, DetailView):
     model = RequestedItem
     template_name = 'core/requested_item/requested_item_detail.html'
     context_object_name = 'requested_item'
+    paginate_by = 20
+    keyset_ordering = ('-created', '-id')
+    query_budget = 10
+
+    def get_version_stamp(self):
+        return RequestedItem.objects.filter(pk=self.kwargs[self.pk_url_kwarg]).values_list(
+            'requester__items_version', 'requester__items_modified').first()
+
+    def get_context_data(self, **kwargs):
+        context = super(RequestedItemsDetailView, self).get_context_data(**kwargs)
+        comments = Comment.objects.filter(requested_item=self.object).select_related('author')
+        paginator, page, comments, is_paginated = self.paginate_queryset(comments, self.paginate_by)
+        context.update(comments=comments, page_obj=page, is_paginated=is_paginated)
+        return context
 
 
-class RequestedItemsDeleteView(UserTestMixin, DeleteView):
+class RequestedItemsDeleteView(UserTestMixin, ResolvedRequestedItemMixin, DeleteView):
     model = RequestedItem
     template_name = 'core/requested_item/requested_item_delete.html'
     tests = [requester_owns_requested_item]
@@ -96,7 +265,7 @@ class RequestedItemsDeleteView(UserTestMixin, DeleteView):
         return reverse('core:requested-items')
 
 
-class RequestedItemsUpdateView(UserTestMixin, UpdateView):
+class RequestedItemsUpdateView(UserTestMixin, ResolvedRequestedItemMixin, UpdateView):
     model = RequestedItem
     template_name = 'core/requested_item/requested_item_update.html'
     fields = ['quantity', 'priority', 'shopper']
@@ -106,15 +275,23 @@ class RequestedItemsUpdateView(UserTestMixin, UpdateView):
         return reverse('core:requested-item-detail', args=[self.object.pk])
 
 
-class RequestedItemsClaimView(UserTestMixin, SingleObjectMixin, View):
+class RequestedItemsClaimView(UserTestMixin, ResolvedRequestedItemMixin, SingleObjectMixin, View):
     model = RequestedItem
     tests = [user_is_shopper, user_is_authorized_shopper]
+    query_budget = 10
+
+    conflict_template_name = 'core/requested_item/requested_item_claim_conflict.html'
 
     def get(self, request, pk, *args, **kwargs):
-        shopper = get_object_or_404(Shopper, user=self.request.user)
         requested_item = self.get_object()
-        shopper.claim_requested_item(requested_item)
-        return redirect('core:requester-detail', pk=requested_item.requester.pk)
+        if not Shopper(pk=self.permissions.shopper_id, user=request.user).claim_requested_item(requested_item):
+            requested_item.refresh_from_db(fields=['shopper', 'claimed_epoch_timestamp'])
+            if requested_item.shopper_id != self.permissions.shopper_id:
+                return render(request, self.conflict_template_name, {'requested_item': requested_item}, status=409)
+        next_url = request.GET.get('next')
+        if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            return redirect(next_url)
+        return redirect('core:requester-detail', pk=requested_item.requester_id)
 
 
 class AddShopperView(UserTestMixin, View):
@@ -167,9 +344,10 @@ class RequesterForShopperListView(UserTestMixin, ListView):
     model = Requester
     template_name = 'core/requester/requesters_for_shopper_list.html'
     tests = [user_is_shopper]
+    query_budget = 10
 
     def get_queryset(self):
-        return Shopper.objects.get(user=self.request.user).requesters.all()
+        return Requester.objects.select_related('user').filter(pk__in=self.permissions.requester_ids).order_by('-items_modified')
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super(RequesterForShopperListView, self).get_context_data(**kwargs)
@@ -177,14 +355,166 @@ class RequesterForShopperListView(UserTestMixin, ListView):
         return context
 
 
-class RequesterForShopperDetailView(UserTestMixin, DetailView):
+class RequesterForShopperDetailView(UserTestMixin, ConditionalGetMixin, KeysetPaginationMixin, DetailView):
     model = Requester
     template_name = 'core/requester/requester_for_shopper_detail.html'
     context_object_name = 'requester'
     tests = [requester_is_authorized_for_shopper]
+    query_budget = 10
+
+    def get_version_stamp_requester_ids(self):
+        return {self.kwargs['pk']}
+
+    def get_queryset(self):
+        return Requester.objects.select_related('user').filter(pk__in=self.permissions.requester_ids)
+
+    def get_context_data(self, **kwargs):
+        context = super(RequesterForShopperDetailView, self).get_context_data(**kwargs)
+        requested_items = RequestedItem.objects.for_requester(self.object).for_table()
+        paginator, page, requested_items, is_paginated = self.paginate_queryset(requested_items, self.paginate_by)
+        context.update(requested_items=add_claimed_datetimes(requested_items), page_obj=page, is_paginated=is_paginated,
+                       shopper_id=self.permissions.shopper_id)
+        return context
+
+
+class WorkQueueView(UserTestMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
+    template_name = 'core/shopper/work_queue.html'
+    context_object_name = 'requested_items'
+    tests = [user_is_shopper]
+    query_budget = 10
+    # Grouped totals are not keyset paginated, so only the most urgent items are shown.
+    grouped_limit = 100
+
+    @property
+    def grouped(self):
+        return self.request.GET.get('group') == 'item'
+
+    def get_queryset(self):
+        requested_items = RequestedItem.objects.work_queue(self.permissions.requester_ids)
+        if self.grouped:
+            return requested_items.totals_by_item()
+        return requested_items.for_work_queue()
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.grouped:
+            totals = [dict(totals, priority_string=RequestedItem.priority_names[totals['priority']])
+                      for totals in queryset[:self.grouped_limit + 1]]
+            self.grouped_truncated = len(totals) > self.grouped_limit
+            return None, None, totals[:self.grouped_limit], False
+        return super(WorkQueueView, self).paginate_queryset(queryset, page_size)
+
+    def get_context_data(self, **kwargs):
+        context = super(WorkQueueView, self).get_context_data(**kwargs)
+        context['grouped'] = self.grouped
+        context['grouped_limit'] = self.grouped_limit if self.grouped and self.grouped_truncated else None
+        return context
+
+
+class ShoppingListView(UserTestMixin, ConditionalGetMixin, TemplateView):
+    template_name = 'core/shopper/shopping_list.html'
+    tests = [user_is_shopper]
+    csv_columns = ['item_name', 'total_quantity', 'priority_string', 'requesters']
+    query_budget = 12
+
+    def get_requested_items(self):
+        return RequestedItem.objects.filter(shopper=self.permissions.shopper_id, requester__in=self.permissions.requester_ids)
+
+    def get_shopping_list(self):
+        return [{
+            'item': row['item'],
+            'item_name': row['item__name'],
+            'total_quantity': row['total_quantity'],
+            'priority': row['priority'],
+            'priority_string': RequestedItem.priority_names[row['priority']],
+            'requesters': sorted(row['requesters'].split(',')),
+        } for row in self.get_requested_items().unfulfilled().shopping_list()]
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format')
+        if export_format == 'csv':
+            response = HttpResponse(content_type='text/csv')
+            writer = csv.writer(response)
+            writer.writerow(self.csv_columns)
+            for row in self.get_shopping_list():
+                writer.writerow([', '.join(row[column]) if column == 'requesters' else row[column] for column in self.csv_columns])
+        elif export_format == 'json':
+            response = JsonResponse({'results': self.get_shopping_list()})
+        else:
+            return super(ShoppingListView, self).get(request, *args, **kwargs)
+        response['Content-Disposition'] = 'attachment; filename="shopping-list.%s"' % export_format
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super(ShoppingListView, self).get_context_data(**kwargs)
+        context['shopping_list'] = self.get_shopping_list()
+        return context
+
+    def post(self, request, *args, **kwargs):
+        form = FulfilItemsForm(request.POST)
+        if not form.is_valid():
+            messages.error(request, 'Select the items you bought.')
+            return redirect('core:shopping-list')
+        requested_items = self.get_requested_items().filter(item__in=form.cleaned_data['items'])
+        fulfilled = request.user.shopper.fulfil_requested_items(requested_items)
+        messages.success(request, 'You bought %s requested item(s).' % fulfilled)
+        return redirect('core:shopping-list')
+
+
+class SearchView(UserTestMixin, KeysetPaginationMixin, ListView):
+    template_name = 'core/search.html'
+    context_object_name = 'requested_items'
+    query_budget = 10
+
+    @property
+    def query(self):
+        return ' '.join(self.request.GET.get('q', '').split())
 
     def get_queryset(self):
-        return Shopper.objects.get(user=self.request.user).requesters.all()
+        if not self.query:
+            return RequestedItem.objects.none()
+        return search.search_requested_items(self.permissions.authorized_requested_items(), self.query).for_table()
+
+    def get_context_data(self, **kwargs):
+        context = super(SearchView, self).get_context_data(**kwargs)
+        comments = {}
+        if context['requested_items']:
+            matching_comments = search.matching(Comment, self.query).filter(
+                requested_item__in=[requested_item.pk for requested_item in context['requested_items']])
+            for comment in matching_comments.select_related('author'):
+                comments.setdefault(comment.requested_item_id, []).append(comment)
+        for requested_item in context['requested_items']:
+            requested_item.matching_comments = comments.get(requested_item.pk, [])
+        context['query'] = self.query
+        return context
+
+
+class RequesterBulkClaimView(UserTestMixin, View):
+    tests = [requester_is_authorized_for_shopper]
+    query_budget = 16
+
+    def post(self, request, pk, *args, **kwargs):
+        form = BulkClaimForm(request.POST)
+        if not form.is_valid():
+            messages.error(request, 'Select the items you want to claim or release.')
+            return redirect('core:requester-detail', pk=pk)
+        requested_item_ids = form.cleaned_data['requested_items']
+        requested_items = RequestedItem.objects.for_requester(pk).filter(pk__in=requested_item_ids)
+        shopper = request.user.shopper
+        if form.cleaned_data['action'] == BulkClaimForm.CLAIM:
+            results, verb = shopper.claim_requested_items(requested_items), RequestedItem.CLAIMED
+        else:
+            results, verb = shopper.release_requested_items(requested_items), RequestedItem.RELEASED
+        succeeded = [requested_item_id for requested_item_id in requested_item_ids if results.get(requested_item_id) == verb]
+        held = [requested_item_id for requested_item_id in requested_item_ids if results.get(requested_item_id) == Shopper.ALREADY_HELD]
+        failed = [requested_item_id for requested_item_id in requested_item_ids if requested_item_id not in results]
+        if succeeded:
+            messages.success(request, 'You %s %s item(s).' % (verb, len(succeeded)))
+        if held:
+            messages.info(request, 'You already held %s item(s).' % len(held))
+        if failed:
+            names = requested_items.filter(pk__in=failed).values_list('item__name', flat=True)
+            messages.warning(request, 'These items could not be %s: %s' % (verb, ', '.join(names) or 'unknown items'))
+        return redirect('core:requester-detail', pk=pk)
 
 
 class CommentCreateView(UserTestMixin, CreateView):
@@ -202,10 +532,119 @@ class CommentCreateView(UserTestMixin, CreateView):
         return super(CommentCreateView, self).form_valid(form)
 
 
-class CommentDeleteView(UserTestMixin, DeleteView):
+class CommentDeleteView(UserTestMixin, ResolvedCommentMixin, DeleteView):
     model = Comment
     template_name = 'core/comment/comment_delete.html'
     tests = [comment_belongs_to_user]
 
     def get_success_url(self):
-        return reverse('core:requested-item-detail', args=[self.object.requested_item.pk])
+        return reverse('core:requested-item-detail', args=[self.object.requested_item_id])
+
+
+class ListTemplatesView(UserTestMixin, ListView):
+    template_name = 'core/list_template/list_templates.html'
+    context_object_name = 'list_templates'
+    tests = [user_is_requester]
+
+    def get_queryset(self):
+        return ListTemplate.objects.filter(requester=self.permissions.requester_id).annotate(item_count=Count('items')).order_by('next_run')
+
+
+class ListTemplateCreateView(UserTestMixin, CreateView):
+    model = ListTemplate
+    template_name = 'core/list_template/list_template_create.html'
+    form_class = ListTemplateForm
+    tests = [user_is_requester]
+
+    def get_initial(self):
+        return {'next_run': timezone.now()}
+
+    def get_success_url(self):
+        return reverse('core:list-templates')
+
+    def form_valid(self, form):
+        # The template repeats the items the requester is currently waiting for, one entry per item.
+        requested_items = (RequestedItem.objects.for_requester(self.permissions.requester_id).unfulfilled()
+                           .order_by('item', '-priority', 'id').values_list('item', 'quantity', 'priority'))
+        items = {}
+        for item_id, quantity, priority in requested_items:
+            items.setdefault(item_id, (quantity, priority))
+        if not items:
+            form.add_error(None, 'Request some items first, the template repeats your current list.')
+            return self.form_invalid(form)
+        form.instance.requester_id = self.permissions.requester_id
+        response = super(ListTemplateCreateView, self).form_valid(form)
+        ListTemplateItem.objects.bulk_create([ListTemplateItem(template=self.object, item_id=item_id, quantity=quantity, priority=priority)
+                                              for item_id, (quantity, priority) in items.items()])
+        return response
+
+
+class ListTemplateDeleteView(UserTestMixin, DeleteView):
+    model = ListTemplate
+    template_name = 'core/list_template/list_template_delete.html'
+    tests = [requester_owns_list_template]
+
+    def get_success_url(self):
+        return reverse('core:list-templates')
+
+
+class NotificationPreferencesView(UserTestMixin, UpdateView):
+    template_name = 'core/notification/preferences.html'
+    form_class = NotificationPreferenceForm
+
+    def get_object(self, queryset=None):
+        return NotificationPreference.objects.get_or_create(user=self.request.user)[0]
+
+    def get_success_url(self):
+        return reverse('core:notification-preferences')
+
+    def form_valid(self, form):
+        if form.cleaned_data['digest_window'] == NotificationPreference.NEVER:
+            Notification.objects.filter(user=self.request.user).delete()
+        messages.success(self.request, 'Your notification preferences were saved.')
+        return super(NotificationPreferencesView, self).form_valid(form)
+
+
+def release_database_connections():
+    for connection in connections.all():
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+class EventsMixin(UserTestMixin):
+    def get_last_event_id(self):
+        # The broker resumes unknown ids from its current event.
+        return self.request.META.get('HTTP_LAST_EVENT_ID') or self.request.GET.get('last_event_id') or events.broker.last_id
+
+
+class EventStreamView(EventsMixin, View):
+    def get(self, request, *args, **kwargs):
+        last_event_id = self.get_last_event_id()
+        # The stream can stay open for a while without needing the database.
+        release_database_connections()
+        response = StreamingHttpResponse(
+            events.stream_events(self.permissions.visible_requester_ids, last_event_id, settings.EVENTS_STREAM_DURATION, settings.EVENTS_HEARTBEAT_INTERVAL),
+            content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class EventPollView(EventsMixin, View):
+    def get(self, request, *args, **kwargs):
+        last_event_id = self.get_last_event_id()
+        release_database_connections()
+        new_events = events.broker.wait(self.permissions.visible_requester_ids, last_event_id, settings.EVENTS_LONG_POLL_TIMEOUT)
+        return JsonResponse({
+            'events': new_events,
+            'last_event_id': new_events[-1]['id'] if new_events else last_event_id,
+        })
+
+
+class MetricsView(View):
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_TOKEN
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if not (request.user.is_staff or token and constant_time_compare(authorization, 'Bearer %s' % token)):
+            return HttpResponse('Forbidden', status=403, content_type='text/plain')
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4')
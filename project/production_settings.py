@@ -1,4 +1,7 @@
 import os
+
+from django.core.exceptions import ImproperlyConfigured
+
 from .settings import *
 
 DEBUG = os.environ.get('DEBUG', False)
@@ -15,3 +18,23 @@ DATABASES = {
 }
 
 ALLOWED_HOSTS = ['*']
+
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# Sessions and permission relationships live in the default cache, so every process and host must share it:
+# with a per-process cache, a logout or a removed shopper stays visible to the other processes.
+SHARED_CACHE_BACKENDS = {
+    'django.core.cache.backends.memcached.MemcachedCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.db.DatabaseCache',
+    'django_redis.cache.RedisCache',
+}
+if CACHES['default']['BACKEND'] not in SHARED_CACHE_BACKENDS or not CACHES['default']['LOCATION']:
+    raise ImproperlyConfigured('Set CACHE_BACKEND and CACHE_LOCATION to a cache shared by every process, one of: %s.' %
+                               ', '.join(sorted(SHARED_CACHE_BACKENDS)))
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.instrumentation.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,6 +71,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.fragment_cache',
             ],
         },
     },
@@ -89,6 +91,37 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+# Local memory by default. Set CACHE_BACKEND/CACHE_LOCATION to share the cache between processes and hosts,
+# e.g. django.core.cache.backends.db.DatabaseCache with a table name (created by `manage.py createcachetable`),
+# or a Redis-compatible backend such as django_redis.cache.RedisCache with redis://127.0.0.1:6379/1 (needs
+# django-redis installed). Permissions and sessions are cached here, so with several processes a shared backend
+# keeps invalidation immediate instead of bounded by PERMISSIONS_CACHE_TIMEOUT. production_settings requires one
+# of its SHARED_CACHE_BACKENDS; .ebextensions/django.config sets the database cache.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'shop4me'),
+    },
+    'template_fragments': {
+        'BACKEND': os.environ.get('FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('FRAGMENT_CACHE_LOCATION', 'template-fragments'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# Rendered table rows are keyed on the requested item's modified timestamp and its item's name, so this
+# only bounds how long other stale data (e.g. a row changed with a queryset update) can be shown.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -184,6 +217,17 @@ SITE_ID = 1
 SITE_URL = os.environ.get('SITE_URL')
 
 
+PERMISSIONS_CACHE_TIMEOUT = 60 * 5
+
+
+# Push of item changes to connected clients, see core.events. Pages poll with a short timeout; the
+# stream holds a server thread for EVENTS_STREAM_DURATION, so it is left to clients that opt in.
+EVENTS_HISTORY = 1000
+EVENTS_STREAM_DURATION = 60
+EVENTS_HEARTBEAT_INTERVAL = 15
+EVENTS_LONG_POLL_TIMEOUT = 2
+
+
 class TestModeDeterminer:
     def __bool__(self):
         return self()
@@ -193,6 +237,18 @@ class TestModeDeterminer:
         return hasattr(mail, 'outbox')
 
 
+# Request instrumentation, see core.instrumentation. Views over their query_budget fail
+# in tests and log a warning otherwise. Metrics are served to staff, or with METRICS_TOKEN.
+QUERY_BUDGETS_STRICT = TestModeDeterminer()
+PERFORMANCE_LOG_REQUESTS = os.environ.get('PERFORMANCE_LOG_REQUESTS', '') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+
+# Deferred work, see core.tasks, run by `manage.py run_tasks`. TASKS_EAGER=1 runs tasks inline instead,
+# for a development server without a worker. Tests opt in with override_settings.
+TASKS_EAGER = os.environ.get('TASKS_EAGER', '') == '1'
+
+
 try:
     from .local_settings import *
 except ImportError: